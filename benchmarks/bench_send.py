@@ -0,0 +1,302 @@
+"""End-to-end throughput benchmark of the send path.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_send                      # all scenarios
+    python -m benchmarks.bench_send csv-small excel      # selected scenarios
+    python -m benchmarks.bench_send --save-baseline      # record new baselines
+    python -m benchmarks.bench_send --mongo-url mongodb://localhost:27017
+
+Synthetic folders (benchmarks.synthetic) are sent with send_experiment to
+mongomock (or a real mongod with --mongo-url) and to the in-process S3 stub
+(or a real endpoint with --s3-endpoint). Each stage reports folders/s,
+points/s and MB/s:
+
+- ``parse``: the format_* functions only (no network)
+- ``metrics``: metric writes to MongoDB (from metrics_written events)
+- ``raw_upload``: raw-data transfers to S3 (from raw_file_saved events)
+- ``send``: send_experiment end to end
+
+Each scenario runs --repeat times and every rate is the median of the runs.
+Results are compared with benchmarks/baselines.json; a rate more than
+--tolerance below its baseline is a regression and the exit status is 1.
+Stages that took less than MIN_STAGE_SECONDS in the baseline are too short to
+time reliably and are not compared. Baselines are only compared when the
+scenario parameters match. A scenario
+without a matching baseline is reported as unchecked and fails the run (exit
+status 1) unless --allow-missing-baseline is given; the committed baselines
+were recorded with the default parameters, and a machine much slower or
+faster than theirs should record its own with --save-baseline.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.synthetic import generate_folders, selectors_for
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_REPEAT = 3
+# shorter stages are dominated by timer and scheduling noise
+MIN_STAGE_SECONDS = 0.1
+
+MB = 1024**2
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "csv-small": {"count": 20, "rows": 240, "cols": 2, "metrics_format": "csv", "raw_files": 1, "raw_size": 1 * MB},
+    "csv-long-metrics": {"count": 4, "rows": 200_000, "cols": 8, "metrics_format": "csv", "raw_files": 0, "raw_size": 0},
+    "excel": {"count": 8, "rows": 5_000, "cols": 4, "metrics_format": "xlsx", "raw_files": 1, "raw_size": 1 * MB},
+    "raw-heavy": {"count": 4, "rows": 240, "cols": 2, "metrics_format": "csv", "raw_files": 4, "raw_size": 32 * MB},
+}
+
+
+def _rates(folders: int, points: int, nbytes: int, seconds: float) -> Dict[str, float]:
+    seconds = max(seconds, 1e-9)
+    return {
+        "seconds": round(seconds, 4),
+        "folders_per_s": round(folders / seconds, 3),
+        "points_per_s": round(points / seconds, 1),
+        "mb_per_s": round(nbytes / MB / seconds, 3),
+    }
+
+
+def _folder_bytes(folder: str, names: List[str]) -> int:
+    return sum(os.path.getsize(os.path.join(folder, n)) for n in names if os.path.isfile(os.path.join(folder, n)))
+
+
+def _mongo_payload(args) -> Dict[str, Any]:
+    db = f"altar_bench_{os.getpid()}"
+    if args.mongo_url:
+        return {"use_uri": 1, "uri": args.mongo_url, "db": db}
+    try:
+        import mongomock
+        import mongomock.gridfs
+    except ImportError:
+        raise SystemExit("mongomock is not installed; pass --mongo-url to use a real mongod")
+    import services.mongo_conn as mongo_conn
+
+    # every factory in the process shares one in-memory server
+    mongomock.gridfs.enable_gridfs_integration()
+    client = mongomock.MongoClient()
+    mongo_conn.MongoClient = lambda *a, **k: client
+    return {"host": "localhost", "db": db}
+
+
+def _drop_database(mongo_payload: Dict[str, Any]):
+    from services.mongo_conn import SacredObserverFactory
+
+    with SacredObserverFactory.from_payload(mongo_payload) as observers:
+        observers.database.client.drop_database(mongo_payload["db"])
+
+
+def bench_parse(folders: List[str], selectors: Dict[str, Any]) -> Dict[str, float]:
+    import services.format_content as fc
+
+    points = 0
+    nbytes = 0
+    started = time.perf_counter()
+    shared = fc.load_shared_config(selectors["config"])
+    for folder in folders:
+        fc.format_config(folder, selectors["config"], shared=shared)
+        mets = fc.format_metrics(folder, selectors["metrics"])
+        fc.format_results(folder, selectors["results"])
+        points += sum(len(v) for v in (mets.get("columns") or {}).values())
+        nbytes += _folder_bytes(folder, [selectors[k]["name"] for k in ("config", "metrics", "results")])
+    return _rates(len(folders), points, nbytes, time.perf_counter() - started)
+
+
+def bench_send(folders: List[str], payload: Dict[str, Any], verbose: bool = False) -> Dict[str, Dict[str, float]]:
+    from services.experiment_sender import send_experiment
+
+    totals = {"points": 0, "metrics_s": 0.0, "raw_bytes": 0, "raw_s": 0.0, "raw_files": 0}
+
+    def _on_progress(ev: Dict[str, Any]):
+        if ev["event"] == "metrics_written":
+            totals["points"] += ev.get("points", 0)
+            totals["metrics_s"] += ev.get("seconds", 0.0)
+        elif ev["event"] == "raw_file_saved":
+            totals["raw_bytes"] += ev.get("bytes", 0)
+            totals["raw_s"] += ev.get("seconds", 0.0)
+            totals["raw_files"] += 1
+
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            (contextlib.nullcontext() if verbose else contextlib.redirect_stderr(devnull)):
+        res = send_experiment(payload, on_progress=_on_progress)
+    seconds = time.perf_counter() - started
+    if not res.get("ok"):
+        raise RuntimeError(f"send failed: {res.get('message')}")
+
+    sent_bytes = totals["raw_bytes"] + sum(_folder_bytes(f, ["capture.png"]) for f in folders)
+    stages = {
+        "metrics": _rates(len(folders), totals["points"], 0, totals["metrics_s"]),
+        "send": _rates(len(folders), totals["points"], sent_bytes, seconds),
+    }
+    if totals["raw_files"]:
+        stages["raw_upload"] = _rates(0, 0, totals["raw_bytes"], totals["raw_s"])
+    return stages
+
+
+def run_scenario(name: str, params: Dict[str, Any], args) -> Dict[str, Dict[str, float]]:
+    root = tempfile.mkdtemp(prefix=f"altar-bench-{name}-", dir=args.workdir)
+    stub = None
+    mongo_payload = _mongo_payload(args)
+    try:
+        folders = generate_folders(root, **params)
+        selectors = selectors_for(folders[0], params["cols"], params["metrics_format"])
+        if args.s3_endpoint:
+            minio = {"endpoint": args.s3_endpoint, "access_key": args.s3_access_key,
+                     "secret_key": args.s3_secret_key, "bucket": args.bucket, "tls": 0}
+        else:
+            from benchmarks.s3_stub import S3Stub
+
+            stub = S3Stub(buckets=(args.bucket,)).start()
+            minio = {"endpoint": stub.endpoint, "access_key": "bench", "secret_key": "bench",
+                     "bucket": args.bucket, "tls": 0}
+        selectors["raw_data"]["options"] = {"send_minio": 1 if params["raw_files"] else 0}
+        if not params["raw_files"]:
+            selectors["raw_data"] = {"name": "None", "options": {}}
+
+        stages = {"parse": bench_parse(folders, selectors)}
+        payload = {
+            "mongo": mongo_payload,
+            "minio": minio,
+            "experiment": {"folders": folders, "selectors": selectors},
+            # stub/local speeds must not feed the transfer estimates of real plans
+            "batch": {"workers": args.workers, "throughput_state": False},
+        }
+        stages.update(bench_send(folders, payload, verbose=args.verbose))
+        return stages
+    finally:
+        if stub is not None:
+            stub.stop()
+        with contextlib.suppress(Exception):
+            _drop_database(mongo_payload)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def median_stages(runs: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """Per stage and metric, the median over repeated runs of a scenario."""
+    return {stage: {metric: statistics.median(r[stage][metric] for r in runs if stage in r) for metric in rates}
+            for stage, rates in runs[0].items()}
+
+
+def load_baselines(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def compare(stages: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Human-readable regressions: rates more than ``tolerance`` below the baseline."""
+    regressions = []
+    for stage, rates in baseline.items():
+        if rates.get("seconds", 0) < MIN_STAGE_SECONDS:
+            continue
+        for metric, expected in rates.items():
+            if metric == "seconds" or not expected:
+                continue
+            actual = stages.get(stage, {}).get(metric)
+            if actual is not None and actual < expected * (1 - tolerance):
+                regressions.append(f"{stage}.{metric}: {actual:g} < {expected:g} ({(actual / expected - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def _print_stages(name: str, stages: Dict[str, Dict[str, float]]):
+    print(f"\n{name}")
+    print(f"  {'stage':<12}{'seconds':>10}{'folders/s':>12}{'points/s':>14}{'MB/s':>10}")
+    for stage, r in stages.items():
+        print(f"  {stage:<12}{r['seconds']:>10.3f}{r['folders_per_s']:>12.2f}{r['points_per_s']:>14,.0f}{r['mb_per_s']:>10.2f}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the experiment send path.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--count", type=int, help="Override the number of folders")
+    parser.add_argument("--rows", type=int, help="Override the metrics rows per folder")
+    parser.add_argument("--cols", type=int, help="Override the metrics value columns")
+    parser.add_argument("--format", choices=("csv", "xlsx"), help="Override the metrics file format")
+    parser.add_argument("--raw-files", type=int, help="Override the raw-data files per folder")
+    parser.add_argument("--raw-size-mb", type=float, help="Override the size of each raw-data file (MB)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Runs per scenario, rates are their median (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="payload['batch']['workers'] (default: %(default)s)")
+    parser.add_argument("--mongo-url", help="Use this MongoDB instead of mongomock")
+    parser.add_argument("--s3-endpoint", help="Use this S3 endpoint instead of the in-process stub")
+    parser.add_argument("--s3-access-key", default=os.environ.get("ALTAR_BENCH_S3_ACCESS_KEY", ""))
+    parser.add_argument("--s3-secret-key", default=os.environ.get("ALTAR_BENCH_S3_SECRET_KEY", ""))
+    parser.add_argument("--bucket", default="altar-bench")
+    parser.add_argument("--workdir", default=None, help="Where synthetic folders are generated (default: temp dir)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baselines file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baselines")
+    parser.add_argument("--allow-missing-baseline", action="store_true",
+                        help="Only warn when a scenario has no matching baseline (default: exit status 1)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before a rate counts as a regression (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the send logs (Sacred, raw-data messages) on stderr")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    overrides = {
+        "count": args.count, "rows": args.rows, "cols": args.cols, "metrics_format": args.format,
+        "raw_files": args.raw_files,
+        "raw_size": int(args.raw_size_mb * MB) if args.raw_size_mb is not None else None,
+    }
+    baselines = load_baselines(args.baseline)
+    results: Dict[str, Any] = {}
+    regressions: Dict[str, List[str]] = {}
+    unchecked: List[str] = []
+    for name in names:
+        params = {**SCENARIOS[name], **{k: v for k, v in overrides.items() if v is not None}}
+        stages = median_stages([run_scenario(name, params, args) for _ in range(max(1, args.repeat))])
+        results[name] = {"params": params, "workers": args.workers, "stages": stages}
+        base = baselines.get(name)
+        if base and base.get("params") == params and base.get("workers") == args.workers:
+            found = compare(stages, base.get("stages", {}), args.tolerance)
+            if found:
+                regressions[name] = found
+        else:
+            unchecked.append(name)
+        if not args.json:
+            _print_stages(name, stages)
+
+    if args.json:
+        print(json.dumps({"results": results, "regressions": regressions, "unchecked": unchecked}, indent=2))
+    else:
+        for name, found in regressions.items():
+            print(f"\nREGRESSION in {name}:\n  " + "\n  ".join(found))
+    if unchecked and not args.save_baseline:
+        level = "WARNING" if args.allow_missing_baseline else "ERROR"
+        print(f"\n{level} no baseline in {args.baseline} for {', '.join(unchecked)} with these parameters: "
+              f"not checked for regressions (record one with --save-baseline)", file=sys.stderr)
+
+    if args.save_baseline:
+        baselines.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"\nBaselines saved to {args.baseline}", file=sys.stderr)
+        return 0
+    return 1 if regressions or (unchecked and not args.allow_missing_baseline) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Minimal in-process S3 endpoint for benchmarks (path-style, no auth).
+
+Implements what boto3 uses in AltarSender: HeadBucket/CreateBucket,
+Put/Head/Get/Copy object, and multipart uploads (create, upload part, list
+parts, list uploads, complete, abort). Object bodies are dropped unless
+``keep_data`` is set, so multi-GB benchmarks do not fill memory.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+_CHUNK = 1024**2
+
+
+class _Object:
+    def __init__(self, size: int, etag: str, data: Optional[bytes]):
+        self.size = size
+        self.etag = etag
+        self.data = data
+
+
+class S3Stub:
+    """Threaded S3 server on 127.0.0.1; use as a context manager."""
+
+    def __init__(self, buckets=("bench",), keep_data: bool = False, port: int = 0):
+        self.keep_data = keep_data
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, Dict[str, _Object]] = {b: {} for b in buckets}
+        self.uploads: Dict[str, Dict] = {}
+        self.bytes_received = 0
+        stub = self
+
+        class _Handler(_S3Handler):
+            server_stub = stub
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="s3-stub", daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "S3Stub":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+class _S3Handler(BaseHTTPRequestHandler):
+    server_stub: S3Stub
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- request helpers ---
+    def _target(self):
+        parts = urlsplit(self.path)
+        path = unquote(parts.path).lstrip("/")
+        bucket, _, key = path.partition("/")
+        query = {k: v[0] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+        return bucket, key, query
+
+    def _read_raw(self):
+        """Yield the raw request body in chunks (Content-Length or chunked transfer)."""
+        if "chunked" in (self.headers.get("Transfer-Encoding") or ""):
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                yield self.rfile.read(size)
+                self.rfile.readline()
+        remaining = int(self.headers.get("Content-Length") or 0)
+        while remaining > 0:
+            chunk = self.rfile.read(min(_CHUNK, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    def _read_body(self):
+        """Yield the payload bytes, decoding aws-chunked framing when present."""
+        raw = self._read_raw()
+        aws_chunked = "aws-chunked" in (self.headers.get("Content-Encoding") or "") or \
+            (self.headers.get("x-amz-content-sha256") or "").startswith("STREAMING-")
+        if not aws_chunked:
+            yield from raw
+            return
+        buf = b""
+        for chunk in raw:
+            buf += chunk
+            while True:
+                head, sep, rest = buf.partition(b"\r\n")
+                if not sep:
+                    break
+                size = int(head.split(b";")[0] or b"0", 16)
+                if size == 0:
+                    # trailing checksum headers follow; drain them
+                    for _ in raw:
+                        pass
+                    return
+                if len(rest) < size + 2:
+                    break
+                yield rest[:size]
+                buf = rest[size + 2:]
+
+    def _consume(self):
+        md5 = hashlib.md5()
+        size = 0
+        keep = [] if self.server_stub.keep_data else None
+        for chunk in self._read_body():
+            md5.update(chunk)
+            size += len(chunk)
+            if keep is not None:
+                keep.append(chunk)
+        with self.server_stub.lock:
+            self.server_stub.bytes_received += size
+        return size, md5.hexdigest(), (b"".join(keep) if keep is not None else None)
+
+    def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _xml(self, status: int, body: str):
+        self._send(status, ('<?xml version="1.0" encoding="UTF-8"?>' + body).encode(), {"Content-Type": "application/xml"})
+
+    def _error(self, status: int, code: str):
+        # drain the body so the keep-alive connection stays usable
+        for _ in self._read_raw():
+            pass
+        self._xml(status, f"<Error><Code>{code}</Code><Message>{code}</Message></Error>")
+
+    # --- verbs ---
+    def do_HEAD(self):
+        bucket, key, _ = self._target()
+        objects = self.server_stub.buckets.get(bucket)
+        if objects is None:
+            return self._send(404)
+        if not key:
+            return self._send(200)
+        obj = objects.get(key)
+        if obj is None:
+            return self._send(404)
+        self.send_response(200)
+        self.send_header("ETag", f'"{obj.etag}"')
+        self.send_header("Content-Length", str(obj.size))
+        self.end_headers()
+
+    def do_GET(self):
+        bucket, key, query = self._target()
+        objects = self.server_stub.buckets.get(bucket)
+        if objects is None:
+            return self._error(404, "NoSuchBucket")
+        if not key and "uploads" in query:
+            with self.server_stub.lock:
+                items = [(uid, u) for uid, u in self.server_stub.uploads.items() if u["bucket"] == bucket]
+            body = "".join(f"<Upload><Key>{escape(u['key'])}</Key><UploadId>{uid}</UploadId></Upload>" for uid, u in items)
+            return self._xml(200, f"<ListMultipartUploadsResult><Bucket>{bucket}</Bucket>{body}"
+                                  f"<IsTruncated>false</IsTruncated></ListMultipartUploadsResult>")
+        if "uploadId" in query:
+            upload = self.server_stub.uploads.get(query["uploadId"])
+            if upload is None:
+                return self._error(404, "NoSuchUpload")
+            parts = "".join(
+                f"<Part><PartNumber>{n}</PartNumber><ETag>\"{p.etag}\"</ETag><Size>{p.size}</Size></Part>"
+                for n, p in sorted(upload["parts"].items())
+            )
+            return self._xml(200, f"<ListPartsResult><Bucket>{bucket}</Bucket><Key>{escape(key)}</Key>"
+                                  f"<UploadId>{query['uploadId']}</UploadId>{parts}"
+                                  f"<IsTruncated>false</IsTruncated></ListPartsResult>")
+        obj = objects.get(key)
+        if obj is None:
+            return self._error(404, "NoSuchKey")
+        self._send(200, obj.data or b"", {"ETag": f'"{obj.etag}"'})
+
+    def do_PUT(self):
+        bucket, key, query = self._target()
+        stub = self.server_stub
+        if not key:
+            for _ in self._read_raw():
+                pass
+            with stub.lock:
+                stub.buckets.setdefault(bucket, {})
+            return self._send(200)
+        if bucket not in stub.buckets:
+            return self._error(404, "NoSuchBucket")
+        if "uploadId" in query:
+            upload = stub.uploads.get(query["uploadId"])
+            if upload is None:
+                return self._error(404, "NoSuchUpload")
+            size, etag, data = self._consume()
+            with stub.lock:
+                upload["parts"][int(query["partNumber"])] = _Object(size, etag, data)
+            return self._send(200, headers={"ETag": f'"{etag}"'})
+        source = self.headers.get("x-amz-copy-source")
+        if source:
+            for _ in self._read_raw():
+                pass
+            src_bucket, _, src_key = unquote(source).lstrip("/").partition("/")
+            obj = stub.buckets.get(src_bucket, {}).get(src_key)
+            if obj is None:
+                return self._error(404, "NoSuchKey")
+            with stub.lock:
+                stub.buckets[bucket][key] = obj
+            return self._xml(200, f"<CopyObjectResult><ETag>\"{obj.etag}\"</ETag></CopyObjectResult>")
+        size, etag, data = self._consume()
+        with stub.lock:
+            stub.buckets[bucket][key] = _Object(size, etag, data)
+        self._send(200, headers={"ETag": f'"{etag}"'})
+
+    def do_POST(self):
+        bucket, key, query = self._target()
+        stub = self.server_stub
+        for _ in self._read_raw():
+            pass
+        if bucket not in stub.buckets:
+            return self._error(404, "NoSuchBucket")
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            with stub.lock:
+                stub.uploads[upload_id] = {"bucket": bucket, "key": key, "parts": {}}
+            return self._xml(200, f"<InitiateMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{escape(key)}</Key>"
+                                  f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+        if "uploadId" in query:
+            with stub.lock:
+                upload = stub.uploads.pop(query["uploadId"], None)
+            if upload is None:
+                return self._error(404, "NoSuchUpload")
+            parts = [p for _, p in sorted(upload["parts"].items())]
+            digest = hashlib.md5(b"".join(bytes.fromhex(p.etag) for p in parts)).hexdigest()
+            etag = f"{digest}-{len(parts)}"
+            data = b"".join(p.data for p in parts) if stub.keep_data else None
+            with stub.lock:
+                stub.buckets[bucket][key] = _Object(sum(p.size for p in parts), etag, data)
+            return self._xml(200, f"<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{escape(key)}</Key>"
+                                  f"<ETag>\"{etag}\"</ETag></CompleteMultipartUploadResult>")
+        self._error(400, "InvalidRequest")
+
+    def do_DELETE(self):
+        bucket, key, query = self._target()
+        stub = self.server_stub
+        with stub.lock:
+            if "uploadId" in query:
+                stub.uploads.pop(query["uploadId"], None)
+            else:
+                stub.buckets.get(bucket, {}).pop(key, None)
+        self._send(204)
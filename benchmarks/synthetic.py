@@ -0,0 +1,94 @@
+"""Synthetic experiment folders shaped like ``experiments_example/``.
+
+Each folder is named ``YYYY-MM-DD_HH_MM_ExperimentN`` and contains
+config.json, metrics.csv or metrics.xlsx (a "timing" column plus numbered
+value columns), results.csv, capture.png (artifact) and raw_data/ files.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+_WRITE_CHUNK = 4 * 1024**2
+
+
+def metric_columns(cols: int) -> List[str]:
+    return [f"signal_{i}" for i in range(cols)]
+
+
+def _write_metrics(path: str, rows: int, cols: int, fmt: str, rng: np.random.Generator):
+    import pandas as pd
+
+    timing = np.arange(rows, dtype=float)
+    data = {"timing": timing}
+    for name in metric_columns(cols):
+        data[name] = np.sin(timing / 10.0) + rng.normal(0, 0.05, rows)
+    df = pd.DataFrame(data)
+    if fmt == "xlsx":
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _write_random(path: str, size: int, rng: np.random.Generator):
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            n = min(_WRITE_CHUNK, remaining)
+            f.write(rng.bytes(n))
+            remaining -= n
+
+
+def generate_folders(root: str, count: int = 4, rows: int = 240, cols: int = 2, metrics_format: str = "csv",
+                     raw_files: int = 1, raw_size: int = 1024**2, artifact_size: int = 200 * 1024,
+                     seed: int = 0) -> List[str]:
+    """Create ``count`` experiment folders under ``root`` and return their paths."""
+    if metrics_format not in ("csv", "xlsx"):
+        raise ValueError(f"Unsupported metrics format: {metrics_format}")
+    rng = np.random.default_rng(seed)
+    start = dt.datetime(2024, 1, 1, 8, 0)
+    folders = []
+    os.makedirs(root, exist_ok=True)
+    for n in range(count):
+        stamp = (start + dt.timedelta(minutes=5 * n)).strftime("%Y-%m-%d_%H_%M")
+        folder = os.path.join(root, f"{stamp}_Experiment{n + 1}")
+        os.makedirs(os.path.join(folder, "raw_data"), exist_ok=True)
+        config = {
+            "framerate": 1.0,
+            "exp_duration": rows,
+            "seed": int(rng.integers(0, 2**31)),
+            "cam_param": {"Exposure": 900000, "Gain": 23, "SensorHeight": 512, "SensorWidth": 612},
+        }
+        with open(os.path.join(folder, "config.json"), "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        _write_metrics(os.path.join(folder, f"metrics.{metrics_format}"), rows, cols, metrics_format, rng)
+        with open(os.path.join(folder, "results.csv"), "w", encoding="utf-8") as f:
+            f.write(f"A,{rng.random()}\ntau,{rng.random() * 10}\ny0,{rng.random() / 10}\n")
+        _write_random(os.path.join(folder, "capture.png"), artifact_size, rng)
+        for i in range(raw_files):
+            _write_random(os.path.join(folder, "raw_data", f"frames_{i}.bin"), raw_size, rng)
+        folders.append(folder)
+    return folders
+
+
+def selectors_for(folder: str, cols: int, metrics_format: str) -> Dict[str, Any]:
+    """send_experiment selectors matching the generated layout."""
+    metrics_options: Dict[str, Any] = {
+        "header": 1, "has_time": 1, "time_col": "timing", "selected_cols": metric_columns(cols),
+    }
+    metrics: Dict[str, Any] = {"name": f"metrics.{metrics_format}", "options": metrics_options}
+    if metrics_format == "csv":
+        metrics_options["sep"] = ","
+    else:
+        metrics["sheet"] = "Sheet1"
+    return {
+        "config": {"name": "config.json", "options": {"flatten": 1}},
+        "metrics": metrics,
+        "results": {"name": "results.csv", "options": {"sep": ","}},
+        "artifacts": {"name": "capture.png"},
+        "raw_data": {"name": "raw_data", "files": sorted(os.listdir(os.path.join(folder, "raw_data"))), "options": {}},
+    }
@@ -0,0 +1,231 @@
+"""Headless entry point: send experiment folders without the GUI.
+
+Usage:
+    python cli.py --prefs recipe.json "D:/acquisitions/2024-*" [--workers 4]
+                  [--journal batch.jsonl [--resume]] [--dedupe skip|update] [--plan]
+                  [--decimate lttb|minmax|every_nth|none[:POINTS]]
+    python cli.py --prefs recipe.json --abort-uploads
+
+The recipe is either the flat preferences file written by the app
+(~/.mongoui_config.json by default) or a structured send_experiment payload.
+Secrets come from ALTAR_MONGO_PASSWORD / ALTAR_MINIO_SECRET, the recipe
+itself, or the keyring entries saved by the app.
+
+One JSON object per line is written to stdout for each progress event
+(folder started/finished, raw-data file saved), followed by a final
+"batch_finished" line. Everything else (Sacred logs, warnings) goes to stderr.
+With --plan nothing is written: one "folder_planned" line per folder
+describes what would be sent, and "batch_finished" carries the totals.
+With --abort-uploads nothing is sent: the unfinished multipart uploads
+recorded for the recipe's MinIO bucket are aborted and one "uploads_aborted"
+line is written.
+Exit status: 0 if every folder was sent (or, with --plan, can be sent), 1 on partial failure, 2 on invalid input.
+
+This module must not import customtkinter so it starts fast on servers.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import threading
+
+EXIT_OK = 0
+EXIT_PARTIAL_FAILURE = 1
+EXIT_INVALID_INPUT = 2
+
+
+def _expand_folders(patterns: list[str]) -> list[str]:
+    folders: list[str] = []
+    seen = set()
+    for pattern in patterns:
+        matches = glob.glob(os.path.expanduser(pattern)) or [pattern]
+        for m in sorted(matches):
+            path = os.path.abspath(m)
+            if os.path.isdir(path) and path not in seen:
+                seen.add(path)
+                folders.append(path)
+    return folders
+
+
+def _load_payload(recipe_path: str) -> dict:
+    from services.payload import build_payload, is_structured_payload, minio_keyring_user
+    from services.prefs import Preferences
+
+    with open(recipe_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if is_structured_payload(data):
+        payload = data
+    else:
+        prefs = Preferences()
+        mongo_pwd = prefs.load_password_if_any(user=data.get("user") or "default") or ""
+        minio_secret = prefs.load_password_if_any(user=minio_keyring_user(data)) or ""
+        payload = build_payload(data, mongo_password=mongo_pwd, minio_secret=minio_secret)
+
+    payload.setdefault("mongo", {})
+    payload.setdefault("minio", {})
+    if os.environ.get("ALTAR_MONGO_PASSWORD"):
+        payload["mongo"]["password"] = os.environ["ALTAR_MONGO_PASSWORD"]
+    if os.environ.get("ALTAR_MINIO_SECRET"):
+        payload["minio"]["secret_key"] = os.environ["ALTAR_MINIO_SECRET"]
+    return payload
+
+
+def _json_line_writer(stream):
+    lock = threading.Lock()
+
+    def _write(event: dict):
+        line = json.dumps(event, default=str, ensure_ascii=False)
+        with lock:
+            stream.write(line + "\n")
+            stream.flush()
+
+    return _write
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from services.prefs import CONFIG_PATH
+
+    parser = argparse.ArgumentParser(description="Send experiment folders to Sacred/MongoDB without the GUI.")
+    parser.add_argument("folders", nargs="*", help="Experiment folders or glob patterns (default: folders saved in the recipe)")
+    parser.add_argument("--prefs", default=str(CONFIG_PATH), help="Preferences/recipe JSON file (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of folders sent concurrently")
+    parser.add_argument("--journal", default=None, help="Append-only batch journal file (enables crash recovery)")
+    parser.add_argument("--resume", action="store_true", help="Skip work already recorded in --journal")
+    parser.add_argument("--overwrite-journal", action="store_true",
+                        help="Start a new batch in a --journal file whose batch did not finish")
+    parser.add_argument("--dedupe", choices=("skip", "update"), default=None,
+                        help="Check folders against runs already in the database: skip identical ones, "
+                             "and with 'update' overwrite runs whose files changed")
+    parser.add_argument("--decimate", default=None, metavar="METHOD[:POINTS]",
+                        help="Downsample metric series before writing them: lttb, minmax, every_nth or none, "
+                             "with an optional target number of points per series (default 5000)")
+    parser.add_argument("--sweep", default=None, metavar="KEY",
+                        help="One run per row of a CSV/Excel config, linked to metrics/results rows by the KEY "
+                             "column (use '' for no key)")
+    parser.add_argument("--upload-workers", type=int, default=None, metavar="N",
+                        help="Raw-data files uploaded to MinIO in parallel (default 4)")
+    parser.add_argument("--part-size", type=int, default=None, metavar="MB",
+                        help="Multipart part size for MinIO uploads, in MB (default 64, minimum 5)")
+    parser.add_argument("--part-concurrency", type=int, default=None, metavar="N",
+                        help="Parts of one file uploaded to MinIO in parallel (default 8)")
+    parser.add_argument("--local-mode", choices=("copy", "hardlink", "reflink"), default=None,
+                        help="How raw-data files are saved locally: copy (default), or hardlink/reflink when "
+                             "source and target share a filesystem (falls back to a copy otherwise)")
+    parser.add_argument("--local-workers", type=int, default=None, metavar="N",
+                        help="Raw-data files copied locally in parallel (default 4)")
+    parser.add_argument("--content-addressed", action="store_true",
+                        help="Store raw-data files in MinIO by SHA-256, uploading identical files only once")
+    parser.add_argument("--abort-uploads", action="store_true",
+                        help="Abort the unfinished (resumable) MinIO uploads recorded for the bucket, send nothing")
+    parser.add_argument("--plan", action="store_true",
+                        help="Dry run: report sizes, MongoDB limit issues and estimated transfer time, send nothing")
+    parser.add_argument("--throughput-state", default=None, metavar="PATH",
+                        help="File keeping the raw-data throughput measured by sends, for the --plan estimate "
+                             "(default ~/.altarsender_throughput.json, '' to not keep it)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    out = _json_line_writer(sys.stdout)
+
+    try:
+        payload = _load_payload(args.prefs)
+    except Exception as e:
+        out({"event": "error", "message": f"Cannot load recipe {args.prefs}: {e}"})
+        return EXIT_INVALID_INPUT
+
+    experiment = payload.setdefault("experiment", {})
+    if args.folders:
+        experiment["folders"] = _expand_folders(args.folders)
+    batch = payload.setdefault("batch", {})
+    if args.workers is not None:
+        batch["workers"] = args.workers
+    if args.journal:
+        batch["journal"] = args.journal
+    if args.overwrite_journal:
+        batch["overwrite_journal"] = True
+    if args.dedupe:
+        batch["dedupe"] = args.dedupe
+    if args.plan:
+        batch["plan"] = True
+    if args.throughput_state is not None:
+        batch["throughput_state"] = args.throughput_state or False
+    if args.decimate:
+        method, _, points = args.decimate.partition(":")
+        try:
+            threshold = int(points) if points else 5000
+        except ValueError:
+            out({"event": "error", "message": f"Invalid --decimate points: {points}"})
+            return EXIT_INVALID_INPUT
+        metrics = experiment.setdefault("selectors", {}).setdefault("metrics", {})
+        metrics.setdefault("options", {})["decimation"] = {"method": method, "threshold": threshold}
+    minio = payload.setdefault("minio", {})
+    for option, key in (("upload_workers", "upload_workers"), ("part_size", "part_size_mb"),
+                        ("part_concurrency", "part_concurrency")):
+        if getattr(args, option) is not None:
+            minio[key] = getattr(args, option)
+    if args.abort_uploads:
+        from services.resumable_upload import abort_pending_uploads
+
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                res = abort_pending_uploads(minio)
+        except Exception as e:
+            out({"event": "error", "message": f"{e.__class__.__name__}: {e}"})
+            return EXIT_PARTIAL_FAILURE
+        out({"event": "uploads_aborted", **res})
+        return EXIT_OK if res["ok"] else EXIT_PARTIAL_FAILURE
+    raw_options = experiment.setdefault("selectors", {}).setdefault("raw_data", {}).setdefault("options", {})
+    if args.content_addressed:
+        raw_options["content_addressed"] = 1
+    if args.local_mode:
+        raw_options["local_mode"] = args.local_mode
+    if args.local_workers is not None:
+        raw_options["local_workers"] = args.local_workers
+    if args.sweep is not None:
+        config = experiment.setdefault("selectors", {}).setdefault("config", {})
+        config.setdefault("options", {}).update({"sweep": 1, "sweep_key": args.sweep})
+    if args.resume:
+        if not batch.get("journal"):
+            out({"event": "error", "message": "--resume needs --journal"})
+            return EXIT_INVALID_INPUT
+        batch["resume"] = True
+    if not experiment.get("folders"):
+        out({"event": "error", "message": "No experiment folder matched"})
+        return EXIT_INVALID_INPUT
+
+    from services.experiment_sender import send_experiment
+
+    finished = []
+
+    def _on_progress(event: dict):
+        if event.get("event") == "folder_finished":
+            finished.append(bool(event.get("ok")))
+        out(event)
+
+    # keep stdout for JSON lines only; diagnostic prints go to stderr
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            res = send_experiment(payload, on_progress=_on_progress)
+    except Exception as e:
+        out({"event": "error", "message": f"{e.__class__.__name__}: {e}"})
+        out({"event": "batch_finished", "ok": False, "sent": sum(finished), "failed": finished.count(False)})
+        return EXIT_PARTIAL_FAILURE
+
+    ok = bool(isinstance(res, dict) and res.get("ok"))
+    if args.plan:
+        plan = (res or {}).get("plan") or {}
+        out({"event": "batch_finished", "ok": ok, "plan": plan.get("total"),
+             "throughput_bps": plan.get("throughput_bps"), "message": (res or {}).get("message", "")})
+        return EXIT_OK if ok else EXIT_PARTIAL_FAILURE
+    out({"event": "batch_finished", "ok": ok, "sent": sum(finished), "failed": finished.count(False),
+         "message": (res or {}).get("message", "")})
+    return EXIT_OK if ok else EXIT_PARTIAL_FAILURE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
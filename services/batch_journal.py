@@ -0,0 +1,159 @@
+"""Crash-safe, append-only journal of a batch send.
+
+Each line is one JSON record ``{"folder": ..., "state": ..., ...}`` written
+and fsync'ed as soon as the step is done:
+
+- ``parsed``: the folder's files were formatted
+- ``run_created``: the Sacred run exists (``run_id``)
+- ``raw_uploaded``: one raw-data file reached a target (``target``, ``file``:
+  its path relative to the folder, which stays the same from run to run, and
+  ``sha256`` for content-addressed MinIO objects)
+- ``done``: the run completed (``run_id``)
+- ``failed``: the run failed (``message``)
+
+A last ``{"state": "batch_finished"}`` record (no folder) marks a batch that
+ran to its end. When a batch is resumed, completed folders are skipped, and a
+folder whose run was created but not finished reuses that run ``_id`` and
+only saves the raw-data files that are not in the journal yet. Starting a
+new batch in the file of an unfinished one (a crash, then a re-run without
+resume) is refused unless ``overwrite`` is set, so that journal is not lost.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+BATCH_FINISHED = "batch_finished"
+
+
+def _unfinished(path: str) -> bool:
+    """True if ``path`` has records but its last one is not the batch_finished mark."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            last = None
+            for line in f:
+                try:
+                    last = json.loads(line)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        return False
+    return last is not None and last.get("state") != BATCH_FINISHED
+
+
+def _folder_key(folder: str) -> str:
+    return os.path.normcase(os.path.abspath(folder))
+
+
+class FolderState:
+    """What the journal knows about one folder."""
+
+    def __init__(self):
+        self.parsed = False
+        self.run_id: Any = None
+        self.done = False
+        # target -> {file: its sha256, or None when not recorded}
+        self.uploaded: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def uploaded_for(self, target: str) -> Dict[str, Optional[str]]:
+        return self.uploaded.get(target, {})
+
+
+class BatchJournal:
+    """Append-only journal file; ``resume=False`` starts a new batch in the same file.
+
+    Raises FileExistsError when ``path`` holds an unfinished batch and neither
+    ``resume`` nor ``overwrite`` is set.
+    """
+
+    def __init__(self, path: str, resume: bool = False, overwrite: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._states: Dict[str, FolderState] = {}
+        if not resume and not overwrite and _unfinished(path):
+            raise FileExistsError(f"{path} holds an unfinished batch: resume it, or allow overwriting the journal")
+        if resume and os.path.exists(path):
+            self._load()
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() > 0 and not self._ends_with_newline():
+            # terminate a torn last line so the next record stays parseable
+            self._file.write("\n")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # torn last line after a crash
+                    continue
+                self._apply(rec)
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _apply(self, rec: Dict[str, Any]):
+        folder = rec.get("folder")
+        if not folder:
+            return
+        st = self._states.setdefault(_folder_key(folder), FolderState())
+        state = rec.get("state")
+        if state == "parsed":
+            st.parsed = True
+        elif state == "run_created":
+            st.run_id = rec.get("run_id")
+        elif state == "raw_uploaded":
+            st.uploaded.setdefault(rec.get("target", ""), {})[rec.get("file", "")] = rec.get("sha256")
+        elif state == "done":
+            st.done = True
+            st.run_id = rec.get("run_id", st.run_id)
+
+    def state(self, folder: str) -> FolderState:
+        with self._lock:
+            return self._states.get(_folder_key(folder)) or FolderState()
+
+    def record(self, folder: str, state: str, **fields):
+        rec = {"folder": folder, "state": state, "time": time.time(), **fields}
+        line = json.dumps(rec, default=str, ensure_ascii=False)
+        with self._lock:
+            self._apply(rec)
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def finish(self):
+        """Mark the batch as ran to its end (the file may then be reused for a new batch)."""
+        line = json.dumps({"state": BATCH_FINISHED, "time": time.time()})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def open_journal(batch_payload: Dict[str, Any]) -> Optional[BatchJournal]:
+    """Return the journal configured in payload['batch'] (``journal``, ``resume``, ``overwrite_journal``), if any."""
+    path = (batch_payload.get("journal") or "").strip() if isinstance(batch_payload, dict) else ""
+    if not path:
+        return None
+    return BatchJournal(path, resume=bool(batch_payload.get("resume", False)),
+                        overwrite=bool(batch_payload.get("overwrite_journal", False)))
@@ -0,0 +1,426 @@
+"""Incremental JSON/YAML config parsing with key-path projection.
+
+A config document is read as a stream of events (``start_map``,
+``map_key``, ``end_map``, ``start_array``, ``end_array``, ``scalar``) and
+only the projected values are built:
+
+- ``include``: key paths to keep (everything when empty)
+- ``exclude``: key paths to drop, applied after ``include``
+
+A key path is a dotted string, ``"optics.laser.power"``; list elements are
+addressed by index (``"channels.0.gain"``) and ``*`` matches any single key
+or index (``"channels.*.gain"``). Subtrees outside the projection are
+skipped event by event, never materialised.
+
+With ``flatten`` nested mappings are joined into ``parent_child`` keys in
+the same pass, giving the record ``pd.json_normalize(doc, sep="_")`` gives
+(lists are kept as values, empty mappings disappear).
+
+JSON events come from ijson when it is installed (C backend if available),
+else from the small tokenizer below; YAML events come from PyYAML's parser.
+YAML documents using anchors/aliases are loaded whole and projected
+afterwards.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from json.decoder import scanstring
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from services.readers import backend
+
+# files larger than this are always streamed (see format_content._read_config_file)
+STREAM_THRESHOLD = 64 * 1024**2
+READ_CHUNK = 1024**2
+FLATTEN_SEP = "_"
+
+Event = Tuple[str, Any]
+Path = Tuple[str, ...]
+
+_SKIP = object()
+_TOKEN = re.compile(r"[^\s{}\[\]:,\"]+")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+def key_paths(value: Any) -> List[Path]:
+    """Parse include/exclude key paths given as a list or a comma/newline separated string."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = re.split(r"[,\n]", value)
+    paths = []
+    for item in value:
+        item = str(item).strip()
+        if item:
+            paths.append(tuple(part.strip() for part in item.split(".")))
+    return paths
+
+
+def _matches(a: Path, b: Path) -> bool:
+    """The common leading segments of two key paths match (``*`` matches any segment)."""
+    return all(x == y or x == "*" or y == "*" for x, y in zip(a, b))
+
+
+# --- JSON events ---
+class _JsonTokens:
+    """Pure-Python incremental JSON tokenizer (used when ijson is not installed)."""
+
+    def __init__(self, f, chunk_size: int = READ_CHUNK):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _skip_ws(self) -> bool:
+        while True:
+            n = len(self.buf)
+            while self.pos < n and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < n:
+                return True
+            if not self._more():
+                return False
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        while self._skip_ws():
+            c = self.buf[self.pos]
+            if c in "{}[]:,":
+                self.pos += 1
+                yield c, None
+            elif c == '"':
+                while True:
+                    try:
+                        value, end = scanstring(self.buf, self.pos + 1)
+                        break
+                    except json.JSONDecodeError:
+                        if not self._more():
+                            raise
+                self.pos = end
+                yield "string", value
+            else:
+                # numbers and literals: make sure the token is not cut by the chunk boundary
+                while True:
+                    m = _TOKEN.match(self.buf, self.pos)
+                    if m.end() < len(self.buf) or not self._more():
+                        break
+                token = m.group(0)
+                self.pos = m.end()
+                if token in _LITERALS:
+                    yield "scalar", _LITERALS[token]
+                    continue
+                number = _NUMBER.fullmatch(token)
+                if number is None:
+                    raise ValueError(f"Invalid JSON value: {token[:40]!r}")
+                yield "scalar", float(token) if number.group(1) or number.group(2) else int(token)
+
+
+def _python_json_events(f) -> Iterator[Event]:
+    stack: List[str] = []
+    expect_key = False
+    for token, value in _JsonTokens(f):
+        if token == "{":
+            stack.append("map")
+            expect_key = True
+            yield "start_map", None
+        elif token == "[":
+            stack.append("array")
+            yield "start_array", None
+        elif token in "}]":
+            kind = stack.pop() if stack else None
+            if kind != ("map" if token == "}" else "array"):
+                raise ValueError(f"Invalid JSON: unexpected '{token}'")
+            expect_key = False
+            yield ("end_map" if token == "}" else "end_array"), None
+        elif token == ",":
+            expect_key = bool(stack) and stack[-1] == "map"
+        elif token == ":":
+            expect_key = False
+        elif token == "string" and expect_key:
+            yield "map_key", value
+        else:
+            yield "scalar", value
+        if not stack and token in ("}", "]", "string", "scalar"):
+            return
+
+
+def json_events(f) -> Iterator[Event]:
+    """Events of a JSON document read from binary file ``f``."""
+    try:
+        import ijson
+    except ImportError:
+        import io
+
+        yield from _python_json_events(io.TextIOWrapper(f, encoding="utf-8"))
+        return
+    for event, value in ijson.basic_parse(f, use_float=True):
+        if event in ("start_map", "end_map", "start_array", "end_array", "map_key"):
+            yield event, value
+        else:
+            yield "scalar", value
+
+
+# --- YAML events ---
+class _NeedsFullLoad(Exception):
+    """The YAML document uses a feature that cannot be projected while streaming."""
+
+
+def yaml_events(f) -> Iterator[Event]:
+    """Events of the first YAML document read from text file ``f``."""
+    yaml = backend("yaml")
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)(f)
+    # per open container: True/False for a mapping (next node is a key/value), None for a sequence
+    keys: List[Optional[bool]] = []
+    try:
+        while True:
+            event = loader.get_event()
+            if isinstance(event, (yaml.StreamEndEvent, yaml.DocumentEndEvent)):
+                return
+            if isinstance(event, (yaml.StreamStartEvent, yaml.DocumentStartEvent)):
+                continue
+            if isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                keys.pop()
+                yield ("end_map" if isinstance(event, yaml.MappingEndEvent) else "end_array"), None
+                continue
+            if isinstance(event, yaml.AliasEvent) or event.anchor:
+                raise _NeedsFullLoad()
+            is_key = bool(keys) and keys[-1] is True
+            if keys and keys[-1] is not None:
+                keys[-1] = not keys[-1]
+            if isinstance(event, yaml.ScalarEvent):
+                tag = event.tag
+                if tag is None or tag == "!":
+                    tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+                value = loader.construct_object(yaml.ScalarNode(tag, event.value, style=event.style))
+                # the constructor remembers every node it built; nothing refers back to scalars
+                loader.constructed_objects.clear()
+                yield ("map_key" if is_key else "scalar"), value
+            elif is_key:
+                # a mapping or sequence used as a key
+                raise _NeedsFullLoad()
+            elif isinstance(event, yaml.MappingStartEvent):
+                keys.append(True)
+                yield "start_map", None
+            else:
+                keys.append(None)
+                yield "start_array", None
+    finally:
+        loader.dispose()
+
+
+def value_events(value: Any) -> Iterator[Event]:
+    """Events of an already parsed document."""
+    if isinstance(value, dict):
+        yield "start_map", None
+        for k, v in value.items():
+            yield "map_key", k
+            yield from value_events(v)
+        yield "end_map", None
+    elif isinstance(value, list):
+        yield "start_array", None
+        for v in value:
+            yield from value_events(v)
+        yield "end_array", None
+    else:
+        yield "scalar", value
+
+
+# --- projection ---
+class _Projector:
+    def __init__(self, include: Sequence[Path], exclude: Sequence[Path], flatten: bool, sep: str):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.flatten = flatten
+        self.sep = sep
+
+    def _select(self, path: Path) -> str:
+        """"all", "partial" (descend, some children kept) or "none" for one key path."""
+        if any(len(e) <= len(path) and _matches(e, path) for e in self.exclude):
+            return "none"
+        if not self.include or any(len(i) <= len(path) and _matches(i, path) for i in self.include):
+            # excludes deeper down still have to be checked
+            if any(len(e) > len(path) and _matches(path, e) for e in self.exclude):
+                return "partial"
+            return "all"
+        if any(len(i) > len(path) and _matches(path, i) for i in self.include):
+            return "partial"
+        return "none"
+
+    @staticmethod
+    def _skip(events: Iterator[Event], event: str):
+        if event not in ("start_map", "start_array"):
+            return
+        depth = 1
+        for ev, _ in events:
+            if ev in ("start_map", "start_array"):
+                depth += 1
+            elif ev in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 0:
+                    return
+
+    @staticmethod
+    def _build(events: Iterator[Event], event: str, value: Any) -> Any:
+        """Materialise one whole value (no projection left to apply)."""
+        if event == "scalar":
+            return value
+        if event == "start_map":
+            out: Dict[Any, Any] = {}
+            key = None
+            for ev, val in events:
+                if ev == "end_map":
+                    return out
+                if ev == "map_key":
+                    key = val
+                else:
+                    out[key] = _Projector._build(events, ev, val)
+        if event == "start_array":
+            items = []
+            for ev, val in events:
+                if ev == "end_array":
+                    return items
+                items.append(_Projector._build(events, ev, val))
+        raise ValueError(f"Unexpected config event: {event}")
+
+    def value(self, events: Iterator[Event], event: str, value: Any, path: Path, mode: str) -> Any:
+        """Projected value at ``path``, or _SKIP when nothing of it is kept."""
+        if mode == "none":
+            self._skip(events, event)
+            return _SKIP
+        if mode == "all":
+            return self._build(events, event, value)
+        if event == "start_map":
+            out: Dict[Any, Any] = {}
+            key = None
+            for ev, val in events:
+                if ev == "end_map":
+                    return out if out else _SKIP
+                if ev == "map_key":
+                    key = val
+                    continue
+                child_path = path + (str(key),)
+                child = self.value(events, ev, val, child_path, self._select(child_path))
+                if child is not _SKIP:
+                    out[key] = child
+        if event == "start_array":
+            items = []
+            index = 0
+            for ev, val in events:
+                if ev == "end_array":
+                    return items if items else _SKIP
+                child_path = path + (str(index),)
+                child = self.value(events, ev, val, child_path, self._select(child_path))
+                if child is not _SKIP:
+                    items.append(child)
+                index += 1
+        # a scalar where the projection expected a container
+        return _SKIP
+
+    def flat(self, events: Iterator[Event], path: Path, keys: Tuple[Any, ...], out: Dict[Any, Any]):
+        """Flatten the mapping whose start_map was just read into ``out``."""
+        key = None
+        for ev, val in events:
+            if ev == "end_map":
+                return
+            if ev == "map_key":
+                key = val
+                continue
+            child_path = path + (str(key),)
+            mode = self._select(child_path)
+            child_keys = keys + (key,)
+            if ev == "start_map" and mode != "none":
+                self.flat(events, child_path, child_keys, out)
+                continue
+            child = self.value(events, ev, val, child_path, mode)
+            if child is not _SKIP:
+                flat_key = self.sep.join(str(k) for k in child_keys) if len(child_keys) > 1 else child_keys[0]
+                out[flat_key] = child
+
+    def document(self, events: Iterable[Event]) -> Any:
+        events = iter(events)
+        first = next(events, None)
+        if first is None:
+            return None
+        event, value = first
+        if self.flatten and event == "start_map":
+            out: Dict[Any, Any] = {}
+            self.flat(events, (), (), out)
+            return out
+        data = self.value(events, event, value, (), self._select(()))
+        if data is _SKIP:
+            return {} if event == "start_map" else None
+        if self.flatten and isinstance(data, list):
+            # as pd.json_normalize(records)[0]: the first record, flattened
+            return flatten_record(data, self.sep)
+        return data
+
+
+def project(events: Iterable[Event], include: Sequence[Path] = (), exclude: Sequence[Path] = (),
+            flatten: bool = False, sep: str = FLATTEN_SEP) -> Any:
+    """Build the projected (and optionally flattened) document from a stream of events."""
+    return _Projector(include, exclude, flatten, sep).document(events)
+
+
+def _flatten_into(data: Dict[Any, Any], prefix: str, sep: str, out: Dict[Any, Any]):
+    for key, value in data.items():
+        flat_key = f"{prefix}{sep}{key}" if prefix else key
+        if isinstance(value, dict):
+            _flatten_into(value, str(flat_key), sep, out)
+        else:
+            out[flat_key] = value
+
+
+def flatten_record(data: Any, sep: str = FLATTEN_SEP) -> Any:
+    """``pd.json_normalize(data, sep=sep)`` record of an already parsed document."""
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    if not isinstance(data, dict):
+        return data
+    out: Dict[Any, Any] = {}
+    _flatten_into(data, "", sep, out)
+    return out
+
+
+def load(path: str, include: Sequence[Path] = (), exclude: Sequence[Path] = (),
+         flatten: bool = False, sep: str = FLATTEN_SEP) -> Any:
+    """Stream a JSON/YAML config file and return only its projected fields."""
+    path = str(path)
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in (".yaml", ".yml"):
+        yaml = backend("yaml")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return project(yaml_events(f), include, exclude, flatten, sep)
+        except _NeedsFullLoad:
+            with open(path, "r", encoding="utf-8") as f:
+                return project(value_events(yaml.safe_load(f)), include, exclude, flatten, sep)
+    with open(path, "rb") as f:
+        return project(json_events(f), include, exclude, flatten, sep)
+
+
+def should_stream(path: str, options: Dict[str, Any]) -> bool:
+    """Stream when asked to, when a projection is set, or when the file is large."""
+    stream = options.get("stream")
+    if stream is not None and stream != "":
+        return bool(int(stream))
+    if options.get("include") or options.get("exclude"):
+        return True
+    try:
+        return os.path.getsize(path) > STREAM_THRESHOLD
+    except OSError:
+        return False
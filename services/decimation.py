@@ -0,0 +1,290 @@
+"""Optional downsampling of metric series before they are written.
+
+Methods (``options["decimation"]["method"]`` in the metrics selector):
+
+- ``lttb``: largest-triangle-three-buckets, keeps the visual shape
+- ``minmax``: the minimum and maximum point of every bucket (keeps spikes)
+- ``every_nth``: one point every N
+
+The bucket size comes from ``bucket`` (points per bucket, or N for
+``every_nth``) or is derived from ``threshold`` (target points per series).
+Decimators work on fixed-size buckets and can be fed block by block, so a
+streamed file gives the same result as a whole-column read. Points whose x
+or y is not finite are dropped by ``lttb`` and ``minmax``. Points are picked
+on float copies of x and y, but the kept points are returned with their
+original values (integer steps stay integers, as in an undecimated send).
+
+The effective parameters are stored in ``run.info['decimation']`` so a
+stored series can be reproduced from the source file.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+METHODS = ("lttb", "minmax", "every_nth")
+
+Points = Tuple[np.ndarray, np.ndarray]
+_EMPTY = np.empty(0, dtype=object)
+
+
+def parse_options(options: Any) -> Optional[Dict[str, Any]]:
+    """Validated decimation options ({"method", "threshold"|"bucket"}) or None if disabled."""
+    if not options:
+        return None
+    if isinstance(options, str):
+        options = {"method": options}
+    method = str(options.get("method") or "").strip().lower()
+    if not method or method == "none":
+        return None
+    if method not in METHODS:
+        raise ValueError(f"Unsupported decimation method: {method} (expected one of {', '.join(METHODS)})")
+    parsed: Dict[str, Any] = {"method": method}
+    for key in ("threshold", "bucket"):
+        if options.get(key) not in (None, "", 0):
+            value = int(options[key])
+            if value < (3 if key == "threshold" else 1):
+                raise ValueError(f"Decimation {key} too small: {value}")
+            parsed[key] = value
+    if "threshold" not in parsed and "bucket" not in parsed:
+        raise ValueError("Decimation needs a threshold (target points) or a bucket size")
+    return parsed
+
+
+def bucket_size(method: str, n: int, threshold: int) -> int:
+    """Bucket size that brings ``n`` points down to about ``threshold``."""
+    if n <= threshold:
+        return 1
+    if method == "lttb":
+        # first and last points are kept, the others are split in threshold - 2 buckets
+        return max(1, math.ceil((n - 2) / (threshold - 2)))
+    if method == "minmax":
+        return max(1, math.ceil(n / (threshold // 2)))
+    return max(1, math.ceil(n / threshold))
+
+
+def expected_points(options: Dict[str, Any], n: int) -> int:
+    """Upper bound of the points kept from a series of ``n`` points."""
+    method = options["method"]
+    b = options.get("bucket") or bucket_size(method, n, options["threshold"])
+    if b == 1 or n == 0:
+        return n
+    if method == "lttb":
+        return min(n, 2 + math.ceil(max(0, n - 2) / b))
+    if method == "minmax":
+        return min(n, 2 * math.ceil(n / b))
+    return math.ceil(n / b)
+
+
+def _finite(x: np.ndarray, y: np.ndarray, ox: np.ndarray, oy: np.ndarray):
+    mask = np.isfinite(x) & np.isfinite(y)
+    if mask.all():
+        return x, y, ox, oy
+    return x[mask], y[mask], ox[mask], oy[mask]
+
+
+def _as_float(values) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+
+def _objects(values: List[Any]) -> np.ndarray:
+    out = np.empty(len(values), dtype=object)
+    out[:] = values
+    return out
+
+
+def _originals(values) -> np.ndarray:
+    """The values as an object array, each element keeping its Python type."""
+    if isinstance(values, np.ndarray):
+        return values.astype(object)
+    return _objects(list(values))
+
+
+class Decimator:
+    """Stateful decimator for one series; ``feed`` blocks, then ``finish``."""
+
+    def __init__(self, method: str, bucket: int):
+        if method not in METHODS:
+            raise ValueError(f"Unsupported decimation method: {method}")
+        self.method = method
+        self.bucket = max(1, int(bucket))
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        # the original values of the buffered points, returned for the kept ones
+        self._ox = _EMPTY
+        self._oy = _EMPTY
+        self._seen = 0
+        self._anchor: Optional[Tuple[float, float]] = None
+
+    def feed(self, x, y) -> Points:
+        ox, oy = _originals(x), _originals(y)
+        x, y = _as_float(x), _as_float(y)
+        if self.bucket == 1:
+            return ox, oy
+        if self.method == "every_nth":
+            start = (-self._seen) % self.bucket
+            self._seen += len(x)
+            return ox[start::self.bucket], oy[start::self.bucket]
+        x, y, ox, oy = _finite(x, y, ox, oy)
+        self._x = np.concatenate([self._x, x])
+        self._y = np.concatenate([self._y, y])
+        self._ox = np.concatenate([self._ox, ox])
+        self._oy = np.concatenate([self._oy, oy])
+        if self.method == "minmax":
+            return self._minmax(final=False)
+        return self._lttb(final=False)
+
+    def finish(self) -> Points:
+        if self.bucket == 1 or self.method == "every_nth":
+            return _EMPTY, _EMPTY
+        if self.method == "minmax":
+            return self._minmax(final=True)
+        return self._lttb(final=True)
+
+    # --- min/max per bucket (fully vectorised) ---
+    def _minmax(self, final: bool) -> Points:
+        b = self.bucket
+        full = (len(self._x) // b) * b
+        out_x, out_y = self._minmax_buckets(self._y[:full].reshape(-1, b), self._ox[:full].reshape(-1, b),
+                                            self._oy[:full].reshape(-1, b))
+        rest = slice(full, None)
+        if final and full < len(self._x):
+            tail_x, tail_y = self._minmax_buckets(self._y[rest].reshape(1, -1), self._ox[rest].reshape(1, -1),
+                                                  self._oy[rest].reshape(1, -1))
+            out_x, out_y = np.concatenate([out_x, tail_x]), np.concatenate([out_y, tail_y])
+            rest = slice(len(self._x), None)
+        self._x, self._y, self._ox, self._oy = self._x[rest], self._y[rest], self._ox[rest], self._oy[rest]
+        return out_x, out_y
+
+    @staticmethod
+    def _minmax_buckets(y: np.ndarray, ox: np.ndarray, oy: np.ndarray) -> Points:
+        if y.size == 0:
+            return _EMPTY, _EMPTY
+        rows = np.arange(len(y))
+        lo, hi = y.argmin(axis=1), y.argmax(axis=1)
+        first, second = np.minimum(lo, hi), np.maximum(lo, hi)
+        idx = np.stack([first, second], axis=1)
+        keep = np.ones(idx.shape, dtype=bool)
+        keep[:, 1] = first != second
+        rr = np.repeat(rows, 2).reshape(-1, 2)
+        return ox[rr[keep], idx[keep]], oy[rr[keep], idx[keep]]
+
+    # --- largest triangle three buckets ---
+    def _lttb(self, final: bool) -> Points:
+        b = self.bucket
+        x, y, ox, oy = self._x, self._y, self._ox, self._oy
+        out_x: List[Any] = []
+        out_y: List[Any] = []
+        if self._anchor is None and len(x):
+            # the first point is always kept
+            self._anchor = (float(x[0]), float(y[0]))
+            out_x.append(ox[0])
+            out_y.append(oy[0])
+            x, y, ox, oy = x[1:], y[1:], ox[1:], oy[1:]
+        if final:
+            if len(x) == 0:
+                self._x, self._y, self._ox, self._oy = x, y, ox, oy
+                return _objects(out_x), _objects(out_y)
+            # the last point is always kept and closes the last bucket
+            last_x, last_y = x[-1], y[-1]
+            last = (ox[-1], oy[-1])
+            x, y, ox, oy = x[:-1], y[:-1], ox[:-1], oy[:-1]
+            n_buckets = math.ceil(len(x) / b)
+        else:
+            # keep at least one full bucket of lookahead and a candidate last point
+            n_buckets = max(0, (len(x) - 1) // b - 1)
+        ax, ay = self._anchor if self._anchor is not None else (0.0, 0.0)
+        for i in range(n_buckets):
+            bx, by = x[i * b:(i + 1) * b], y[i * b:(i + 1) * b]
+            nx, ny = x[(i + 1) * b:(i + 2) * b], y[(i + 1) * b:(i + 2) * b]
+            if len(nx):
+                cx, cy = nx.mean(), ny.mean()
+            else:
+                cx, cy = last_x, last_y
+            area = np.abs((ax - cx) * (by - ay) - (ax - bx) * (cy - ay))
+            j = int(area.argmax())
+            ax, ay = float(bx[j]), float(by[j])
+            out_x.append(ox[i * b + j])
+            out_y.append(oy[i * b + j])
+        self._anchor = (ax, ay)
+        consumed = n_buckets * b
+        self._x, self._y, self._ox, self._oy = x[consumed:], y[consumed:], ox[consumed:], oy[consumed:]
+        if final:
+            out_x.append(last[0])
+            out_y.append(last[1])
+            self._x, self._y, self._ox, self._oy = x[:0], y[:0], ox[:0], oy[:0]
+        return _objects(out_x), _objects(out_y)
+
+
+def decimate(x, y, method: str, threshold: Optional[int] = None, bucket: Optional[int] = None) -> Points:
+    """Decimate a whole series in one call."""
+    if bucket is None:
+        bucket = bucket_size(method, len(y), threshold or len(y))
+    d = Decimator(method, bucket)
+    head_x, head_y = d.feed(x, y)
+    tail_x, tail_y = d.finish()
+    return np.concatenate([head_x, tail_x]), np.concatenate([head_y, tail_y])
+
+
+class BlockDecimator:
+    """Decimate the (columns, x_axis) blocks of format_metrics output, per column.
+
+    Without an x_axis, the point index (0, 1, ...) is used as x, so the kept
+    points keep their original step. ``lengths`` (points per column) is
+    needed to turn a ``threshold`` into a bucket size; without it the whole
+    first block is taken as the series length.
+    """
+
+    def __init__(self, options: Dict[str, Any], lengths: Optional[Dict[str, int]] = None):
+        self.options = options
+        self.lengths = lengths or {}
+        self._decimators: Dict[str, Decimator] = {}
+        self._offsets: Dict[str, int] = {}
+        self.points_in: Dict[str, int] = {}
+        self.points_out: Dict[str, int] = {}
+
+    def _decimator(self, name: str, n: int) -> Decimator:
+        d = self._decimators.get(name)
+        if d is None:
+            bucket = self.options.get("bucket") or bucket_size(
+                self.options["method"], self.lengths.get(name, n), self.options["threshold"])
+            d = self._decimators[name] = Decimator(self.options["method"], bucket)
+        return d
+
+    def _emit(self, name: str, x: np.ndarray, y: np.ndarray):
+        self.points_out[name] = self.points_out.get(name, 0) + len(y)
+        return {name: y}, x
+
+    def blocks(self, blocks):
+        """Yield ({name: values}, x_axis) blocks with one decimated column each."""
+        for columns, x_axis in blocks:
+            for name, series in columns.items():
+                n = min(len(series), len(x_axis)) if x_axis is not None else len(series)
+                if x_axis is not None:
+                    x = x_axis[:n]
+                else:
+                    start = self._offsets.get(name, 0)
+                    x = np.arange(start, start + n)
+                    self._offsets[name] = start + n
+                try:
+                    out_x, out_y = self._decimator(name, n).feed(x, series[:n])
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Decimation needs numeric values in metric '{name}': {e}") from e
+                self.points_in[name] = self.points_in.get(name, 0) + n
+                if len(out_y):
+                    yield self._emit(name, out_x, out_y)
+        for name, d in self._decimators.items():
+            out_x, out_y = d.finish()
+            if len(out_y):
+                yield self._emit(name, out_x, out_y)
+
+    def info(self) -> Dict[str, Any]:
+        """Parameters and point counts for run.info['decimation']."""
+        return {
+            **self.options,
+            "buckets": {name: d.bucket for name, d in self._decimators.items()},
+            "points_in": dict(self.points_in),
+            "points_out": dict(self.points_out),
+        }
@@ -0,0 +1,149 @@
+"""Pre-flight duplicate detection for batch sends.
+
+Every run sent by AltarSender stores its folder identity in
+``run.info['altar']``:
+
+- ``uid``: ``make_stable_uid_b32`` of the folder name followed by a hash of
+  its parent directory, so same-named folders of two projects never match
+  each other; a folder moved to another directory (or runs sent before the
+  parent was part of the uid) is seen as new
+- ``fingerprint``: a digest of the selected files' names, sizes and full
+  contents; it is only computed (every selected file is read) when the batch
+  uses dedupe, so runs sent without it carry no fingerprint and are sent
+  again, or overwritten, by the first dedupe batch that meets them
+
+Before a batch, all folders are checked against existing runs with a single
+``$in`` query on the indexed ``info.altar.uid`` field. Mode ``skip`` skips
+folders whose uid and fingerprint both match a completed run (any of the
+folder's runs, so a later send without dedupe does not hide it); mode
+``update`` also skips identical folders and overwrites the latest run of the
+folder when the content changed.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.hash import make_stable_uid_b32, short_hash_b32
+
+DEDUPE_MODES = ("skip", "update")
+UID_FIELD = "info.altar.uid"
+
+_CHUNK = 1024**2
+
+
+def folder_uid(folder: str) -> str:
+    folder = os.path.abspath(folder)
+    parent = os.path.normcase(os.path.dirname(folder)).replace("\\", "/")
+    return f"{make_stable_uid_b32(os.path.basename(folder))}-{short_hash_b32(parent)}"
+
+
+def _selected_paths(folder: str, selectors: Dict[str, Any]) -> List[str]:
+    paths = []
+    for key in ("config", "metrics", "results", "artifacts", "raw_data"):
+        sel = selectors.get(key, {}) or {}
+        name = sel.get("name", "None")
+        if not name or name == "None":
+            continue
+        if key == "config" and sel.get("use_custom_path") and sel.get("custom_path"):
+            # shared by the whole batch, not part of the folder identity
+            continue
+        path = os.path.join(folder, name)
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, f) for f in sorted(sel.get("files", []) or []))
+        else:
+            paths.append(path)
+    return paths
+
+
+def _update_with_file(h, path: str):
+    size = os.path.getsize(path)
+    h.update(f"{size}\0".encode())
+    # the whole content: a sample would miss a rewritten middle section of the same size
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+
+
+def folder_fingerprint(folder: str, selectors: Dict[str, Any]) -> str:
+    """Digest of the selected files of a folder (relative names, sizes, contents)."""
+    h = hashlib.blake2b(digest_size=16)
+    for path in _selected_paths(folder, selectors):
+        h.update(os.path.relpath(path, folder).replace("\\", "/").encode() + b"\0")
+        if os.path.isfile(path):
+            _update_with_file(h, path)
+        else:
+            h.update(b"<missing>\0")
+    return h.hexdigest()
+
+
+def folder_identity(folder: str, selectors: Dict[str, Any], fingerprint: bool = True) -> Dict[str, str]:
+    """{uid, fingerprint} of a folder; without ``fingerprint`` only the uid (no file is read)."""
+    if not fingerprint:
+        return {"uid": folder_uid(folder)}
+    return {"uid": folder_uid(folder), "fingerprint": folder_fingerprint(folder, selectors)}
+
+
+def ensure_index(runs_collection) -> None:
+    runs_collection.create_index(UID_FIELD)
+
+
+def find_existing(runs_collection, identities: Dict[str, Dict[str, str]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Map folder -> its existing runs ({_id, fingerprint, status}, oldest first) with one query."""
+    by_uid: Dict[str, List[str]] = {}
+    for folder, ident in identities.items():
+        by_uid.setdefault(ident["uid"], []).append(folder)
+    if not by_uid:
+        return {}
+    matches: Dict[str, List[Dict[str, Any]]] = {}
+    cursor = runs_collection.find(
+        {UID_FIELD: {"$in": list(by_uid)}},
+        {"_id": 1, "status": 1, "info.altar": 1},
+    ).sort("_id", 1)
+    for run in cursor:
+        altar = (run.get("info") or {}).get("altar") or {}
+        for folder in by_uid.get(altar.get("uid"), []):
+            matches.setdefault(folder, []).append({
+                "_id": run["_id"],
+                "fingerprint": altar.get("fingerprint"),
+                "status": run.get("status"),
+            })
+    return matches
+
+
+class DedupePlan:
+    """Outcome of the pre-flight check: what to skip and which runs to overwrite."""
+
+    def __init__(self, mode: str, identities: Dict[str, Dict[str, str]], existing: Dict[str, List[Dict[str, Any]]]):
+        self.mode = mode
+        self.identities = identities
+        self.existing = existing
+
+    def identity(self, folder: str) -> Optional[Dict[str, str]]:
+        return self.identities.get(folder)
+
+    def duplicate_of(self, folder: str) -> Optional[Any]:
+        """Run _id of the latest identical, completed run (the folder can be skipped)."""
+        ident = self.identities.get(folder)
+        if not ident:
+            return None
+        for match in reversed(self.existing.get(folder, [])):
+            if match.get("status") == "COMPLETED" and match.get("fingerprint") == ident["fingerprint"]:
+                return match["_id"]
+        return None
+
+    def overwrite_id(self, folder: str) -> Optional[Any]:
+        """Run _id to overwrite in ``update`` mode (the folder's latest run, changed content)."""
+        if self.mode != "update":
+            return None
+        runs = self.existing.get(folder)
+        return runs[-1]["_id"] if runs else None
+
+
+def plan_dedupe(mode: str, folders: Iterable[str], selectors: Dict[str, Any], runs_collection) -> DedupePlan:
+    if mode not in DEDUPE_MODES:
+        raise ValueError(f"Unsupported dedupe mode: {mode} (expected one of {', '.join(DEDUPE_MODES)})")
+    identities = {folder: folder_identity(folder, selectors) for folder in folders}
+    ensure_index(runs_collection)
+    return DedupePlan(mode, identities, find_existing(runs_collection, identities))
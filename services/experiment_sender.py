@@ -34,128 +34,654 @@ if _FROZEN:
     mongo_module.MongoObserver.save_sources = _patched_save_sources
 
 from sacred import Experiment
-from sacred.observers import MongoObserver
 import numpy as np
 import os
-import pandas as pd
-import csv
+import re
+import contextlib
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict
 import services.format_content as fc
-from services.raw_data_saver import save_raw_data
-from services.mongo_conn import build_mongo_url_from_payload
+from services.raw_data_saver import failed_files, save_raw_data
+from services.minio_conn import MinioClients
+from services.mongo_conn import SacredObserverFactory
+from pymongo.errors import PyMongoError
+from services.metrics_writer import bulk_writer_for_run
+from services.decimation import BlockDecimator
+from services.progress import ProgressCallback, bind, emit
+from services.batch_journal import open_journal
+from services.folder_pattern import FolderPattern
+from services import sweep_writer
+from services.dedupe import folder_identity, plan_dedupe
+from services.send_planner import (
+    ThroughputMeter, format_plan_message, load_measured_throughput, plan_folder, record_measured_throughput,
+    summarize, throughput_path,
+)
 
 
-def send_experiment(payload: Dict[str, Any]) -> Dict[str, Any]:
+DEFAULT_WORKERS = 1
+# folders parsed ahead of the send stage (0 disables the parse/send pipeline)
+DEFAULT_PREFETCH = 2
+
+
+def _send_folder(folder: str, ctx: Dict[str, Any], prepared: Dict[str, Any] | None = None) -> tuple[bool, str]:
+    """Format and send a single experiment folder, reporting progress events.
+
+    ``prepared`` is the output of _prepare_folder when the parse stage already
+    ran (pipeline mode); otherwise the folder is parsed here.
+    Returns (ok, message). Mongo connection errors are re-raised so that the
+    whole batch stops, matching the sequential behaviour.
+    """
+    on_progress = bind(ctx.get("on_progress"), folder=folder)
+    skipped = _already_sent(folder, ctx)
+    if skipped is not None:
+        run_id, reason = skipped
+        experiment_name = folder.replace("\\", "/").split("/")[-1]
+        message = f"{experiment_name}, run {run_id} {reason}"
+        emit(on_progress, "folder_finished", ok=True, message=message, run_id=run_id, skipped=True)
+        return True, message
+    journal = ctx.get("journal")
+    if journal is not None:
+        on_progress = _journaling_progress(journal, folder, on_progress)
+    emit(on_progress, "folder_started")
+    try:
+        if prepared is None:
+            prepared = _prepare_folder(folder, ctx)
+        ok, message, run_id = _run_folder(folder, prepared, ctx, on_progress)
+    except Exception as e:
+        emit(on_progress, "error", message=str(e))
+        raise
+    if not ok:
+        emit(on_progress, "error", message=message)
+    emit(on_progress, "folder_finished", ok=ok, message=message, run_id=run_id)
+    return ok, message
+
+
+def _already_sent(folder: str, ctx: Dict[str, Any]):
+    """(run_id, reason) if the folder must not be sent again, else None."""
+    journal = ctx.get("journal")
+    if journal is not None:
+        previous = journal.state(folder)
+        if previous.done:
+            return previous.run_id, "already sent"
+    dedupe = ctx.get("dedupe")
+    if dedupe is not None:
+        run_id = dedupe.duplicate_of(folder)
+        if run_id is not None:
+            return run_id, "already in database"
+    return None
+
+
+def _journaling_progress(journal, folder: str, on_progress):
+    """Record every saved raw-data file in the journal before forwarding the event."""
+    def _on_progress(ev: Dict[str, Any]):
+        if ev.get("event") == "raw_file_saved":
+            # keyed by the file's path in the folder, which does not change between runs
+            digest = {"sha256": ev["sha256"]} if ev.get("sha256") else {}
+            journal.record(folder, "raw_uploaded", target=ev.get("target"), file=ev.get("source") or ev.get("file"),
+                           **digest)
+        if on_progress is not None:
+            on_progress(ev)
+    return _on_progress
+
+
+def _shared_config(ctx: Dict[str, Any]):
+    """The batch's custom config file, parsed by the first folder that needs it."""
+    with ctx["shared_config_lock"]:
+        if "shared_config" not in ctx:
+            try:
+                ctx["shared_config"] = (fc.load_shared_config(ctx["config"]), None)
+            except Exception as e:
+                # every folder reports the error, as when each one parsed the file
+                ctx["shared_config"] = (None, e)
+        shared, error = ctx["shared_config"]
+    if error is not None:
+        raise error
+    return shared
+
+
+def _prepare_folder(folder: str, ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse stage: run the format_* functions for one folder (no network I/O).
+
+    Formatting errors are returned under "error" so the send stage reports the
+    folder as failed instead of aborting the batch.
+    """
+    experiment_name = folder.replace("\\", "/").split("/")[-1]
+    prepared: Dict[str, Any] = {"experiment_name": experiment_name, "error": None}
+    cfg = {'experiment': experiment_name}
+    try:
+        dedupe = ctx.get("dedupe")
+        # the file fingerprint (a full read of every selected file) is only needed by dedupe
+        prepared["identity"] = (dedupe.identity(folder) if dedupe is not None else None) \
+            or folder_identity(folder, ctx["selectors"], fingerprint=dedupe is not None)
+        folder_values = ctx["folder_values"].get(folder, {}) if "folder_values" in ctx else None
+        config_data = fc.format_config(folder, ctx["config"], shared=_shared_config(ctx), folder_values=folder_values)
+        sweep = sweep_writer.sweep_options(ctx["config"])
+        if sweep is not None:
+            prepared["sweep"] = _prepare_sweep(folder, ctx, sweep["key"], config_data)
+            prepared["metrics"] = {}
+        else:
+            cfg.update(config_data)
+            prepared["metrics"] = fc.format_metrics(folder, ctx["metrics"])
+        prepared["artifacts"] = fc.format_raw_data(folder, ctx["artifacts"])
+        prepared["results"] = fc.format_results(folder, ctx["results"])
+        prepared["raw_data"] = fc.format_raw_data(folder, ctx["raw_data"])
+    except Exception as e:
+        import traceback
+        print(f"ERROR formatting {folder}: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        prepared["error"] = e
+    prepared["config"] = cfg
+    return prepared
+
+
+def _prepare_sweep(folder: str, ctx: Dict[str, Any], key: str, rows) -> Dict[str, Any]:
+    """Parse stage of sweep mode: config rows, and metrics/results grouped by the key column."""
+    if not isinstance(rows, list):
+        raise ValueError("Sweep mode needs a CSV or Excel config (one run per row)")
+    if key and rows and key not in rows[0]:
+        raise ValueError(f"Sweep key column '{key}' not found in the config")
+    metrics: Dict[Any, Any] = {}
+    selector = ctx["metrics"]
+    if key and isinstance(selector, dict) and selector.get("name", "None") not in ("", "None", None):
+        # read the key column with the selected metrics, as whole columns so they can be split
+        options = dict(selector.get("options", {}) or {})
+        selected = list(options.get("selected_cols") or [])
+        if selected and key not in selected:
+            selected.append(key)
+        options.update({"selected_cols": selected, "stream": 0})
+        metrics = sweep_writer.split_metrics(fc.format_metrics(folder, {**selector, "options": options}), key)
+    return {
+        "key": key,
+        "rows": rows,
+        "metrics": metrics,
+        "results": fc.format_results_by_key(folder, ctx["results"], key),
+    }
+
+
+def _run_sweep(folder: str, prepared: Dict[str, Any], ctx: Dict[str, Any], on_progress=None) -> tuple[bool, str, Any]:
+    """Send stage of sweep mode: one completed run per config row, inserted in batches."""
+    journal = ctx.get("journal")
+    previous = journal.state(folder) if journal is not None else None
+    experiment_name = prepared["experiment_name"]
+    sweep = prepared["sweep"]
+    key = sweep["key"]
+    observers = ctx["observers"]
+    if journal is not None:
+        journal.record(folder, "parsed")
+    try:
+        database = observers.database
+        overwrite_id = ctx["dedupe"].overwrite_id(folder) if ctx.get("dedupe") is not None else None
+        if (previous is not None and previous.parsed) or overwrite_id is not None:
+            # an interrupted attempt or an outdated copy of the folder is replaced as a whole
+            sweep_writer.remove_sweep_runs(database, prepared["identity"]["uid"])
+            if overwrite_id is not None:
+                database["metrics"].delete_many({"run_id": overwrite_id})
+                database["runs"].delete_one({"_id": overwrite_id})
+        writer = sweep_writer.SweepRunWriter(observers, experiment_name, ctx["sweep_batch_runs"])
+        artifacts, config_arts = sweep_writer.artifact_entries(writer, prepared["artifacts"])
+        data_files: Dict[str, Any] = {"artifacts": config_arts}
+        rd_config = None
+        if len(prepared["raw_data"]) > 0:
+            rd_result, rd_config = save_raw_data(
+                prepared["raw_data"], ctx["raw_data_save_options"], ctx["minio"], on_progress=on_progress,
+                skip=previous.uploaded if previous is not None else None, clients=ctx.get("minio_clients"),
+            )
+            print(f"raw_data save: {rd_result}")
+            failures = failed_files(rd_result)
+            if failures:
+                raise RuntimeError(f"{len(failures)} raw-data files not saved: {failures[0]['error']}")
+            data_files["raw_data"] = rd_config
+
+        started = time.monotonic()
+        points = 0
+        for i, row in enumerate(sweep["rows"]):
+            value = row.get(key) if key else None
+            link = sweep_writer.row_key(value)
+            cfg = {"experiment": experiment_name, **row}
+            if rd_config is not None:
+                cfg["raw_data"] = rd_config
+            series, decimation = sweep_writer.metric_series(sweep["metrics"].get(link) if key else None)
+            results = prepared["results"]
+            if sweep["results"] is not None:
+                results = sweep["results"].get(link, {})
+            info = {
+                "dataFiles": data_files,
+                "result": results,
+                "altar": {**prepared["identity"], "sweep": {"key": key or None, "value": value, "row": i}},
+            }
+            if decimation is not None:
+                info["decimation"] = decimation
+            points += sum(len(values) for _, values in series.values())
+            writer.add(cfg, info, artifacts, series)
+        run_ids = writer.close()
+        emit(on_progress, "metrics_written", points=points, seconds=time.monotonic() - started)
+    except PyMongoError as e:
+        raise RuntimeError(f"Failed to write sweep runs to MongoDB: {e}") from e
+    except Exception as e:
+        import traceback
+        print("ERROR sending sweep:", e)
+        print(traceback.format_exc())
+        if journal is not None:
+            journal.record(folder, "failed", message=str(e))
+        return False, f"{experiment_name} failed: {e}", None
+    if journal is not None:
+        journal.record(folder, "done", run_id=run_ids)
+    if not run_ids:
+        return True, f"{experiment_name}, no config rows to send", run_ids
+    return True, f"{experiment_name}, {len(run_ids)} runs {run_ids[0]}-{run_ids[-1]} sent", run_ids
+
+
+def _run_folder(folder: str, prepared: Dict[str, Any], ctx: Dict[str, Any], on_progress=None) -> tuple[bool, str, Any]:
+    """Send stage: create the Sacred run, write metrics/artifacts and save raw data."""
+    raw_data_save_options = ctx["raw_data_save_options"]
+    minio_payload = ctx["minio"]
+    journal = ctx.get("journal")
+    previous = journal.state(folder) if journal is not None else None
+    # resume an interrupted run first, else overwrite a changed duplicate (dedupe "update")
+    overwrite_id = previous.run_id if previous is not None else None
+    if overwrite_id is None and ctx.get("dedupe") is not None:
+        overwrite_id = ctx["dedupe"].overwrite_id(folder)
+
+    experiment_name = prepared["experiment_name"]
+    if prepared["error"] is not None:
+        return False, f"{experiment_name or 'TEST_EXPERIMENT'} failed: {prepared['error']}", None
+    if prepared.get("sweep") is not None:
+        return _run_sweep(folder, prepared, ctx, on_progress)
+    cfg = prepared["config"]
+    mets = prepared["metrics"]
+    arts = prepared["artifacts"]
+    res = prepared["results"]
+    rawda = prepared["raw_data"]
+    if journal is not None:
+        journal.record(folder, "parsed")
+    ex = Experiment(experiment_name, save_git_info=False)
+    try:
+        ex.observers.append(_observer_for(ctx["observers"], overwrite_id))
+    except Exception as e:
+        import traceback
+        print(f"ERROR connecting to MongoDB: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise RuntimeError(f"Failed to connect to MongoDB: {e}") from e
+
+    @ex.main
+    def run(_run, _mets=mets, _arts=arts, _folder=folder, _res=res):
+        print(f"res: {_res}\n")
+        if journal is not None:
+            journal.record(_folder, "run_created", run_id=_run._id)
+        data_files = {}
+        if isinstance(_mets, dict) and ('columns' in _mets or 'stream' in _mets):
+            started = time.monotonic()
+            points = _write_metrics(_run, _mets)
+            emit(on_progress, "metrics_written", points=points, seconds=time.monotonic() - started)
+        config_arts = {}
+        for a in _arts.values():
+            src = a.get('source_path') if isinstance(a, dict) else str(a)
+            name = a.get('new_name') if isinstance(a, dict) else None
+            if not src:
+                continue
+            if os.path.exists(src):
+                try:
+                    _run.add_artifact(src, name=name)
+                    config_arts[a.get('minio_folder')] = name
+                except Exception as e:
+                    print(f"WARNING: Failed to add artifact {src}: {e}", file=sys.stderr)
+        data_files['artifacts'] = config_arts
+
+        if len(rawda) > 0:
+            try:
+                rd_result, rd_config = save_raw_data(
+                    rawda, raw_data_save_options, minio_payload, on_progress=on_progress,
+                    skip=previous.uploaded if previous is not None else None, clients=ctx.get("minio_clients"),
+                )
+                print(f"raw_data save: {rd_result}")
+                failures = failed_files(rd_result)
+                if failures:
+                    raise RuntimeError(f"{len(failures)} raw-data files not saved: {failures[0]['error']}")
+                cfg['raw_data'] = rd_config
+                data_files['raw_data'] = rd_config
+            except Exception as e:
+                import traceback
+                print(f"ERROR saving raw_data: {e}", file=sys.stderr)
+                traceback.print_exc(file=sys.stderr)
+                # Re-raise with more context
+                raise RuntimeError(f"Failed to save raw_data: {e}") from e
+
+        _run.info['dataFiles'] = data_files
+        _run.info['result'] = _res
+        _run.info['altar'] = prepared["identity"]
+
+    ex.add_config(cfg)
+
+    try:
+        current_run = ex.run(options={'--capture': 'no'})
+        current_run.result = res
+        if journal is not None:
+            journal.record(folder, "done", run_id=current_run._id)
+        return True, f"{experiment_name or 'TEST_EXPERIMENT'}, run {current_run._id} sent", current_run._id
+    except Exception as e:
+        import traceback
+        print("ERROR running experiment:", e)
+        print(traceback.format_exc())
+        if journal is not None:
+            journal.record(folder, "failed", message=str(e))
+        return False, f"{experiment_name or 'TEST_EXPERIMENT'} failed: {e}", None
+
+
+def _log_scalars(_run, columns_dict: Dict[str, Any], x_axis=None) -> int:
+    """Per-point fallback when the run has no Mongo observer to bulk-write to."""
+    points = 0
+    if x_axis is not None:
+        for column, series in columns_dict.items():
+            # log up to the min length to avoid index errors
+            limit = min(len(series), len(x_axis))
+            for i in range(limit):
+                _run.log_scalar(column, series[i], step=x_axis[i])
+            points += limit
+    else:
+        for column, series in columns_dict.items():
+            for value in series:
+                _run.log_scalar(column, value)
+            points += len(series)
+    return points
+
+
+def _write_metrics(_run, mets: Dict[str, Any]) -> int:
+    """Write formatted metrics (whole columns, or a MetricsStream block by block); return the points.
+
+    With mets["decimation"] each column is downsampled first and the
+    parameters are recorded in run.info['decimation'].
+    """
+    writer = bulk_writer_for_run(_run)
+    if 'stream' in mets:
+        blocks = mets['stream']
+    else:
+        blocks = [(mets.get('columns', {}) or {}, (mets.get('x_axis', []) or []) if 'x_axis' in mets else None)]
+    decimator = None
+    if mets.get('decimation'):
+        options = mets['decimation']
+        # a target point count needs the series lengths up front (one extra pass over a stream)
+        lengths = mets['stream'].count_points() if 'stream' in mets and 'bucket' not in options else None
+        decimator = BlockDecimator(options, lengths)
+        blocks = decimator.blocks(blocks)
+    points = 0
+    for columns_dict, x_axis in blocks:
+        if writer is not None:
+            # one insert per metric instead of one log_scalar per point
+            points += writer.write(columns_dict, x_axis)
+        else:
+            points += _log_scalars(_run, columns_dict, x_axis)
+    if decimator is not None:
+        _run.info['decimation'] = decimator.info()
+    return points
+
+
+def _observer_for(observers: SacredObserverFactory, overwrite_id=None):
+    """Observer for a folder; an existing run (interrupted or outdated) is overwritten in place."""
+    if overwrite_id is not None:
+        try:
+            observer = observers.observer(overwrite=overwrite_id)
+        except RuntimeError:
+            # the run was removed from the database meanwhile
+            return observers.observer()
+        # drop metrics of the previous attempt, they are written again
+        observers.database["metrics"].delete_many({"run_id": overwrite_id})
+        return observer
+    return observers.observer()
+
+
+def _get_workers(batch_payload: Dict[str, Any], n_folders: int) -> int:
+    try:
+        workers = int(batch_payload.get("workers", DEFAULT_WORKERS) or DEFAULT_WORKERS)
+    except (TypeError, ValueError):
+        workers = DEFAULT_WORKERS
+    return max(1, min(workers, n_folders))
+
+
+def _get_prefetch(batch_payload: Dict[str, Any]) -> int:
+    try:
+        return max(0, int(batch_payload.get("prefetch", DEFAULT_PREFETCH)))
+    except (TypeError, ValueError):
+        return DEFAULT_PREFETCH
+
+
+def _run_pipeline(folders: list, ctx: Dict[str, Any], workers: int, prefetch: int) -> list:
+    """Parse folders in ``workers`` parse threads while ``workers`` threads send them.
+
+    At most ``prefetch`` parsed folders wait in the queue (plus one per parse
+    thread waiting to put its folder), which caps memory while hiding parse
+    time (e.g. large Excel workbooks) behind network I/O, and folders are
+    still parsed ``workers`` at a time.
+    Returns outcomes in folder order; the first exception of either stage
+    stops the pipeline and is re-raised.
+    """
+    todo: queue.Queue = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    produced_all = threading.Event()
+    outcomes: list = [None] * len(folders)
+    errors: list = []
+    next_folder = iter(enumerate(folders))
+    lock = threading.Lock()
+    running = [workers]
+
+    def _produce():
+        try:
+            while not stop.is_set():
+                with lock:
+                    i, folder = next(next_folder, (None, None))
+                if folder is None:
+                    return
+                # folders already sent (journal or dedupe) are not parsed again
+                done = _already_sent(folder, ctx) is not None
+                item = (i, folder, None if done else _prepare_folder(folder, ctx))
+                while not stop.is_set():
+                    try:
+                        todo.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            with lock:
+                running[0] -= 1
+                if running[0] == 0:
+                    produced_all.set()
+
+    def _consume():
+        while not stop.is_set():
+            try:
+                i, folder, prepared = todo.get(timeout=0.5)
+            except queue.Empty:
+                if produced_all.is_set() and todo.empty():
+                    return
+                continue
+            try:
+                outcomes[i] = _send_folder(folder, ctx, prepared)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+                return
+
+    producers = [threading.Thread(target=_produce, name=f"altar-parse-{n}", daemon=True) for n in range(workers)]
+    consumers = [threading.Thread(target=_consume, name=f"altar-send-{n}", daemon=True) for n in range(workers)]
+    for t in producers + consumers:
+        t.start()
+    for t in consumers:
+        t.join()
+    stop.set()
+    for t in producers:
+        t.join()
+    if errors:
+        raise errors[0]
+    return outcomes
+
+
+def _match_folder_pattern(folders: list, ctx: Dict[str, Any]):
+    """Extract the folder-name values of the whole batch at once.
+
+    Sets ctx["folder_values"] and returns the folders whose name does not
+    match, or None when no pattern is used. Raises ValueError for an invalid
+    pattern.
+    """
+    config = ctx["config"]
+    if not config.get("parse_from_folder") or not config.get("folder_pattern"):
+        return None
+    try:
+        pattern = FolderPattern(config["folder_pattern"])
+    except re.error as e:
+        raise ValueError(f"Invalid folder pattern {config['folder_pattern']!r}: {e}") from e
+    if not pattern.variables:
+        return None
+    ctx["folder_values"], unmatched = pattern.match_all(folders)
+    if unmatched:
+        names = ", ".join(f.replace("\\", "/").split("/")[-1] for f in unmatched)
+        print(f"WARNING: folder pattern does not match {len(unmatched)} folder(s): {names}", file=sys.stderr)
+        emit(ctx.get("on_progress"), "pattern_unmatched", folders=unmatched)
+    return unmatched
+
+
+def _plan_batch(folders: list, ctx: Dict[str, Any], workers: int, unmatched=None) -> Dict[str, Any]:
+    """Dry run: parse every folder and report what a send would write (no network I/O)."""
+    def _plan(folder):
+        plan = plan_folder(folder, _prepare_folder(folder, ctx), ctx["raw_data_save_options"])
+        emit(ctx.get("on_progress"), "folder_planned", **plan)
+        return plan
+
+    if workers == 1:
+        plans = [_plan(folder) for folder in folders]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="altar-plan") as pool:
+            plans = list(pool.map(_plan, folders))
+    path = ctx["throughput_path"]
+    summary = summarize(plans, ctx["raw_data_save_options"], load_measured_throughput(path) if path else {})
+    issues = [f"{p['experiment']}: {p['error']}" for p in plans if p.get("error")]
+    issues += [f"{p['experiment']}: {issue}" for p in plans for issue in p.get("over_limits", [])]
+    if unmatched:
+        summary["total"]["pattern_unmatched"] = list(unmatched)
+        issues.append(f"folder pattern does not match {len(unmatched)} folder(s)")
+    message = "; ".join([format_plan_message(summary)] + issues)
+    ok = not summary["total"]["failed"] and not summary["total"]["over_limits"] and not unmatched
+    return {"ok": ok, "message": message, "plan": {"folders": plans, **summary}}
+
+
+def send_experiment(payload: Dict[str, Any], on_progress: ProgressCallback | None = None) -> Dict[str, Any]:
+    """Send every folder of the payload as a Sacred run.
+
+    payload["batch"]["workers"] sets how many folders are formatted and sent
+    concurrently (default 1, i.e. strictly sequential). Per-folder messages are
+    always returned in the order of payload["experiment"]["folders"].
+    payload["batch"]["prefetch"] is how many folders the parse stage may prepare
+    ahead of the send stage (default 2, 0 parses each folder right before
+    sending it).
+    payload["batch"]["journal"] (path) and ["resume"] enable the crash-safe
+    journal of services.batch_journal (["overwrite_journal"] to start over an
+    unfinished one).
+    payload["batch"]["dedupe"] ("skip" or "update") checks the folders against
+    runs already in the database first (services.dedupe).
+    payload["batch"]["plan"] makes a dry run: nothing is written and the result
+    has a "plan" entry (services.send_planner). The raw-data throughput measured
+    by a send, used by the estimates of later plans, is kept in
+    payload["batch"]["throughput_state"] (a path; False to not keep it).
+    With selectors["config"]["options"]["sweep"] each config row becomes its
+    own run (services.sweep_writer); payload["batch"]["sweep_batch_runs"] is
+    how many runs are inserted per bulk write.
+    on_progress, if given, receives the events described in services.progress.
+    """
     # Validate presence of top-level domains
     if not isinstance(payload, dict):
         return {"ok": False, "message": "Invalid payload"}
 
     data_payload = payload.get("experiment", {}) or {}
-    mongo_payload = payload.get("mongo", {}) or {}
+    batch_payload = payload.get("batch", {}) or {}
     # experiment_name = (data_payload.get("name") or "").strip()
     selectors = data_payload.get("selectors", {}) or {}
-    config = selectors.get("config", {}) or {}
-    metrics = selectors.get("metrics", {}) or {}
-    results = selectors.get("results", {}) or {}
     raw_data = selectors.get("raw_data", {}) or {}
-    artifacts = selectors.get("artifacts", {}) or {}
     folders = data_payload.get("folders", [])
 
-    raw_data_save_options = raw_data.get("options", {}) or {}
-
-    # --- Build Mongo connection using shared helper ---
     mongo_payload = payload.get("mongo", {}) or {}
-    mongo_url, mongo_db = build_mongo_url_from_payload(mongo_payload)
 
     print(f"payload: {payload}\n")
-    # Attach Mongo observer
 
     # Keep originals for per-folder formatting
-    base_config = config
-    base_results = results
-    base_raw_data = raw_data
-    base_artifacts = artifacts
-    base_metrics = metrics
-    results_messages = []
-
-    if folders and len(folders) > 0:
-        all_ok = True
-        for folder in folders:
-            experiment_name = folder.replace("\\", "/").split("/")[-1]
-            cfg = {'experiment': experiment_name}
-            cfg.update(fc.format_config(folder, base_config))
-            mets = fc.format_metrics(folder, base_metrics)
-            arts = fc.format_raw_data(folder, base_artifacts)
-            res = fc.format_results(folder, base_results)
-            rawda = fc.format_raw_data(folder, base_raw_data)
-            ex = Experiment(experiment_name, save_git_info=False)
-            try:
-                ex.observers.append(MongoObserver(url=mongo_url, db_name=mongo_db))
-            except Exception as e:
-                import traceback
-                print(f"ERROR connecting to MongoDB: {e}", file=sys.stderr)
-                traceback.print_exc(file=sys.stderr)
-                raise RuntimeError(f"Failed to connect to MongoDB: {e}") from e
-
-            @ex.main
-            def run(_run, _mets=mets, _arts=arts, _folder=folder, _res=res):
-                print(f"res: {_res}\n")
-                data_files = {}
-                if isinstance(_mets, dict) and 'columns' in _mets:
-                    columns_dict = _mets.get('columns', {}) or {}
-                    if 'x_axis' in _mets:
-                        x_axis = _mets.get('x_axis', []) or []
-                        for column, series in columns_dict.items():
-                            # log up to the min length to avoid index errors
-                            limit = min(len(series), len(x_axis))
-                            for i in range(limit):
-                                _run.log_scalar(column, series[i], step=x_axis[i])
-                    else:
-                        for column, series in columns_dict.items():
-                            for value in series:
-                                _run.log_scalar(column, value)
-                config_arts = {}
-                for a in _arts.values():
-                    src = a.get('source_path') if isinstance(a, dict) else str(a)
-                    name = a.get('new_name') if isinstance(a, dict) else None
-                    if not src:
-                        continue
-                    if os.path.exists(src):
-                        try:
-                            _run.add_artifact(src, name=name)
-                            config_arts[a.get('minio_folder')] = name
-                        except Exception as e:
-                            print(f"WARNING: Failed to add artifact {src}: {e}", file=sys.stderr)
-                data_files['artifacts'] = config_arts
-
-                if len(rawda) > 0:
-                    try:
-                        rd_result, rd_config = save_raw_data(rawda, raw_data_save_options, payload.get("minio", {}) or {})
-                        cfg['raw_data'] = rd_config
-                        print(f"raw_data save: {rd_result}")
-                        data_files['raw_data'] = rd_config
-                    except Exception as e:
-                        import traceback
-                        print(f"ERROR saving raw_data: {e}", file=sys.stderr)
-                        traceback.print_exc(file=sys.stderr)
-                        # Re-raise with more context
-                        raise RuntimeError(f"Failed to save raw_data: {e}") from e
-
-                _run.info['dataFiles'] = data_files
-                _run.info['result'] = _res
-            
-
-            ex.add_config(cfg)
+    ctx = {
+        "config": selectors.get("config", {}) or {},
+        "metrics": selectors.get("metrics", {}) or {},
+        "results": selectors.get("results", {}) or {},
+        "raw_data": raw_data,
+        "artifacts": selectors.get("artifacts", {}) or {},
+        "raw_data_save_options": raw_data.get("options", {}) or {},
+        "minio": payload.get("minio", {}) or {},
+        "selectors": selectors,
+        "on_progress": on_progress,
+        "shared_config_lock": threading.Lock(),
+        "sweep_batch_runs": batch_payload.get("sweep_batch_runs") or sweep_writer.DEFAULT_BATCH_RUNS,
+    }
+
+    if not folders:
+        return {"ok": False, "message": "No experiment folder to send"}
 
+    try:
+        unmatched = _match_folder_pattern(folders, ctx)
+    except ValueError as e:
+        return {"ok": False, "message": str(e)}
+
+    ctx["throughput_path"] = throughput_path(batch_payload)
+    if batch_payload.get("plan"):
+        return _plan_batch(folders, ctx, _get_workers(batch_payload, len(folders)), unmatched)
+
+    # raw-data transfer speed, kept for the transfer time estimate of later plans
+    meter = ThroughputMeter()
+
+    def _on_progress(ev: Dict[str, Any]):
+        meter(ev)
+        if on_progress is not None:
+            on_progress(ev)
+
+    ctx["on_progress"] = _on_progress
+
+    # --- One pooled Mongo client for the whole batch, closed at the end ---
+    try:
+        observers = SacredObserverFactory.from_payload(mongo_payload)
+    except PyMongoError as e:
+        raise RuntimeError(f"Failed to connect to MongoDB: {e}") from e
+
+    try:
+        journal = open_journal(batch_payload)
+    except OSError as e:
+        observers.close()
+        return {"ok": False, "message": f"Cannot open batch journal: {e}"}
+
+    # --- One S3 client (and bucket check) per MinIO endpoint for the whole batch ---
+    with observers, MinioClients() as minio_clients, (journal or contextlib.nullcontext()):
+        ctx["observers"] = observers
+        ctx["minio_clients"] = minio_clients
+        ctx["journal"] = journal
+        dedupe_mode = (batch_payload.get("dedupe") or "").strip()
+        if dedupe_mode:
             try:
-                current_run = ex.run(options={'--capture': 'no'})
-                current_run.result = res
-                # After run, optionally save raw_data (if any) according to options
-                results_messages.append(f"{experiment_name or 'TEST_EXPERIMENT'}, run {current_run._id} sent")
-            except Exception as e:
-                import traceback
-                print("ERROR running experiment:", e)
-                print(traceback.format_exc())
-                all_ok = False
-                results_messages.append(f"{experiment_name or 'TEST_EXPERIMENT'} failed: {e}")
-        return {"ok": all_ok, "message": "; ".join(results_messages)}
\ No newline at end of file
+                ctx["dedupe"] = plan_dedupe(dedupe_mode, folders, selectors, observers.database["runs"])
+            except ValueError as e:
+                return {"ok": False, "message": str(e)}
+        emit(ctx["on_progress"], "batch_started", folders=len(folders))
+        workers = _get_workers(batch_payload, len(folders))
+        prefetch = _get_prefetch(batch_payload)
+        if prefetch > 0 and len(folders) > 1:
+            outcomes = _run_pipeline(folders, ctx, workers, prefetch)
+        elif workers == 1:
+            outcomes = [_send_folder(folder, ctx) for folder in folders]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="altar-send") as pool:
+                # map() keeps folder order and re-raises connection errors
+                outcomes = list(pool.map(lambda f: _send_folder(f, ctx), folders))
+        if journal is not None:
+            journal.finish()
+
+    if ctx["throughput_path"] is not None:
+        record_measured_throughput(meter.measured(), ctx["throughput_path"])
+    all_ok = all(ok for ok, _ in outcomes)
+    results_messages = [msg for _, msg in outcomes]
+    return {"ok": all_ok, "message": "; ".join(results_messages)}
@@ -0,0 +1,145 @@
+"""Compiled folder-name patterns.
+
+Pattern syntax:
+
+- ``$variable$``: any characters (non-greedy)
+- ``$variable%N$``: exactly N characters
+- ``$variable:type$`` / ``$variable%N:type$``: convert the value to ``int``,
+  ``float``, ``date`` or ``str``
+
+Without a type, values are stored as the captured strings, as before typed
+variables existed (``00123`` keeps its leading zeros); declare ``:int`` or
+``:float`` to store numbers that can be compared and indexed in MongoDB.
+``date`` accepts 2024-01-21, 20240121,
+2024_01_21 or 21-01-2024 (optionally followed by a time) and stores an ISO
+8601 string (Sacred would pickle a datetime object in the run config).
+A value that cannot be converted to its declared type makes the folder
+count as not matching.
+
+A pattern is compiled once (``compile_pattern`` keeps the last ones) and
+``match_all`` matches every folder of a batch with a single regex scan.
+"""
+from __future__ import annotations
+
+import bisect
+import datetime as dt
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+TYPES = ("int", "float", "date", "str")
+
+_VARIABLE = re.compile(r"\$([^$%:]+)(?:%(\d+))?(?::(\w+))?\$")
+_DATE_FORMATS = (
+    "%Y-%m-%d", "%Y%m%d", "%Y_%m_%d", "%d-%m-%Y",
+    "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d_%H_%M_%S", "%Y-%m-%d_%H_%M", "%Y%m%d_%H%M%S", "%Y%m%d-%H%M%S",
+)
+
+
+def folder_name(folder_path: str) -> str:
+    return os.path.basename(folder_path.replace("\\", "/").rstrip("/"))
+
+
+def _to_date(value: str) -> str:
+    for fmt in _DATE_FORMATS:
+        try:
+            parsed = dt.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if "%H" in fmt:
+            return parsed.isoformat()
+        return parsed.date().isoformat()
+    raise ValueError(f"not a date: {value!r}")
+
+
+def coerce(value: str, kind: Optional[str] = None) -> Any:
+    """Convert one captured value to its declared type (no type: the string as captured)."""
+    if kind is None or kind == "str":
+        return value
+    if kind == "int":
+        return int(value)
+    if kind == "float":
+        return float(value)
+    if kind == "date":
+        return _to_date(value)
+    return value
+
+
+class FolderPattern:
+    """A ``$var$`` folder-name pattern compiled to one regular expression."""
+
+    def __init__(self, pattern: str, coerce_values: bool = True):
+        self.pattern = pattern
+        self.coerce_values = coerce_values
+        self.variables: List[Tuple[str, Optional[int], Optional[str]]] = []
+        parts: List[str] = []
+        last = 0
+        for m in _VARIABLE.finditer(pattern):
+            name, length, kind = m.group(1), m.group(2), m.group(3)
+            if kind is not None and kind not in TYPES:
+                raise ValueError(f"Unknown type '{kind}' for ${name}$ (expected one of {', '.join(TYPES)})")
+            parts.append(re.escape(pattern[last:m.start()]))
+            parts.append(f"(?P<{name}>.{{{length}}})" if length else f"(?P<{name}>.+?)")
+            self.variables.append((name, int(length) if length else None, kind))
+            last = m.end()
+        parts.append(re.escape(pattern[last:]))
+        # raises re.error for names that are not identifiers or are repeated
+        self.regex = re.compile("".join(parts)) if self.variables else None
+        # one folder name per line: "." never crosses a newline, so each line matches on its own
+        self._lines = re.compile("^" + "".join(parts) + "$", re.MULTILINE) if self.variables else None
+
+    def _values(self, groups: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        if not self.coerce_values:
+            return dict(groups)
+        try:
+            return {name: coerce(groups[name], kind) for name, _, kind in self.variables}
+        except ValueError:
+            return None
+
+    def match(self, folder_path: str) -> Optional[Dict[str, Any]]:
+        """Values extracted from the folder name, or None if it does not match."""
+        if self.regex is None:
+            return None
+        m = self.regex.fullmatch(folder_name(folder_path))
+        return self._values(m.groupdict()) if m else None
+
+    def match_all(self, folders: Sequence[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """({folder: values} for matching folders, [folders that do not match])."""
+        if self._lines is None:
+            return {}, list(folders)
+        names = [folder_name(f) for f in folders]
+        if any("\n" in n or "\r" in n for n in names):
+            matched = {f: v for f, v in ((f, self.match(f)) for f in folders) if v is not None}
+            return matched, [f for f in folders if f not in matched]
+        text = "\n".join(names)
+        starts = [0]
+        for n in names[:-1]:
+            starts.append(starts[-1] + len(n) + 1)
+        matched: Dict[str, Dict[str, Any]] = {}
+        for m in self._lines.finditer(text):
+            i = bisect.bisect_right(starts, m.start()) - 1
+            values = self._values(m.groupdict())
+            if values is not None:
+                matched[folders[i]] = values
+        return matched, [f for f in folders if f not in matched]
+
+
+@lru_cache(maxsize=32)
+def compile_pattern(pattern: str) -> Optional[FolderPattern]:
+    """Compiled pattern, or None if it has no variable or is not a valid pattern."""
+    try:
+        compiled = FolderPattern(pattern)
+    except (re.error, ValueError):
+        return None
+    return compiled if compiled.variables else None
+
+
+def parse_folder_name(folder_path: str, pattern: str) -> Dict[str, Any]:
+    """Values extracted from one folder name ({} if the pattern does not match)."""
+    if not pattern or not folder_path:
+        return {}
+    compiled = compile_pattern(pattern)
+    if compiled is None:
+        return {}
+    return compiled.match(folder_path) or {}
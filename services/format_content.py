@@ -1,13 +1,12 @@
-import pandas as pd
-import numpy as np
-import json
+import copy
 import os
-from services.hash import make_compact_uid_b32
-import re
-try:
-    import yaml
-except ImportError:
-    yaml = None
+from services.hash import has_timestamp, make_compact_uid_b32, short_hash_b32
+from services.metrics_reader import BINARY_TYPES, DEFAULT_CHUNK_ROWS, MetricsStream, read_columns
+from services.decimation import parse_options as parse_decimation
+from services import config_stream
+from services.folder_pattern import parse_folder_name
+from services.sweep_writer import row_key
+from services.table_cache import read_document, read_rows, records
 
 
 def coerce_bool_option(value):
@@ -19,53 +18,67 @@ def coerce_bool_option(value):
 
 def _parse_folder_name_with_pattern(folder_path: str, pattern: str) -> dict:
     """Parse folder name using the given pattern and return extracted values.
-    
-    Pattern syntax:
-    - $variable$ - matches any characters (greedy minimal)
-    - $variable%N$ - matches exactly N characters
+
+    See services.folder_pattern for the syntax; the compiled pattern is reused
+    across calls.
     """
-    if not pattern or not folder_path:
-        return {}
-    
-    folder_name = os.path.basename(folder_path.replace("\\", "/"))
-    
-    # Extract variable definitions from pattern
-    # Format: $name$ or $name%length$
-    var_pattern = r'\$([^$%]+)(?:%(\d+))?\$'
-    variables = re.findall(var_pattern, pattern)
-    
-    if not variables:
-        return {}
-    
-    # Build regex from pattern by replacing $var$ or $var%N$ with named groups
-    regex_pattern = re.escape(pattern)
-    for var_name, length in variables:
-        if length:
-            # Exact length: match exactly N characters
-            escaped_var = re.escape(f"${var_name}%{length}$")
-            regex_pattern = regex_pattern.replace(escaped_var, f"(?P<{var_name}>.{{{length}}})")
-        else:
-            # No length: match any characters (non-greedy)
-            escaped_var = re.escape(f"${var_name}$")
-            regex_pattern = regex_pattern.replace(escaped_var, f"(?P<{var_name}>.+?)")
-    
-    # Try to match
-    try:
-        match = re.match(f"^{regex_pattern}$", folder_name)
-        if match:
-            return match.groupdict()
-    except re.error:
-        pass
-    
-    return {}
+    return parse_folder_name(folder_path, pattern)
+
+
+def _read_config_file(file_path, config_type, config):
+    options = config.get("options", {}) or {}
+    # the readers import PyYAML/openpyxl on first use (services.readers)
+    if config_type in ("json", "yaml", "yml") and config_stream.should_stream(file_path, options):
+        # large files / key projection: only the selected fields are built, flattened in the same pass
+        data = config_stream.load(file_path, include=config_stream.key_paths(options.get("include")),
+                                  exclude=config_stream.key_paths(options.get("exclude")),
+                                  flatten=bool(options.get("flatten")))
+    elif config_type in ("json", "yaml", "yml"):
+        # files are parsed once per process and shared with the UI previews (services.table_cache)
+        data = read_document(file_path)
+        if options.get("flatten") and (isinstance(data, dict) or config_type == "json"):
+            data = config_stream.flatten_record(data)
+    elif config_type == "xlsx" or config_type == "xlsm":
+        data = records(read_rows(file_path, sheet=config.get("sheet")))
+    elif config_type == "csv":
+        sep = (config.get("options", {}) or {}).get("sep", ",")
+        data = records(read_rows(file_path, sep=sep))
+    else:
+        raise ValueError(f"Unsupported config type: {config_type}")
+    return data
 
 
-def format_config(experiment_folder, config):
+def load_shared_config(config):
+    """Parse the custom config file that every folder of a batch shares.
+
+    Returns None when the config is not read from a custom path. The result
+    is passed to format_config as ``shared`` so the file is parsed (and
+    flattened) once per batch instead of once per folder.
+    """
+    if not isinstance(config, dict) or not config.get("use_custom_path") or not config.get("custom_path"):
+        return None
+    custom_path = config["custom_path"]
+    return _read_config_file(custom_path, custom_path.split(".")[-1].lower(), config)
+
+
+def _copy_shared(shared):
+    # records only hold scalars, so a shallow copy per record is enough
+    if isinstance(shared, list):
+        return [dict(r) if isinstance(r, dict) else r for r in shared]
+    return copy.deepcopy(shared)
+
+
+def format_config(experiment_folder, config, shared=None, folder_values=None):
     """Format config from file and/or parsed folder values.
     
     Returns a dict that may include:
     - Values from config file (JSON, YAML, CSV, Excel)
     - Values parsed from folder name (if parse_from_folder is enabled)
+
+    ``shared`` is the output of load_shared_config for the batch; when given,
+    the custom config file is not parsed again and only the folder values
+    are overlaid on a copy of it. ``folder_values`` are the values already
+    extracted from the folder name for the whole batch (FolderPattern.match_all).
     """
     data = {}
     
@@ -84,31 +97,17 @@ def format_config(experiment_folder, config):
         file_path = os.path.join(experiment_folder, config_name)
         config_type = config_name.split(".")[-1].lower()
     
-    if file_path and config_type:
-        if config_type == "json":
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if config.get("options", {}).get("flatten"):
-                data = pd.json_normalize(data, sep="_").to_dict(orient="records")[0]
-        elif config_type in ("yaml", "yml"):
-            if yaml is None:
-                raise ValueError("PyYAML is not installed. Run: pip install pyyaml")
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-            if config.get("options", {}).get("flatten") and isinstance(data, dict):
-                data = pd.json_normalize(data, sep="_").to_dict(orient="records")[0]
-        elif config_type == "xlsx" or config_type == "xlsm":
-            data = pd.read_excel(file_path, sheet_name=config.get("sheet")).to_dict(orient="records")
-        elif config_type == "csv":
-            sep = (config.get("options", {}) or {}).get("sep", ",")
-            sep = "\t" if sep == "\\t" else sep
-            data = pd.read_csv(file_path, sep=sep).to_dict(orient="records")
-        else:
-            raise ValueError(f"Unsupported config type: {config_type}")
+    if use_custom_path and custom_path and shared is not None:
+        data = _copy_shared(shared)
+    elif file_path and config_type:
+        data = _read_config_file(file_path, config_type, config)
     
     # Parse folder name if enabled (this is done per-folder for batch mode)
     if config.get("parse_from_folder") and config.get("folder_pattern"):
-        parsed_values = _parse_folder_name_with_pattern(experiment_folder, config.get("folder_pattern", ""))
+        if folder_values is not None:
+            parsed_values = folder_values
+        else:
+            parsed_values = _parse_folder_name_with_pattern(experiment_folder, config.get("folder_pattern", ""))
         if parsed_values:
             # Merge parsed values into data (parsed values take precedence)
             if isinstance(data, dict):
@@ -125,37 +124,48 @@ def format_config(experiment_folder, config):
     return data
 
 
+# metrics files above this size are streamed unless options["stream"] says otherwise
+STREAM_THRESHOLD = 512 * 1024**2
+
+
+def _use_stream(file_path, options):
+    stream = options.get("stream")
+    if stream is None or stream == "auto":
+        return os.path.getsize(file_path) >= STREAM_THRESHOLD
+    return bool(stream)
+
+
 def format_metrics(experiment_folder, metrics):
+    """Return {"x_axis": [...], "columns": {name: [...]}} for the selected metrics columns.
+
+    CSV, Excel, Parquet, Feather, NPY/NPZ and HDF5 files are supported (see
+    services.metrics_reader for the column names of the binary formats).
+
+    With options["stream"] (or for files above STREAM_THRESHOLD) the file is not
+    read here: {"stream": MetricsStream} is returned and yields blocks of
+    options["chunk_rows"] rows when the run is written.
+    options["decimation"] (see services.decimation) is validated and returned
+    under "decimation"; it is applied when the metrics are written.
+    """
     metrics_data = {}
     metrics_name = metrics.get("name", "None") if isinstance(metrics, dict) else "None"
     if metrics_name and metrics_name != "None":
         file_path = os.path.join(experiment_folder, metrics_name)
-        metrics_type = metrics_name.split(".")[-1]
-        # determine header handling once
-        header_arg = coerce_bool_option(metrics.get("options", {}).get("header", 0))
-        if metrics_type == "xlsx" or metrics_type == "xlsm":
-            df = pd.read_excel(
-                file_path,
-                sheet_name=metrics.get("sheet"),
-                header=header_arg,
-            )
-        elif metrics_type == "csv":
-            # respect configured separator for metrics CSV
-            sep = (metrics.get("options", {}) or {}).get("sep", ",")
-            # handle both escaped and real tab characters
-            sep = "\t" if sep in ("\\t", "\t") else sep
-            df = pd.read_csv(file_path, header=header_arg, sep=sep)
-        else:
+        metrics_type = metrics_name.split(".")[-1].lower()
+        if metrics_type not in ("xlsx", "xlsm", "csv") + BINARY_TYPES:
             raise ValueError(f"Unsupported metrics type: {metrics_type}")
 
-        metrics_columns = {}
-
         options = metrics.get("options", {}) or {}
+        # determine header handling once (binary formats always have column names)
+        header_arg = 0 if metrics_type in BINARY_TYPES else coerce_bool_option(options.get("header", 0))
+        # respect configured separator for metrics CSV; handle both escaped and real tab characters
+        sep = options.get("sep", ",")
+        sep = "\t" if sep in ("\\t", "\t") else sep
         selected_cols = options.get("selected_cols", []) or []
         has_time = 1 if options.get("has_time", 0) == 1 else 0
         time_col_name = options.get("time_col", "")
 
-        # when no header, pandas will use integer column indices; UI sends strings
+        # when no header, columns are integer indices; UI sends strings
         def _normalize_col_key(name):
             if header_arg is None:  # no header
                 try:
@@ -164,16 +174,35 @@ def format_metrics(experiment_folder, metrics):
                     return name
             return name
 
+        time_key = _normalize_col_key(time_col_name) if has_time and time_col_name != "" else None
+        col_keys = {col: _normalize_col_key(col) for col in selected_cols}
+        decimation = parse_decimation(options.get("decimation"))
+        if decimation:
+            metrics_data["decimation"] = decimation
+        if _use_stream(file_path, options):
+            metrics_data["stream"] = MetricsStream(
+                file_path, metrics_type, col_keys, time_key=time_key,
+                header=header_arg is not None, sep=sep, sheet=metrics.get("sheet"),
+                chunk_rows=options.get("chunk_rows") or DEFAULT_CHUNK_ROWS,
+            )
+            return metrics_data
+
+        keys = ([time_key] if time_key is not None else []) + list(col_keys.values())
+        # read only the time column and the selected columns, not the whole file; one
+        # reader for every size, so a metric's values do not depend on its file size
+        data = read_columns(
+            file_path, metrics_type, keys,
+            header=header_arg is not None, sep=sep, sheet=metrics.get("sheet"),
+        )
+
         # set x_axis if requested (do this regardless of it being in selected columns)
-        if has_time and time_col_name != "":
-            time_key = _normalize_col_key(time_col_name)
-            if time_key in df.columns:
-                metrics_data["x_axis"] = df[time_key].to_list()
+        if time_key is not None and time_key in data:
+            metrics_data["x_axis"] = data[time_key]
 
-        for col in selected_cols:
-            col_key = _normalize_col_key(col)
-            if col_key in df.columns:
-                metrics_columns[col] = df[col_key].to_list()
+        metrics_columns = {}
+        for col, col_key in col_keys.items():
+            if col_key in data:
+                metrics_columns[col] = data[col_key]
 
         metrics_data["columns"] = metrics_columns
 
@@ -187,18 +216,16 @@ def format_results(experiment_folder, results):
         file_path = os.path.join(experiment_folder, results_name)
         results_type = results_name.split(".")[-1]
         if results_type == "xlsx" or results_type == "xlsm":
-            data_ = pd.read_excel(file_path, sheet_name=results.get("sheet"), header=None).to_dict(orient="records")
+            data_ = records(read_rows(file_path, sheet=results.get("sheet")), header=False)
             data = {e[0]: e[1] for e in data_}
 
         elif results_type == "csv":
             sep = (results.get("options", {}) or {}).get("sep", ",")
-            sep = "\t" if sep == "\\t" else sep
-            data_ = pd.read_csv(file_path, sep=sep, header=None).to_dict(orient="records")
+            data_ = records(read_rows(file_path, sep=sep), header=False)
             data = {e[0]: e[1] for e in data_}
 
         elif results_type == "json":
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = read_document(file_path)
         else:
             raise ValueError(f"Unsupported results type: {results_type}")
         
@@ -210,6 +237,43 @@ def format_results(experiment_folder, results):
     return results_data
 
 
+def format_results_by_key(experiment_folder, results, key):
+    """Sweep mode: {key value: {column: value}} for a results table with a ``key`` column.
+
+    Returns None when the results file is not a CSV/Excel table holding that
+    column; the key/value results of format_results then apply to every run.
+    """
+    results_name = results.get("name", "None") if isinstance(results, dict) else "None"
+    if not key or not results_name or results_name == "None":
+        return None
+    file_path = os.path.join(experiment_folder, results_name)
+    results_type = results_name.split(".")[-1].lower()
+    if results_type in ("xlsx", "xlsm"):
+        rows = records(read_rows(file_path, sheet=results.get("sheet")))
+    elif results_type == "csv":
+        rows = records(read_rows(file_path, sep=(results.get("options", {}) or {}).get("sep", ",")))
+    else:
+        return None
+    if not rows or key not in rows[0]:
+        return None
+    return {row_key(r[key]): {c: v for c, v in r.items() if c != key} for r in rows}
+
+
+def _raw_uid(experiment_name, source_path):
+    """Object name prefix of a raw-data file.
+
+    The folder's date/time when its name has one; otherwise a hash of the
+    source file (path, size, modification time) instead of the send time, so
+    a restarted send keeps its key and changed data never replaces the object
+    an earlier run points to.
+    """
+    if has_timestamp(experiment_name):
+        return make_compact_uid_b32(experiment_name)
+    st = os.stat(source_path)
+    source = f"{os.path.abspath(source_path)}|{st.st_size}|{st.st_mtime_ns}"
+    return f"{short_hash_b32(experiment_name)}-{short_hash_b32(source)}"
+
+
 def format_raw_data(experiment_folder, raw_data):
     files = {}
     raw_data_name = raw_data.get("name", "None") if isinstance(raw_data, dict) else "None"
@@ -219,17 +283,21 @@ def format_raw_data(experiment_folder, raw_data):
         if os.path.isfile(file_path):
             file = {
                 'source_path': file_path,
-                'new_name': make_compact_uid_b32(experiment_name) + "-" + raw_data_name,
+                'new_name': _raw_uid(experiment_name, file_path) + "-" + raw_data_name,
                 'minio_folder':  raw_data_name.split(".")[0],
+                # stable id of the file in the folder (batch journal)
+                'relative_path': raw_data_name,
             }
             files[raw_data_name] = file
 
         elif os.path.isdir(file_path):
             for f in raw_data.get("files", []):
+                source_path = os.path.join(file_path, f)
                 file = {
-                    'source_path': os.path.join(file_path, f),
-                    'new_name': make_compact_uid_b32(experiment_name) + "-" + f,
+                    'source_path': source_path,
+                    'new_name': _raw_uid(experiment_name, source_path) + "-" + f,
                     'minio_folder':  f.split(".")[0],
+                    'relative_path': f"{raw_data_name}/{f}",
                 }
                 files[f] = file
         else:
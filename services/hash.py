@@ -5,6 +5,11 @@ from datetime import datetime
 # Alphabet Crockford sans I/L/O/U
 _ALPH = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
 
+_TIMESTAMP_RX = re.compile(
+    r'(?P<year>\d{4})[-_/](?P<month>\d{2})[-_/](?P<day>\d{2})\D+'
+    r'(?P<hour>\d{2})[-_:](?P<minute>\d{2})(?:[-_:](?P<second>\d{2}))?'
+)
+
 
 def _get_current_timestamp_str() -> str:
     """Return current timestamp in format YYYYMMDDTHHMMSS."""
@@ -12,12 +17,13 @@ def _get_current_timestamp_str() -> str:
     return now.strftime("%Y%m%dT%H%M%S")
 
 
+def has_timestamp(name: str) -> bool:
+    """True if the name carries a date/time, i.e. make_compact_uid_b32 is stable for it."""
+    return _TIMESTAMP_RX.search(name) is not None
+
+
 def extract_timestamp_str(s: str):
-    rx = re.compile(
-        r'(?P<year>\d{4})[-_/](?P<month>\d{2})[-_/](?P<day>\d{2})\D+'
-        r'(?P<hour>\d{2})[-_:](?P<minute>\d{2})(?:[-_:](?P<second>\d{2}))?'
-    )
-    m = rx.search(s)
+    m = _TIMESTAMP_RX.search(s)
     if not m:
         return _get_current_timestamp_str()
     y = int(m.group("year")); mo = int(m.group("month")); d = int(m.group("day"))
@@ -42,11 +48,7 @@ def short_hash_b32(name: str, length=7) -> str:
 
 
 def make_compact_uid_b32(name: str, length=7) -> str:
-    rx = re.compile(
-        r'(?P<year>\d{4})[-_/](?P<month>\d{2})[-_/](?P<day>\d{2})\D+'
-        r'(?P<hour>\d{2})[-_:](?P<minute>\d{2})(?:[-_:](?P<second>\d{2}))?'
-    )
-    m = rx.search(name)
+    m = _TIMESTAMP_RX.search(name)
     if not m:
         ts = _get_current_timestamp_str()
     else:
@@ -55,6 +57,11 @@ def make_compact_uid_b32(name: str, length=7) -> str:
     return f"{short_hash_b32(name, length)}-{ts}"
 
 
+def make_stable_uid_b32(name: str, length=7) -> str:
+    """make_compact_uid_b32 for a name with a date/time, else only the name hash (never "now")."""
+    return make_compact_uid_b32(name, length) if has_timestamp(name) else short_hash_b32(name, length)
+
+
 def verify_name_matches_uid(name: str, uid: str, length=7) -> bool:
     """
     Retourne True si le nom correspond bien à l'UID donné.
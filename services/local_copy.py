@@ -0,0 +1,150 @@
+"""Copy one raw-data file to a local or network path.
+
+Modes (raw_data option ``local_mode``):
+
+- ``copy``: a full copy, through ``os.copy_file_range`` where the OS has it
+  (the kernel copies without going through the app, and NFS 4.2 / SMB3
+  servers can copy server-side), else with 8 MB buffers
+- ``hardlink``: a new name for the source file, nothing copied; source and
+  target must be on the same filesystem and the target shares the source's
+  later changes
+- ``reflink``: a copy-on-write clone (Btrfs, XFS, ...), instant and
+  independent of the source; Linux only
+
+A link or clone that the filesystem refuses (other device, unsupported)
+falls back to a copy; ``copy_file`` returns the mode actually used. Copies
+are written to ``<name>.part`` and renamed when complete, so an interrupted
+copy never leaves a truncated file under the final name.
+"""
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+import sys
+from typing import Callable, Optional
+
+LOCAL_MODES = ("copy", "hardlink", "reflink")
+
+# bytes per copy_file_range call / read, also the progress granularity
+COPY_CHUNK = 64 * 1024**2
+BUFFER_SIZE = 8 * 1024**2
+
+# Linux ioctl cloning a whole file (linux/fs.h)
+_FICLONE = 0x40049409
+
+# errors meaning "this filesystem cannot do that", not a failed copy
+_UNSUPPORTED = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOSYS,
+                errno.EPERM, errno.ENOTTY, errno.EMLINK}
+
+
+def _replace(tmp: str, dst: str):
+    try:
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _hardlink(src: str, dst: str) -> bool:
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return True
+    tmp = dst + ".part"
+    try:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        os.link(src, tmp)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+    _replace(tmp, dst)
+    return True
+
+
+def _reflink(src: str, dst: str) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    tmp = dst + ".part"
+    try:
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    except OSError as e:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+    shutil.copystat(src, tmp)
+    _replace(tmp, dst)
+    return True
+
+
+def _copy_range(fsrc, fdst, size: int, progress: Callable[[int], None]) -> int:
+    """Copy with os.copy_file_range; return the bytes copied (0 if it is not usable here)."""
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is None:
+        return 0
+    done = 0
+    while done < size:
+        try:
+            n = copy_file_range(fsrc.fileno(), fdst.fileno(), min(COPY_CHUNK, size - done))
+        except OSError as e:
+            if done == 0 and e.errno in _UNSUPPORTED | {errno.EBADF, errno.EIO}:
+                return 0
+            raise
+        if n == 0:
+            break
+        done += n
+        progress(n)
+    return done
+
+
+def _copy(src: str, dst: str, progress: Callable[[int], None]):
+    tmp = dst + ".part"
+    try:
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            done = _copy_range(fsrc, fdst, size, progress)
+            if done < size:
+                fsrc.seek(done)
+                fdst.seek(done)
+                fdst.truncate()
+                buf = bytearray(BUFFER_SIZE)
+                view = memoryview(buf)
+                while True:
+                    n = fsrc.readinto(buf)
+                    if not n:
+                        break
+                    fdst.write(view[:n])
+                    progress(n)
+        shutil.copystat(src, tmp)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _replace(tmp, dst)
+
+
+def copy_file(src: str, dst: str, mode: str = "copy", progress: Optional[Callable[[int], None]] = None) -> str:
+    """Save ``src`` as ``dst`` with ``mode``; return the mode used ("copy" after a fallback)."""
+    if mode not in LOCAL_MODES:
+        raise ValueError(f"Unknown local save mode: {mode} (expected one of {', '.join(LOCAL_MODES)})")
+    progress = progress or (lambda n: None)
+    if mode == "hardlink" and _hardlink(src, dst):
+        progress(os.path.getsize(dst))
+        return mode
+    if mode == "reflink" and _reflink(src, dst):
+        progress(os.path.getsize(dst))
+        return mode
+    _copy(src, dst, progress)
+    return "copy"
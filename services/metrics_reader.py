@@ -0,0 +1,636 @@
+"""Column-projected readers for metrics files.
+
+Acquisition files can have hundreds of channels while only a few are sent,
+so only the requested columns are materialised:
+
+- CSV: pyarrow's multithreaded reader with ``include_columns`` when pyarrow
+  is installed (and the separator is a single character), otherwise pandas
+  with ``usecols``
+- Excel: openpyxl in read-only (streaming) mode, restricted to the column
+  range that holds the requested columns, otherwise pandas with ``usecols``
+- Parquet: pyarrow with ``columns=`` (only those column chunks are read)
+- Feather / Arrow IPC (.feather, .arrow): pyarrow, memory-mapped
+- NPY: memory-mapped (``mmap_mode="r"``); columns are the fields of a
+  structured array or the indices ("0", "1", ...) of a 2-D array
+- NPZ: one column per 1-D member (``"member/field"`` or ``"member/0"`` for
+  structured or 2-D members); only the members holding a requested column
+  are decompressed
+- HDF5 (.h5, .hdf5, needs h5py): one column per dataset path, with the same
+  ``/field`` and ``/index`` suffixes; only the requested hyperslabs are read
+
+Column keys are header names, or 0-based integer positions for CSV/Excel
+files without a header row (binary formats always have names, see
+``list_columns``). Missing columns are left out of the result, and
+missing cells are NaN, as with a full pandas read.
+
+``iter_chunks``/``MetricsStream`` read the same columns in blocks of
+``chunk_rows`` rows so that multi-GB files are sent with memory bounded by
+the block size (CSV values are read as floats in that mode, since the
+column types cannot be re-inferred once the first block has been sent).
+"""
+from __future__ import annotations
+
+import csv
+import sys
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from services.readers import backend
+
+NAN = float("nan")
+DEFAULT_CHUNK_ROWS = 200_000
+# input bytes per pyarrow block in streaming mode; the reader buffers a few
+# dozen blocks ahead, so this keeps its footprint in the tens of MB
+_BLOCK_SIZE = 1024**2
+
+PARQUET_TYPES = ("parquet", "pq")
+FEATHER_TYPES = ("feather", "arrow")
+NUMPY_TYPES = ("npy", "npz")
+HDF5_TYPES = ("h5", "hdf5")
+BINARY_TYPES = PARQUET_TYPES + FEATHER_TYPES + NUMPY_TYPES + HDF5_TYPES
+
+
+class _Fallback(Exception):
+    """The fast path cannot read this file faithfully; use pandas instead."""
+
+
+class _Unavailable(_Fallback):
+    """The fast engine is not installed (silent fallback)."""
+
+
+def _header_cells(file_path: str, sep: str) -> List[str]:
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f, delimiter=sep), [])
+
+
+def _resolve(cells: Sequence[Any], keys: Sequence[Any], header: bool) -> Dict[Any, int]:
+    """Map each requested key to its column position (first match, like pandas)."""
+    positions: Dict[Any, int] = {}
+    if header:
+        names = [("" if c is None else str(c)) for c in cells]
+        for key in keys:
+            if str(key) in names:
+                positions[key] = names.index(str(key))
+    else:
+        for key in keys:
+            if isinstance(key, int) and 0 <= key < len(cells):
+                positions[key] = key
+    return positions
+
+
+# --- CSV ---
+def _read_csv_pyarrow(file_path: str, keys: Sequence[Any], header: bool, sep: str) -> Dict[Any, list]:
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except Exception as e:  # missing, or built against another NumPy
+        raise _Unavailable(f"pyarrow unavailable: {e}")
+    if len(sep) != 1:
+        raise _Fallback("multi-character separator")
+
+    cells = _header_cells(file_path, sep)
+    if header and (len(set(cells)) != len(cells) or any(not c for c in cells)):
+        # pandas renames duplicate/empty headers ("a.1", "Unnamed: 3")
+        raise _Fallback("duplicate or empty header names")
+    positions = _resolve(cells, keys, header)
+    if not positions:
+        return {}
+    names = {key: (cells[pos] if header else f"f{pos}") for key, pos in positions.items()}
+    try:
+        table = pacsv.read_csv(
+            file_path,
+            read_options=pacsv.ReadOptions(autogenerate_column_names=not header),
+            parse_options=pacsv.ParseOptions(delimiter=sep),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=sorted(set(names.values())),
+                strings_can_be_null=True,
+            ),
+        )
+    except pa.ArrowException as e:
+        # ragged rows, quoting pandas tolerates, non-UTF-8 text...
+        raise _Fallback(str(e))
+    out: Dict[Any, list] = {}
+    for key, name in names.items():
+        column = table.column(name)
+        kind = column.type
+        if pa.types.is_null(kind):
+            out[key] = [NAN] * len(column)
+        elif pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_boolean(kind):
+            out[key] = column.to_numpy().tolist()
+        elif pa.types.is_string(kind) or pa.types.is_large_string(kind):
+            out[key] = [NAN if v is None else v for v in column.to_pylist()]
+        else:
+            # e.g. timestamps, which pandas would keep as strings
+            raise _Fallback(f"column {name!r} parsed as {kind}")
+    return out
+
+
+def _iter_csv_pyarrow(file_path: str, keys: Sequence[Any], header: bool, sep: str,
+                      chunk_rows: int) -> Iterator[Dict[Any, list]]:
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except Exception as e:
+        raise _Unavailable(f"pyarrow unavailable: {e}")
+    if len(sep) != 1:
+        raise _Fallback("multi-character separator")
+
+    cells = _header_cells(file_path, sep)
+    if header and (len(set(cells)) != len(cells) or any(not c for c in cells)):
+        raise _Fallback("duplicate or empty header names")
+    positions = _resolve(cells, keys, header)
+    if not positions:
+        return
+    names = {key: (cells[pos] if header else f"f{pos}") for key, pos in positions.items()}
+    include = sorted(set(names.values()))
+    try:
+        reader = pacsv.open_csv(
+            file_path,
+            read_options=pacsv.ReadOptions(autogenerate_column_names=not header, block_size=_BLOCK_SIZE),
+            parse_options=pacsv.ParseOptions(delimiter=sep),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=include,
+                column_types={name: pa.float64() for name in include},
+            ),
+        )
+    except pa.ArrowException as e:
+        # non-numeric columns, malformed first block...
+        raise _Fallback(str(e))
+    with reader:
+        while True:
+            try:
+                batch = reader.read_next_batch()
+            except StopIteration:
+                return
+            except pa.ArrowException as e:
+                raise ValueError(f"Cannot stream {file_path}: {e}") from e
+            columns = {key: batch.column(batch.schema.get_field_index(name)) for key, name in names.items()}
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield {key: col.slice(start, chunk_rows).to_numpy(zero_copy_only=False).tolist()
+                       for key, col in columns.items()}
+
+
+def _iter_csv_pandas(file_path: str, keys: Sequence[Any], header: bool, sep: str,
+                     chunk_rows: int) -> Iterator[Dict[Any, list]]:
+    pd = backend("pandas")
+    header_arg = 0 if header else None
+    columns = pd.read_csv(file_path, header=header_arg, sep=sep, nrows=0).columns
+    wanted = [k for k in keys if k in columns]
+    if not wanted:
+        return
+    with pd.read_csv(file_path, header=header_arg, sep=sep, usecols=wanted, float_precision="round_trip",
+                     chunksize=chunk_rows) as reader:
+        for df in reader:
+            yield {k: df[k].to_list() for k in wanted}
+
+
+def _read_csv_pandas(file_path: str, keys: Sequence[Any], header: bool, sep: str) -> Dict[Any, list]:
+    pd = backend("pandas")
+    header_arg = 0 if header else None
+    columns = pd.read_csv(file_path, header=header_arg, sep=sep, nrows=0).columns
+    wanted = [k for k in keys if k in columns]
+    if not wanted:
+        return {}
+    # round_trip parses floats exactly like pyarrow (the default parser can be 1 ulp off)
+    df = pd.read_csv(file_path, header=header_arg, sep=sep, usecols=wanted, float_precision="round_trip")
+    return {k: df[k].to_list() for k in wanted}
+
+
+# --- Excel ---
+def _read_excel_openpyxl(file_path: str, keys: Sequence[Any], header: bool, sheet: Optional[str]) -> Dict[Any, list]:
+    try:
+        from openpyxl import load_workbook
+    except Exception as e:
+        raise _Unavailable(f"openpyxl unavailable: {e}")
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            return {}
+        if header:
+            names = ["" if c is None else str(c) for c in first]
+            if len(set(names)) != len(names) or any(not n for n in names):
+                raise _Fallback("duplicate or empty header names")
+        positions = _resolve(first, keys, header)
+        if not positions:
+            return {}
+        lo, hi = min(positions.values()), max(positions.values())
+        rows = ws.iter_rows(min_row=2 if header else 1, min_col=lo + 1, max_col=hi + 1, values_only=True)
+        out: Dict[Any, list] = {key: [] for key in positions}
+        cols = [(key, pos - lo) for key, pos in positions.items()]
+        last_filled = 0
+        for n, row in enumerate(rows, start=1):
+            filled = False
+            for key, i in cols:
+                value = row[i] if i < len(row) else None
+                if value is None:
+                    value = NAN
+                else:
+                    filled = True
+                out[key].append(value)
+            if filled:
+                last_filled = n
+        # pandas drops trailing empty rows
+        return {key: values[:last_filled] for key, values in out.items()}
+    finally:
+        wb.close()
+
+
+def _iter_excel_openpyxl(file_path: str, keys: Sequence[Any], header: bool, sheet: Optional[str],
+                         chunk_rows: int) -> Iterator[Dict[Any, list]]:
+    try:
+        from openpyxl import load_workbook
+    except Exception as e:
+        raise _Unavailable(f"openpyxl unavailable: {e}")
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        first = next(ws.iter_rows(values_only=True), None)
+        if first is None:
+            return
+        if header:
+            names = ["" if c is None else str(c) for c in first]
+            if len(set(names)) != len(names) or any(not n for n in names):
+                raise _Fallback("duplicate or empty header names")
+        positions = _resolve(first, keys, header)
+        if not positions:
+            return
+        lo, hi = min(positions.values()), max(positions.values())
+        cols = [(key, pos - lo) for key, pos in positions.items()]
+        out: Dict[Any, list] = {key: [] for key in positions}
+        # empty rows are only kept once a filled row follows (pandas drops trailing ones)
+        pending_empty = 0
+        for row in ws.iter_rows(min_row=2 if header else 1, min_col=lo + 1, max_col=hi + 1, values_only=True):
+            values = [(row[i] if i < len(row) else None) for _, i in cols]
+            if all(v is None for v in values):
+                pending_empty += 1
+                continue
+            while pending_empty:
+                for key, _ in cols:
+                    out[key].append(NAN)
+                pending_empty -= 1
+                if len(out[cols[0][0]]) >= chunk_rows:
+                    yield out
+                    out = {key: [] for key in positions}
+            for (key, _), v in zip(cols, values):
+                out[key].append(NAN if v is None else v)
+            if len(out[cols[0][0]]) >= chunk_rows:
+                yield out
+                out = {key: [] for key in positions}
+        if out[cols[0][0]]:
+            yield out
+    finally:
+        wb.close()
+
+
+def _iter_excel_pandas(file_path: str, keys: Sequence[Any], header: bool, sheet: Optional[str],
+                       chunk_rows: int) -> Iterator[Dict[Any, list]]:
+    # pandas has no chunked Excel reader; the file is read once with usecols
+    data = _read_excel_pandas(file_path, keys, header, sheet)
+    if not data:
+        return
+    total = len(next(iter(data.values())))
+    for start in range(0, total, chunk_rows):
+        yield {k: v[start:start + chunk_rows] for k, v in data.items()}
+
+
+def _read_excel_pandas(file_path: str, keys: Sequence[Any], header: bool, sheet: Optional[str]) -> Dict[Any, list]:
+    pd = backend("pandas")
+    header_arg = 0 if header else None
+    sheet_name = sheet if sheet else 0
+    columns = pd.read_excel(file_path, sheet_name=sheet_name, header=header_arg, nrows=0).columns
+    wanted = [k for k in keys if k in columns]
+    if not wanted:
+        return {}
+    df = pd.read_excel(file_path, sheet_name=sheet_name, header=header_arg, usecols=wanted)
+    return {k: df[k].to_list() for k in wanted}
+
+
+# --- Parquet / Feather ---
+def _pyarrow(file_type: str):
+    try:
+        import pyarrow as pa
+        import pyarrow.feather  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except Exception as e:
+        raise ValueError(f"Reading .{file_type} metrics requires pyarrow. Run: pip install pyarrow ({e})")
+    return pa
+
+
+def _arrow_values(column) -> list:
+    """Python values of an Arrow column, with NaN for nulls like a pandas read."""
+    import pyarrow as pa
+
+    kind = column.type
+    if pa.types.is_null(kind):
+        return [NAN] * len(column)
+    if pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_boolean(kind):
+        # integer columns with nulls come back as floats with NaN
+        return column.to_numpy(zero_copy_only=False).tolist()
+    return [NAN if v is None else v for v in column.to_pylist()]
+
+
+def _arrow_names(file_path: str, file_type: str) -> List[str]:
+    pa = _pyarrow(file_type)
+    if file_type in PARQUET_TYPES:
+        return list(pa.parquet.ParquetFile(file_path, memory_map=True).schema_arrow.names)
+    try:
+        with pa.memory_map(file_path) as source:
+            return list(pa.ipc.open_file(source).schema.names)
+    except pa.ArrowInvalid:
+        # Feather V1
+        return list(pa.feather.read_table(file_path, columns=[], memory_map=True).schema.names)
+
+
+def _read_arrow(file_path: str, file_type: str, keys: Sequence[Any]) -> Dict[Any, list]:
+    pa = _pyarrow(file_type)
+    names = _arrow_names(file_path, file_type)
+    wanted = [k for k in keys if str(k) in names]
+    if not wanted:
+        return {}
+    columns = sorted({str(k) for k in wanted})
+    if file_type in PARQUET_TYPES:
+        table = pa.parquet.ParquetFile(file_path, memory_map=True).read(columns=columns)
+    else:
+        table = pa.feather.read_table(file_path, columns=columns, memory_map=True)
+    return {k: _arrow_values(table.column(str(k))) for k in wanted}
+
+
+def _iter_arrow(file_path: str, file_type: str, keys: Sequence[Any], chunk_rows: int) -> Iterator[Dict[Any, list]]:
+    pa = _pyarrow(file_type)
+    names = _arrow_names(file_path, file_type)
+    wanted = [k for k in keys if str(k) in names]
+    if not wanted:
+        return
+    columns = sorted({str(k) for k in wanted})
+    if file_type in PARQUET_TYPES:
+        batches = pa.parquet.ParquetFile(file_path, memory_map=True).iter_batches(
+            batch_size=chunk_rows, columns=columns)
+    else:
+        batches = _feather_batches(file_path, columns, chunk_rows)
+    for batch in batches:
+        if batch.num_rows:
+            yield {k: _arrow_values(batch.column(batch.schema.get_field_index(str(k)))) for k in wanted}
+
+
+def _feather_batches(file_path: str, columns: List[str], chunk_rows: int):
+    import pyarrow as pa
+
+    with pa.memory_map(file_path) as source:
+        try:
+            reader = pa.ipc.open_file(source)
+        except pa.ArrowInvalid:
+            # Feather V1 has no record batches; it is read at once
+            table = pa.feather.read_table(file_path, columns=columns, memory_map=True)
+            yield from table.to_batches(max_chunksize=chunk_rows)
+            return
+        # record batches are mapped (or decompressed) one at a time
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(columns)
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(start, chunk_rows)
+
+
+# --- NPY / NPZ / HDF5 ---
+class _ArrayColumn:
+    """One column of an array file; ``read(start, stop)`` loads only that row range."""
+
+    def __init__(self, length: int, read: Callable[[int, int], Any]):
+        self.length = length
+        self.read = read
+
+
+def _array_values(values) -> list:
+    import numpy as np
+
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        return np.datetime_as_string(values).tolist()
+    if values.dtype.kind in "SU":
+        values = values.astype(str)
+    if values.dtype.kind == "O":
+        return [NAN if v is None else v for v in values.tolist()]
+    return values.tolist()
+
+
+def _expand(name: str, dtype, shape: Tuple[int, ...], read: Callable[[Any], Any]) -> Dict[str, _ArrayColumn]:
+    """Columns of one array: itself if 1-D, one per field or per 2-D column otherwise.
+
+    ``read(rows)`` returns ``array[rows]`` (or the named field / column) for a row slice.
+    """
+    if not shape:
+        return {}
+    prefix = f"{name}/" if name else ""
+    if dtype.names:
+        if len(shape) != 1:
+            return {}
+        return {f"{prefix}{field}": _ArrayColumn(shape[0], lambda a, b, f=field: read(slice(a, b), f))
+                for field in dtype.names}
+    if len(shape) == 1:
+        return {name or "0": _ArrayColumn(shape[0], lambda a, b: read(slice(a, b)))}
+    if len(shape) == 2:
+        return {f"{prefix}{i}": _ArrayColumn(shape[0], lambda a, b, i=i: read(slice(a, b), i))
+                for i in range(shape[1])}
+    return {}
+
+
+def _numpy_reader(load: Callable[[], Any]) -> Callable[..., Any]:
+    """Row-slice reader over an array loaded on first use (and then kept)."""
+    cache: Dict[str, Any] = {}
+
+    def read(rows, column=None):
+        if "array" not in cache:
+            cache["array"] = load()
+        array = cache["array"]
+        if column is None:
+            return array[rows]
+        if isinstance(column, str):
+            return array[column][rows]
+        return array[rows, column]
+    return read
+
+
+def _npz_header(archive, member: str):
+    import numpy as np
+
+    with archive.zip.open(member + ".npy") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+    return shape, dtype
+
+
+def _hdf5_reader(dataset) -> Callable[..., Any]:
+    def read(rows, column=None):
+        if column is None:
+            return dataset[rows]
+        if isinstance(column, str):
+            return dataset.fields(column)[rows]
+        # a single-column hyperslab: other columns are not read from disk
+        return dataset[rows, column]
+    return read
+
+
+@contextmanager
+def _array_columns(file_path: str, file_type: str) -> Iterator[Dict[str, _ArrayColumn]]:
+    """Columns of an NPY/NPZ/HDF5 file, valid while the context is open."""
+    import numpy as np
+
+    if file_type == "npy":
+        array = np.load(file_path, mmap_mode="r", allow_pickle=False)
+        yield _expand("", array.dtype, array.shape, _numpy_reader(lambda: array))
+    elif file_type == "npz":
+        with np.load(file_path, allow_pickle=False) as archive:
+            columns: Dict[str, _ArrayColumn] = {}
+            for member in archive.files:
+                shape, dtype = _npz_header(archive, member)
+                columns.update(_expand(member, dtype, shape, _numpy_reader(lambda m=member: archive[m])))
+            yield columns
+    else:
+        try:
+            import h5py
+        except Exception as e:
+            raise ValueError(f"Reading .{file_type} metrics requires h5py. Run: pip install h5py ({e})")
+        with h5py.File(file_path, "r") as f:
+            columns = {}
+
+            def visit(name, obj):
+                if isinstance(obj, h5py.Dataset):
+                    columns.update(_expand(name, obj.dtype, obj.shape, _hdf5_reader(obj)))
+            f.visititems(visit)
+            yield columns
+
+
+def _read_arrays(file_path: str, file_type: str, keys: Sequence[Any]) -> Dict[Any, list]:
+    with _array_columns(file_path, file_type) as columns:
+        return {k: _array_values(columns[str(k)].read(0, columns[str(k)].length))
+                for k in keys if str(k) in columns}
+
+
+def _iter_arrays(file_path: str, file_type: str, keys: Sequence[Any], chunk_rows: int) -> Iterator[Dict[Any, list]]:
+    with _array_columns(file_path, file_type) as columns:
+        wanted = [k for k in keys if str(k) in columns]
+        if not wanted:
+            return
+        total = max(columns[str(k)].length for k in wanted)
+        for start in range(0, total, chunk_rows):
+            yield {k: _array_values(columns[str(k)].read(start, start + chunk_rows)) for k in wanted}
+
+
+def list_columns(file_path: str, file_type: str) -> List[str]:
+    """Column names of a Parquet/Feather/NPY/NPZ/HDF5 file, without reading its data."""
+    file_type = file_type.lower()
+    if file_type in PARQUET_TYPES + FEATHER_TYPES:
+        return _arrow_names(file_path, file_type)
+    if file_type in NUMPY_TYPES + HDF5_TYPES:
+        with _array_columns(file_path, file_type) as columns:
+            return list(columns)
+    raise ValueError(f"Unsupported metrics type: {file_type}")
+
+
+def read_columns(file_path: str, file_type: str, keys: Sequence[Any], header: bool = True,
+                 sep: str = ",", sheet: Optional[str] = None) -> Dict[Any, list]:
+    """Read only ``keys`` from a metrics file, with the fastest available engine."""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    file_type = file_type.lower()
+    if file_type in PARQUET_TYPES + FEATHER_TYPES:
+        return _read_arrow(file_path, file_type, keys)
+    if file_type in NUMPY_TYPES + HDF5_TYPES:
+        return _read_arrays(file_path, file_type, keys)
+    if file_type == "csv":
+        fast, slow, arg = _read_csv_pyarrow, _read_csv_pandas, sep
+    elif file_type in ("xlsx", "xlsm"):
+        fast, slow, arg = _read_excel_openpyxl, _read_excel_pandas, sheet
+    else:
+        raise ValueError(f"Unsupported metrics type: {file_type}")
+    try:
+        return fast(file_path, keys, header, arg)
+    except _Unavailable:
+        pass
+    except _Fallback as e:
+        print(f"INFO: metrics reader falling back to pandas for {file_path}: {e}", file=sys.stderr)
+    return slow(file_path, keys, header, arg)
+
+
+def iter_chunks(file_path: str, file_type: str, keys: Sequence[Any], header: bool = True, sep: str = ",",
+                sheet: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Dict[Any, list]]:
+    """Yield ``{key: values}`` blocks of at most ``chunk_rows`` rows for the requested columns."""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return
+    file_type = file_type.lower()
+    chunk_rows = max(1, int(chunk_rows))
+    if file_type in PARQUET_TYPES + FEATHER_TYPES:
+        yield from _iter_arrow(file_path, file_type, keys, chunk_rows)
+        return
+    if file_type in NUMPY_TYPES + HDF5_TYPES:
+        yield from _iter_arrays(file_path, file_type, keys, chunk_rows)
+        return
+    if file_type == "csv":
+        fast, slow, arg = _iter_csv_pyarrow, _iter_csv_pandas, sep
+    elif file_type in ("xlsx", "xlsm"):
+        fast, slow, arg = _iter_excel_openpyxl, _iter_excel_pandas, sheet
+    else:
+        raise ValueError(f"Unsupported metrics type: {file_type}")
+    blocks = fast(file_path, keys, header, arg, chunk_rows)
+    try:
+        # the fast engine decides whether it can handle the file before the first block
+        first = next(blocks, None)
+    except _Unavailable:
+        blocks, first = None, None
+    except _Fallback as e:
+        print(f"INFO: metrics reader falling back to pandas for {file_path}: {e}", file=sys.stderr)
+        blocks, first = None, None
+    if blocks is None:
+        yield from slow(file_path, keys, header, arg, chunk_rows)
+        return
+    if first is not None:
+        yield first
+        yield from blocks
+
+
+class MetricsStream:
+    """Metrics of one file, read lazily block by block.
+
+    Iterating yields ``(columns, x_axis)`` pairs: ``columns`` maps the selected
+    column names to one block of values, ``x_axis`` is the matching block of
+    the time column (or None). Every block covers the same rows for all
+    columns, so truncating each block to the shorter of column and x_axis
+    keeps the same alignment as a whole-file read.
+    """
+
+    def __init__(self, file_path: str, file_type: str, columns: Dict[str, Any], time_key: Any = None,
+                 header: bool = True, sep: str = ",", sheet: Optional[str] = None,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.file_path = file_path
+        self.file_type = file_type
+        self.columns = columns
+        self.time_key = time_key
+        self.header = header
+        self.sep = sep
+        self.sheet = sheet
+        self.chunk_rows = chunk_rows
+
+    def __iter__(self) -> Iterator[Tuple[Dict[str, list], Optional[list]]]:
+        keys = ([self.time_key] if self.time_key is not None else []) + list(self.columns.values())
+        for block in iter_chunks(self.file_path, self.file_type, keys, header=self.header, sep=self.sep,
+                                 sheet=self.sheet, chunk_rows=self.chunk_rows):
+            columns = {col: block[key] for col, key in self.columns.items() if key in block}
+            x_axis = block.get(self.time_key) if self.time_key is not None else None
+            yield columns, x_axis
+
+    def count_points(self) -> Dict[str, int]:
+        """Points per column that a send would write (reads the whole file, block by block)."""
+        points = {col: 0 for col in self.columns}
+        for columns, x_axis in self:
+            for col, values in columns.items():
+                points[col] += min(len(values), len(x_axis)) if x_axis is not None else len(values)
+        return {col: n for col, n in points.items() if n}
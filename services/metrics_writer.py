@@ -0,0 +1,137 @@
+"""Bulk writer for Sacred metrics.
+
+Sacred's ``_run.log_scalar`` goes through one Python call per point and a
+``$push`` per flush. This module builds the same documents that
+``MongoObserver.log_metrics`` produces (name, run_id, steps, values,
+timestamps) from whole columns at once and links them in ``run.info['metrics']``
+exactly like Sacred does, so Omniboard and other Sacred readers see no
+difference, except for timestamps: every point of one block gets the time of
+its write, where ``log_scalar`` stamps each point on its own.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+
+def _column(series):
+    """Array of a numeric column; other columns as a list so each value keeps its type."""
+    if isinstance(series, np.ndarray) and series.dtype.kind != "O":
+        return series
+    values = np.asarray(series)
+    if values.dtype.kind in "USO":
+        # numpy would turn [1, "a"] into ["1", "a"]
+        return list(series)
+    return values
+
+
+def _to_list(values) -> list:
+    """Return a BSON-friendly list (numpy scalars converted to Python types)."""
+    if isinstance(values, np.ndarray) and values.dtype.kind != "O":
+        return values.tolist()
+    return [v.item() if isinstance(v, np.generic) else v for v in values]
+
+
+class BulkMetricsWriter:
+    """Write whole metric columns for one run into Sacred's metrics collection.
+
+    The first write of a metric inserts its document (one ``insert_many`` for
+    all new metrics), later writes append with ``$push``/``$each`` so the
+    writer can also be fed chunk by chunk.
+    """
+
+    def __init__(self, metrics_collection, run_id, info: Dict[str, Any]):
+        self.metrics = metrics_collection
+        self.run_id = run_id
+        self.info = info
+        self._next_step: Dict[str, int] = {}
+        self.points_written = 0
+
+    def write(self, columns: Dict[str, Iterable], x_axis: Optional[Iterable] = None) -> int:
+        """Write one block of points per column and return the number of points.
+
+        When ``x_axis`` is given each column is truncated to the shorter of the
+        two (same rule as the per-point loop). Without it, steps continue from
+        the previous block starting at 0, like ``log_scalar`` without ``step``.
+        All the points of the block share one timestamp (the time of the write).
+        """
+        steps_all = _column(x_axis) if x_axis is not None else None
+        timestamp = datetime.utcnow()
+        known = {m.get("name") for m in self.info.get("metrics", [])}
+        new_docs = []
+        written = 0
+        for name, series in columns.items():
+            values = _column(series)
+            if steps_all is not None:
+                limit = min(len(values), len(steps_all))
+                values = values[:limit]
+                steps = steps_all[:limit]
+            else:
+                start = self._next_step.get(name, 0)
+                steps = np.arange(start, start + len(values))
+                self._next_step[name] = start + len(values)
+            n = len(values)
+            if n == 0:
+                continue
+            doc = {
+                "steps": _to_list(steps),
+                "values": _to_list(values),
+                "timestamps": [timestamp] * n,
+            }
+            written += n
+            if name in known:
+                self.metrics.update_one(
+                    {"run_id": self.run_id, "name": name},
+                    {"$push": {k: {"$each": v} for k, v in doc.items()}},
+                )
+            else:
+                doc.update({"name": name, "run_id": self.run_id})
+                new_docs.append(doc)
+
+        if new_docs:
+            inserted = self.metrics.insert_many(new_docs, ordered=True)
+            for doc, _id in zip(new_docs, inserted.inserted_ids):
+                self.info.setdefault("metrics", []).append({"name": doc["name"], "id": str(_id)})
+
+        self.points_written += written
+        return written
+
+
+def metric_documents(run_id, columns: Dict[str, Iterable], x_axis: Optional[Iterable] = None,
+                     timestamp: Optional[datetime] = None) -> list:
+    """Complete metrics documents of one run, for runs written without a Sacred run (sweep mode).
+
+    Same truncation and step rules as ``BulkMetricsWriter.write`` for a single block;
+    every point gets ``timestamp`` (default: now).
+    """
+    steps_all = _column(x_axis) if x_axis is not None else None
+    timestamp = timestamp or datetime.utcnow()
+    docs = []
+    for name, series in columns.items():
+        values = _column(series)
+        if steps_all is not None:
+            limit = min(len(values), len(steps_all))
+            values, steps = values[:limit], steps_all[:limit]
+        else:
+            steps = np.arange(len(values))
+        if len(values) == 0:
+            continue
+        docs.append({
+            "name": name,
+            "run_id": run_id,
+            "steps": _to_list(steps),
+            "values": _to_list(values),
+            "timestamps": [timestamp] * len(values),
+        })
+    return docs
+
+
+def bulk_writer_for_run(_run) -> Optional[BulkMetricsWriter]:
+    """Return a writer bound to the run's Mongo observer, or None if there is none."""
+    for observer in getattr(_run, "observers", []):
+        metrics_collection = getattr(observer, "metrics", None)
+        if metrics_collection is not None:
+            return BulkMetricsWriter(metrics_collection, _run._id, _run.info)
+    return None
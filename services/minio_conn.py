@@ -0,0 +1,104 @@
+"""Batch-scoped MinIO/S3 clients.
+
+Building a boto3 client per folder re-reads the botocore data files, opens a
+new connection pool (TCP and TLS handshakes) and checks the bucket again
+before every upload. ``MinioClients`` keeps one client per endpoint and
+credentials for the whole batch and remembers which buckets were found
+accessible, so a batch of N folders makes one ``head_bucket`` call instead
+of N. Use it as a context manager; the pooled connections are closed on exit.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Any, Dict, Set, Tuple
+
+
+def build_minio_endpoint_url(endpoint: str, use_tls: bool) -> str:
+    ep = (endpoint or "").strip()
+    if ep.startswith("http://") or ep.startswith("https://"):
+        return ep
+    return ("https://" if use_tls else "http://") + ep
+
+
+def connection_settings(minio_payload: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    """(endpoint url, access key, secret key, bucket) of a MinIO payload ("" when missing)."""
+    endpoint = (minio_payload.get("endpoint") or "").strip()
+    if endpoint:
+        endpoint = build_minio_endpoint_url(endpoint, bool(minio_payload.get("tls", 0)))
+    return (
+        endpoint,
+        (minio_payload.get("access_key") or "").strip(),
+        (minio_payload.get("secret_key") or "").strip(),
+        (minio_payload.get("bucket") or "").strip(),
+    )
+
+
+def client_fingerprint(minio_payload: Dict[str, Any]) -> str:
+    """Endpoint/credentials fingerprint of a payload (the secret only as a digest)."""
+    endpoint, access_key, secret_key, _ = connection_settings(minio_payload)
+    secret = hashlib.sha256(secret_key.encode("utf-8")).hexdigest()[:16]
+    return f"{endpoint}|{access_key}|{secret}"
+
+
+class MinioClients:
+    """One pooled boto3 S3 client per endpoint/credentials, shared by a whole batch.
+
+    boto3 clients are thread-safe once built; building them is not, so
+    ``client`` is serialized. ``check_bucket`` calls ``head_bucket`` the
+    first time a bucket is used through a client and remembers a success
+    (a failure is checked again next time).
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, int], Any] = {}
+        self._buckets: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def client(self, minio_payload: Dict[str, Any], pool_size: int = 10):
+        """S3 client for the payload's endpoint and credentials with ``pool_size`` pooled connections."""
+        key = (client_fingerprint(minio_payload), int(pool_size))
+        s3 = self._clients.get(key)
+        if s3 is not None:
+            return s3
+        with self._lock:
+            if key not in self._clients:
+                import boto3  # type: ignore
+                from botocore.config import Config  # type: ignore
+
+                endpoint, access_key, secret_key, _ = connection_settings(minio_payload)
+                # a session per client: the default session is not thread-safe
+                self._clients[key] = boto3.session.Session().client(
+                    "s3",
+                    endpoint_url=endpoint,
+                    aws_access_key_id=access_key,
+                    aws_secret_access_key=secret_key,
+                    config=Config(signature_version="s3v4", s3={"addressing_style": "path"},
+                                  max_pool_connections=key[1]),
+                )
+            return self._clients[key]
+
+    def check_bucket(self, minio_payload: Dict[str, Any], pool_size: int = 10):
+        """Raise if the payload's bucket is not accessible; a success is remembered for the batch."""
+        key = (client_fingerprint(minio_payload), connection_settings(minio_payload)[3])
+        if key in self._buckets:
+            return
+        self.client(minio_payload, pool_size).head_bucket(Bucket=key[1])
+        with self._lock:
+            self._buckets.add(key)
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+            self._buckets.clear()
+        for s3 in clients:
+            close = getattr(s3, "close", None)
+            if close is not None:
+                close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
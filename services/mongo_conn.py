@@ -107,4 +107,58 @@ def build_mongo_url_from_payload(mongo_payload: dict) -> tuple[str, str]:
         params.append("tls=true")
     query = ("?" + "&".join(params)) if params else ""
     mongo_url = f"mongodb://{auth}{host}:{port}/{db_name}{query}"
-    return mongo_url, db_name
\ No newline at end of file
+    return mongo_url, db_name
+
+class SacredObserverFactory:
+    """Batch-scoped MongoClient shared by every Sacred MongoObserver of one send.
+
+    Building a ``MongoObserver(url=...)`` per folder opens a new client (DNS,
+    TLS handshake, SCRAM auth) for every experiment. This factory opens one
+    pooled client, hands out observers bound to it, and is closed once when the
+    batch is done. Use it as a context manager.
+    """
+
+    def __init__(self, client: MongoClient, db_name: str, owns_client: bool = True):
+        import gridfs
+
+        self.client = client
+        self.db_name = db_name
+        self.owns_client = owns_client
+        self._db = client[db_name]
+        self._fs = gridfs.GridFS(self._db)
+
+    @classmethod
+    def from_payload(cls, mongo_payload: dict) -> "SacredObserverFactory":
+        mongo_url, db_name = build_mongo_url_from_payload(mongo_payload)
+        return cls(MongoClient(mongo_url), db_name)
+
+    @property
+    def database(self):
+        return self._db
+
+    @property
+    def fs(self):
+        """GridFS of the database (Sacred artifacts and sources)."""
+        return self._fs
+
+    def observer(self, overwrite=None):
+        """Return a MongoObserver using the shared client (optionally overwriting a run _id)."""
+        from sacred.observers import MongoObserver
+
+        return MongoObserver.create_from(
+            self._db["runs"],
+            self._fs,
+            overwrite=overwrite,
+            metrics_collection=self._db["metrics"],
+        )
+
+    def close(self):
+        if self.owns_client:
+            self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,114 @@
+"""Build the structured send payload from flat preferences.
+
+The UI and the command-line entry point both store their settings as the
+flat dict written by ``Preferences`` (``~/.mongoui_config.json``); this module
+turns it into the payload expected by ``send_experiment``.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+
+def build_payload(data: Dict[str, Any], mongo_password: str = "", minio_secret: str = "") -> Dict[str, Any]:
+    """Return the send_experiment payload for a flat preferences dict.
+
+    Secrets are passed separately since they are never written to the prefs file.
+    """
+    return {
+        "mongo": {
+            "use_uri": data.get("use_uri", 0),
+            "uri": data.get("uri", ""),
+            "host": data.get("host", ""),
+            "port": data.get("port", ""),
+            "user": data.get("user", ""),
+            "db": data.get("db", ""),
+            "auth_source": data.get("auth_source", ""),
+            "tls": data.get("tls", 0),
+            "password": mongo_password,
+        },
+        "minio": {
+            "endpoint": data.get("minio_endpoint", ""),
+            "access_key": data.get("minio_access_key", ""),
+            "tls": data.get("minio_tls", 0),
+            "secret_key": minio_secret,
+            "bucket": data.get("minio_bucket", ""),
+            "upload_workers": data.get("minio_upload_workers", 4),
+            "part_size_mb": data.get("minio_part_size_mb", 64),
+            "part_concurrency": data.get("minio_part_concurrency", 8),
+        },
+        "batch": {
+            "workers": data.get("batch_workers", 1),
+        },
+        "experiment": {
+            "folder": data.get("experiment_folder", ""),
+            "name": data.get("experiment_name", ""),
+            "folders": data.get("experiment_folders", []),
+            "selectors": {
+                "config": {
+                    "name": data.get("config_name", ""),
+                    "sheet": data.get("config_sheet", ""),
+                    "use_custom_path": data.get("config_use_custom_path", 0),
+                    "custom_path": data.get("config_custom_path", ""),
+                    "options": {
+                        "flatten": data.get("config_flatten", 0),
+                        "sep": data.get("config_sep", ","),
+                        "sweep": data.get("config_sweep", 0),
+                        "sweep_key": data.get("config_sweep_key", ""),
+                        "include": data.get("config_include", ""),
+                        "exclude": data.get("config_exclude", ""),
+                    },
+                    "parse_from_folder": data.get("config_parse_from_folder", 0),
+                    "folder_pattern": data.get("config_folder_pattern", ""),
+                    "parsed_folder_values": data.get("config_parsed_folder_values", {}),
+                },
+                "metrics": {
+                    "name": data.get("metrics_name", ""),
+                    "sheet": data.get("metrics_sheet", ""),
+                    "options": {
+                        "header": data.get("metrics_header", 0),
+                        "has_time": data.get("metrics_has_time", 0),
+                        "time_col": data.get("metrics_time_col", ""),
+                        "selected_cols": data.get("metrics_selected_cols", []),
+                        "sep": data.get("metrics_sep", ","),
+                        "decimation": {
+                            "method": data.get("metrics_decimation", "none"),
+                            "threshold": data.get("metrics_decimation_points", 5000),
+                        },
+                    },
+                },
+                "results": {
+                    "name": data.get("results_name", ""),
+                    "sheet": data.get("results_sheet", ""),
+                    "options": {
+                        "sep": data.get("results_sep", ","),
+                    },
+                },
+                "raw_data": {
+                    "name": data.get("raw_data_name", ""),
+                    "files": data.get("raw_data_files", []),
+                    "options": {
+                        "send_minio": data.get("raw_data_send_minio", 1),
+                        "save_locally": data.get("raw_data_save_locally", 0),
+                        "local_path": data.get("raw_data_local_path", ""),
+                        "local_mode": data.get("raw_data_local_mode", "copy"),
+                        "local_workers": data.get("raw_data_local_workers", 4),
+                        "content_addressed": data.get("raw_data_content_addressed", 0),
+                    },
+                },
+                "artifacts": {
+                    "name": data.get("artifacts_name", ""),
+                    "files": data.get("artifacts_files", []),
+                },
+            },
+        },
+    }
+
+
+def is_structured_payload(data: Dict[str, Any]) -> bool:
+    """True if ``data`` already has the send_experiment layout (not flat prefs)."""
+    return isinstance(data, dict) and isinstance(data.get("experiment"), dict)
+
+
+def minio_keyring_user(data: Dict[str, Any]) -> str:
+    """Keyring user name under which the MinIO secret is remembered."""
+    return f"minio:{(data.get('minio_access_key') or 'default')}@{(data.get('minio_endpoint') or 'localhost')}"
@@ -0,0 +1,168 @@
+"""Progress events emitted while sending experiments.
+
+A progress callback receives one dict per event, always with an ``event``
+name and a ``time`` (epoch seconds). Callbacks run on the sending thread(s),
+so UI code must hop back to its own thread before touching widgets.
+
+Events (folder events also carry ``folder``):
+
+- ``batch_started``: ``folders`` (count)
+- ``folder_started`` / ``folder_finished``: ``ok``, ``message``, ``run_id`` (a list of ids in
+  sweep mode), ``skipped``
+- ``metrics_written``: ``points``, ``seconds`` (write time)
+- ``raw_file_progress``: ``target``, ``file``, ``bytes`` (new bytes since last event), ``total``
+- ``raw_file_saved``: ``target``, ``file`` (saved name), ``source`` (path relative to the folder),
+  ``bytes`` (file size), ``seconds`` (transfer time),
+  ``reused`` (True when a content-addressed file was already in the bucket and nothing was sent),
+  ``sha256`` (content-addressed MinIO uploads only)
+- ``pattern_unmatched``: ``folders`` whose name does not match the config folder pattern (before any folder is sent)
+- ``folder_planned`` (dry run only): the services.send_planner.plan_folder fields
+- ``error``: ``message``
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def emit(on_progress: Optional[ProgressCallback], event: str, **fields) -> None:
+    """Send one event to the callback; a failing callback never breaks a send."""
+    if on_progress is None:
+        return
+    try:
+        on_progress({"event": event, "time": time.time(), **fields})
+    except Exception as e:
+        print(f"WARNING: progress callback failed on {event}: {e}", file=sys.stderr)
+
+
+def bind(on_progress: Optional[ProgressCallback], **context) -> Optional[ProgressCallback]:
+    """Return a callback that adds ``context`` (e.g. the folder) to every event."""
+    if on_progress is None:
+        return None
+
+    def _bound(ev: Dict[str, Any]) -> None:
+        on_progress({"event": ev.get("event"), **context, **ev})
+
+    return _bound
+
+
+class ByteProgress:
+    """Callable fed with byte increments (e.g. a boto3 ``Callback``).
+
+    Increments are accumulated and sent as ``raw_file_progress`` events at
+    most every ``interval`` seconds, so a multi-GB upload does not flood the UI.
+    """
+
+    def __init__(self, on_progress: Optional[ProgressCallback], target: str, file: str, total: int,
+                 interval: float = 0.25):
+        self.on_progress = on_progress
+        self.target = target
+        self.file = file
+        self.total = total
+        self.interval = interval
+        self._pending = 0
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, n: int) -> None:
+        if self.on_progress is None:
+            return
+        with self._lock:
+            self._pending += n
+            now = time.monotonic()
+            if now - self._last < self.interval:
+                return
+            pending, self._pending, self._last = self._pending, 0, now
+        emit(self.on_progress, "raw_file_progress", target=self.target, file=self.file, bytes=pending, total=self.total)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, 0
+        if pending:
+            emit(self.on_progress, "raw_file_progress", target=self.target, file=self.file, bytes=pending, total=self.total)
+
+
+class ProgressTracker:
+    """Aggregate progress events into counters, throughput and ETA.
+
+    Thread-safe: ``update`` may be called from the sending threads while the
+    UI reads ``summary()`` from its own thread.
+    """
+
+    def __init__(self, folders_total: int = 0):
+        self._lock = threading.Lock()
+        self.folders_total = folders_total
+        self.folders_done = 0
+        self.folders_failed = 0
+        self.bytes_done = 0
+        self.points_done = 0
+        self.errors: list[str] = []
+        self.started_at = time.monotonic()
+        self.last_event_at = self.started_at
+
+    def update(self, ev: Dict[str, Any]) -> None:
+        name = ev.get("event")
+        with self._lock:
+            self.last_event_at = time.monotonic()
+            if name == "batch_started":
+                self.folders_total = int(ev.get("folders", 0) or 0)
+            elif name == "folder_finished":
+                self.folders_done += 1
+                if not ev.get("ok"):
+                    self.folders_failed += 1
+            elif name == "raw_file_progress":
+                self.bytes_done += int(ev.get("bytes", 0) or 0)
+            elif name == "metrics_written":
+                self.points_done += int(ev.get("points", 0) or 0)
+            elif name == "error":
+                self.errors.append(str(ev.get("message", "")))
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def idle_seconds(self) -> float:
+        """Seconds since the last event (a long idle time hints at a stalled transfer)."""
+        return time.monotonic() - self.last_event_at
+
+    def bytes_per_second(self) -> float:
+        elapsed = self.elapsed()
+        return self.bytes_done / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time extrapolated from the average time per finished folder."""
+        with self._lock:
+            done, total = self.folders_done, self.folders_total
+        if done == 0 or total <= done:
+            return None
+        return self.elapsed() / done * (total - done)
+
+    def summary(self) -> str:
+        from services.raw_data_saver import format_size
+
+        parts = [f"{self.folders_done}/{self.folders_total} folders"]
+        if self.folders_failed:
+            parts.append(f"{self.folders_failed} failed")
+        if self.bytes_done:
+            parts.append(f"{format_size(self.bytes_done)} at {format_size(int(self.bytes_per_second()))}/s")
+        if self.points_done:
+            parts.append(f"{self.points_done:,} points")
+        eta = self.eta_seconds()
+        if eta is not None:
+            parts.append(f"ETA {_format_duration(eta)}")
+        idle = self.idle_seconds()
+        if idle > 30:
+            parts.append(f"no activity for {_format_duration(idle)}")
+        return " • ".join(parts)
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} s"
+    if seconds < 3600:
+        return f"{seconds // 60} min {seconds % 60:02d} s"
+    return f"{seconds // 3600} h {(seconds % 3600) // 60:02d} min"
@@ -1,16 +1,29 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import shutil
+import functools
+import hashlib
 import os
+import sys
+import time
+from services.local_copy import LOCAL_MODES, copy_file
+from services.minio_conn import MinioClients, client_fingerprint, connection_settings
+from services.progress import ByteProgress, ProgressCallback, emit
+from services.resumable_upload import state_path, upload_resumable
 
-
-def _build_minio_endpoint_url(endpoint: str, use_tls: bool) -> str:
-    ep = (endpoint or "").strip()
-    if ep.startswith("http://") or ep.startswith("https://"):
-        return ep
-    return ("https://" if use_tls else "http://") + ep
+# MinIO transfer defaults (minio payload: upload_workers, part_size_mb, part_concurrency)
+DEFAULT_UPLOAD_WORKERS = 4
+DEFAULT_PART_SIZE_MB = 64
+DEFAULT_PART_CONCURRENCY = 8
+# S3 rejects multipart parts under 5 MB (except the last one)
+MIN_PART_SIZE_MB = 5
+# parallel local/NAS copies (raw_data option local_workers)
+DEFAULT_LOCAL_WORKERS = 4
+# content-addressed objects (raw_data option content_addressed) live under this prefix
+CONTENT_PREFIX = "sha256"
+_HASH_CHUNK = 1024**2
 
 
 def format_size(size_bytes):
@@ -24,86 +37,328 @@ def format_size(size_bytes):
         return f"{size_bytes / 1024**3:.2f} Go"
 
 
-def save_files_locally(files, target_dir) -> Dict[str, Any]:
-    """Copy files to a local directory.
+def source_id(file) -> str:
+    """Stable id of a raw-data file: its path relative to the experiment folder."""
+    return file.get('relative_path') or file['new_name']
+
+
+def _is_saved(file, skip) -> bool:
+    # journals written before relative paths were recorded hold new_names
+    return source_id(file) in skip or file['new_name'] in skip
+
+
+def _saved_digest(file, skip) -> Optional[str]:
+    """SHA-256 recorded for a skipped file (skip as a {source_id: sha256} mapping), else None."""
+    if not isinstance(skip, Mapping):
+        return None
+    return skip.get(source_id(file)) or skip.get(file['new_name'])
+
+
+def _local_settings(raw_data_save_options) -> Tuple[str, int]:
+    """(local_mode, parallel copies) from the raw-data save options."""
+    mode = (raw_data_save_options.get("local_mode") or "copy").strip().lower()
+    try:
+        workers = max(1, int(raw_data_save_options.get("local_workers") or DEFAULT_LOCAL_WORKERS))
+    except (TypeError, ValueError):
+        workers = DEFAULT_LOCAL_WORKERS
+    return mode, workers
+
+
+def _save_file_locally(file, target_dir: str, mode: str, on_progress) -> Dict[str, Any]:
+    """Copy (or link) one file to target_dir/minio_folder/new_name; return its result entry."""
+    folder = os.path.join(target_dir, file['minio_folder'])
+    path = os.path.join(folder, file['new_name'])
+    detail: Dict[str, Any] = {"file": file['new_name'], "path": path}
+    try:
+        size = os.path.getsize(file['source_path'])
+        os.makedirs(folder, exist_ok=True)
+        progress = ByteProgress(on_progress, "local", file['new_name'], size)
+        started = time.monotonic()
+        used = copy_file(file['source_path'], path, mode, progress)
+        seconds = time.monotonic() - started
+        progress.flush()
+    except Exception as e:
+        print(f"ERROR saving {file['source_path']} to {path}: {e}", file=sys.stderr)
+        detail.update(ok=False, error=str(e))
+        return detail
+    emit(on_progress, "raw_file_saved", target="local", file=file['new_name'], source=source_id(file),
+         bytes=size, seconds=seconds)
+    detail.update(ok=True, bytes=size, seconds=seconds, mode=used)
+    return detail
 
-    Returns a result dict with counts and per-file status.
+
+def save_files_locally(files, target_dir, on_progress: ProgressCallback | None = None, skip=(),
+                       mode: str = "copy", workers: int = DEFAULT_LOCAL_WORKERS) -> Dict[str, Any]:
+    """Copy files to target_dir/<minio_folder>/<new_name>, ``workers`` files at a time.
+
+    mode is a services.local_copy mode: "copy", or "hardlink"/"reflink" when
+    the source and target share a filesystem (a file that cannot be linked is
+    copied; its detail "mode" says which was used).
+    Files whose source_id is in ``skip`` (already saved by a previous attempt) are left alone.
+    The result lists every file under "details" ({file, path, ok, bytes, seconds, mode}
+    or {file, path, ok: False, error}, {file, skipped: True} for skipped ones);
+    a failed file does not stop the others.
     """
-    for file in files.values():
-        target_dir = f"{target_dir}/{file['minio_folder']}"
-        os.makedirs(target_dir, exist_ok=True)
-        shutil.copy2(file['source_path'], f"{target_dir}/{file['new_name']}")
-    return {"ok": True, "message": f"Saved {len(files)} files locally to {target_dir}"}
+    if mode not in LOCAL_MODES:
+        return {"ok": False, "message": f"Unknown local save mode: {mode}", "saved": 0,
+                "failed": len(files or []), "details": []}
+    if not target_dir:
+        return {"ok": False, "message": "No local path to save raw data to", "saved": 0,
+                "failed": len(files or []), "details": []}
+    todo = [file for file in files.values() if not _is_saved(file, skip)]
+
+    def _save(f):
+        return _save_file_locally(f, target_dir, mode, on_progress)
+
+    if workers > 1 and len(todo) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(todo)), thread_name_prefix="local-copy") as pool:
+            results = list(pool.map(_save, todo))
+    else:
+        results = [_save(f) for f in todo]
+
+    details = [{"file": file['new_name'], "skipped": True} for file in files.values() if _is_saved(file, skip)]
+    details += results
+    saved = sum(1 for d in results if d["ok"])
+    failed = len(results) - saved
+    message = f"Saved {saved} files locally to {target_dir}"
+    if failed:
+        message += f", {failed} failed"
+    return {
+        "ok": failed == 0,
+        "message": message,
+        "saved": saved,
+        "failed": failed,
+        "skipped": len(files) - len(todo),
+        "bytes": sum(d.get("bytes", 0) for d in results),
+        "details": details,
+    }
+
+
+def _transfer_settings(minio_payload) -> Tuple[int, int, int]:
+    """(parallel files, multipart part size in bytes, parallel parts per file) from the MinIO payload."""
+    def _int(key, default, minimum):
+        try:
+            return max(minimum, int(minio_payload.get(key) or default))
+        except (TypeError, ValueError):
+            return default
+    workers = _int("upload_workers", DEFAULT_UPLOAD_WORKERS, 1)
+    part_size = _int("part_size_mb", DEFAULT_PART_SIZE_MB, MIN_PART_SIZE_MB) * 1024**2
+    part_concurrency = _int("part_concurrency", DEFAULT_PART_CONCURRENCY, 1)
+    return workers, part_size, part_concurrency
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file, read in 1 MB chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
 
-def save_files_to_minio(files, minio_payload) -> Dict[str, Any]:
+def content_key(digest: str) -> str:
+    """Object key of a content-addressed file."""
+    return f"{CONTENT_PREFIX}/{digest[:2]}/{digest}"
+
+
+def _stored_size(s3, bucket: str, key: str):
+    """Size of an existing object, None if there is none."""
+    from botocore.exceptions import ClientError  # type: ignore
+
+    try:
+        return s3.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+def _upload_file(s3, transfer_config, bucket: str, file, on_progress, content_addressed: bool = False,
+                 multipart=None) -> Dict[str, Any]:
+    """Upload one file (multipart above the part size); return its result entry.
+
+    multipart(key, source_path, progress=, extra_args=) sends the files of at
+    least the multipart threshold (a resumable upload_resumable).
+    With content_addressed the object key is the file's SHA-256 and the upload
+    is skipped when the bucket already holds that object ("reused": True).
+    """
+    key = f"{file['minio_folder']}/{file['new_name']}"
+    detail: Dict[str, Any] = {"file": file['new_name'], "key": key}
+    try:
+        size = os.path.getsize(file['source_path'])
+        extra_args = None
+        if content_addressed:
+            digest = file_sha256(file['source_path'])
+            key = content_key(digest)
+            detail.update(key=key, sha256=digest)
+            if _stored_size(s3, bucket, key) == size:
+                emit(on_progress, "raw_file_progress", target="minio", file=file['new_name'], bytes=size, total=size)
+                emit(on_progress, "raw_file_saved", target="minio", file=file['new_name'], source=source_id(file),
+                     bytes=size, seconds=0.0, reused=True, sha256=digest)
+                detail.update(ok=True, bytes=size, seconds=0.0, reused=True)
+                return detail
+            extra_args = {"Metadata": {"sha256": digest}}
+        progress = ByteProgress(on_progress, "minio", file['new_name'], size)
+        started = time.monotonic()
+        if multipart is not None and size >= transfer_config.multipart_threshold:
+            multipart(key, file['source_path'], progress=progress, extra_args=extra_args)
+        else:
+            s3.upload_file(file['source_path'], bucket, key, ExtraArgs=extra_args, Callback=progress,
+                           Config=transfer_config)
+        seconds = time.monotonic() - started
+        progress.flush()
+    except Exception as e:
+        print(f"ERROR uploading {file['source_path']} to MinIO: {e}", file=sys.stderr)
+        detail.update(ok=False, error=str(e))
+        return detail
+    digest = {"sha256": detail["sha256"]} if content_addressed else {}
+    emit(on_progress, "raw_file_saved", target="minio", file=file['new_name'], source=source_id(file),
+         bytes=size, seconds=seconds, **digest)
+    detail.update(ok=True, bytes=size, seconds=seconds)
+    return detail
+
+
+def save_files_to_minio(files, minio_payload, on_progress: ProgressCallback | None = None, skip=(),
+                        clients: MinioClients | None = None, content_addressed: bool = False) -> Dict[str, Any]:
     """Upload files to a MinIO/S3 bucket using boto3.
 
     minio_payload must contain: endpoint, access_key, secret_key, bucket, tls (0/1 or bool)
+    and may set the transfer: upload_workers (files uploaded in parallel),
+    part_size_mb (multipart part size, also the multipart threshold) and
+    part_concurrency (parts of one file uploaded in parallel).
+    Multipart uploads are resumable: their parts are recorded in the
+    upload_state file (services.resumable_upload) and a later call only sends
+    the parts missing from the bucket.
+    clients, if given, is the batch's MinioClients: its client and bucket check
+    are reused instead of being set up again for this call.
+    With content_addressed each file is stored once under content_key(its
+    SHA-256), whatever its name: a file whose object already exists is not
+    uploaded again (counted under "reused") and its detail carries "sha256".
+    Files whose source_id is in ``skip`` (already uploaded by a previous attempt) are left alone;
+    when ``skip`` maps source_ids to their recorded SHA-256, that digest is used for
+    a skipped content-addressed file instead of hashing it again.
+    The result lists every file under "details" ({file, key, ok, bytes, seconds}
+    or {file, key, ok: False, error}, {file, skipped: True} for skipped ones);
+    a failed file does not stop the others.
     """
     try:
-        import boto3  # type: ignore
-        from botocore.config import Config  # type: ignore
-        from botocore.exceptions import ClientError  # type: ignore
+        from boto3.s3.transfer import TransferConfig  # type: ignore
     except Exception as e:
         return {"ok": False, "message": f"boto3 not available: {e}", "uploaded": 0, "failed": len(files or []), "details": []}
 
-    endpoint = _build_minio_endpoint_url(minio_payload.get("endpoint", ""), bool(minio_payload.get("tls", 0)))
-    access_key = (minio_payload.get("access_key") or "").strip()
-    secret_key = (minio_payload.get("secret_key") or "").strip()
-    bucket = (minio_payload.get("bucket") or "").strip()
-
+    endpoint, access_key, secret_key, bucket = connection_settings(minio_payload)
     if not endpoint or not access_key or not secret_key or not bucket:
         return {"ok": False, "message": "Missing MinIO credentials or bucket", "uploaded": 0, "failed": len(files or []), "details": []}
 
-    s3 = boto3.client(
-        "s3",
-        endpoint_url=endpoint,
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
-        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
-    )
-    # Verify bucket exists
+    if clients is None:
+        with MinioClients() as own_clients:
+            return save_files_to_minio(files, minio_payload, on_progress=on_progress, skip=skip, clients=own_clients,
+                                       content_addressed=content_addressed)
+
+    workers, part_size, part_concurrency = _transfer_settings(minio_payload)
+    # one pooled connection per part in flight
+    pool_size = max(10, workers * part_concurrency)
     try:
-        s3.head_bucket(Bucket=bucket)
+        clients.check_bucket(minio_payload, pool_size)
     except Exception as e:
         return {"ok": False, "message": f"Bucket not accessible: {e}", "uploaded": 0, "failed": len(files or []), "details": []}
+    s3 = clients.client(minio_payload, pool_size)
 
+    transfer_config = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size,
+                                     max_concurrency=part_concurrency, use_threads=part_concurrency > 1)
+    multipart = functools.partial(upload_resumable, s3, client_fingerprint(minio_payload), bucket,
+                                  part_size=part_size, part_concurrency=part_concurrency,
+                                  path=state_path(minio_payload))
+    todo = [file for file in files.values() if not _is_saved(file, skip)]
+
+    def _upload(f):
+        return _upload_file(s3, transfer_config, bucket, f, on_progress, content_addressed, multipart)
+
+    if workers > 1 and len(todo) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(todo)), thread_name_prefix="minio-upload") as pool:
+            results = list(pool.map(_upload, todo))
+    else:
+        results = [_upload(f) for f in todo]
+
+    details = []
     for file in files.values():
-        s3.upload_file(file['source_path'], bucket, f"{file['minio_folder']}/{file['new_name']}")
-    return {"ok": True, "message": f"Uploaded {len(files)} files to MinIO bucket {bucket}"}
+        if _is_saved(file, skip):
+            detail = {"file": file['new_name'], "skipped": True}
+            if content_addressed:
+                # already uploaded: the digest is still needed for the run config
+                digest = _saved_digest(file, skip)
+                if digest is None and os.path.isfile(file['source_path']):
+                    digest = file_sha256(file['source_path'])
+                if digest is not None:
+                    detail["sha256"] = digest
+            details.append(detail)
+    details += results
+    uploaded = sum(1 for d in results if d["ok"])
+    failed = len(results) - uploaded
+    reused = sum(1 for d in results if d.get("reused"))
+    message = f"Uploaded {uploaded - reused} files to MinIO bucket {bucket}"
+    if reused:
+        message += f", {reused} already stored"
+    if failed:
+        message += f", {failed} failed"
+    return {
+        "ok": failed == 0,
+        "message": message,
+        "uploaded": uploaded,
+        "failed": failed,
+        "skipped": len(files) - len(todo),
+        "reused": reused,
+        "bytes": sum(d.get("bytes", 0) for d in results if not d.get("reused")),
+        "details": details,
+    }
 
 
-def save_raw_data(files, raw_data_save_options, minio_payload):
+def save_raw_data(files, raw_data_save_options, minio_payload, on_progress: ProgressCallback | None = None, skip=None,
+                  clients: MinioClients | None = None):
     """High-level helper that saves raw data locally and/or to MinIO based on options.
 
     raw_data_save_options can include:
       - send_minio: bool
       - save_locally: bool
       - local_path: str
+      - local_mode: "copy" (default), "hardlink" or "reflink" (see services.local_copy)
+      - local_workers: int, files copied in parallel (default 4)
+      - content_addressed: bool, store MinIO objects by content (see save_files_to_minio)
+    on_progress, if given, receives "raw_file_progress" events while bytes are
+    transferred and a "raw_file_saved" event per file and target.
+    skip maps a target ("local"/"minio") to the source_ids already saved there (a
+    {source_id: sha256 or None} mapping, as kept by the batch journal); those
+    files are not saved again but still appear in the returned config.
+    clients is the batch's MinioClients (see save_files_to_minio).
     Returns a combined status with sub-results under 'minio' and 'local'.
     """
     send_m = bool(raw_data_save_options.get("send_minio", False))
     save_l = bool(raw_data_save_options.get("save_locally", False))
     local_path = raw_data_save_options.get("local_path", "") or ""
+    content_addressed = bool(raw_data_save_options.get("content_addressed", False))
 
+    skip = skip or {}
     result = {"ok": True, "message": "", "minio": None, "local": None}
     messages = []
     config = {}
 
     if save_l:
-        local_res = save_files_locally(files, local_path)
+        local_mode, local_workers = _local_settings(raw_data_save_options)
+        local_res = save_files_locally(files, local_path, on_progress=on_progress, skip=skip.get("local", ()),
+                                       mode=local_mode, workers=local_workers)
         result["local"] = local_res
         result["ok"] = result["ok"] and bool(local_res.get("ok", False))
         messages.append(local_res.get("message", ""))
         config["local"] = get_config(files, local_path=local_path)
 
     if send_m:
-        minio_res = save_files_to_minio(files, minio_payload)
+        minio_res = save_files_to_minio(files, minio_payload, on_progress=on_progress, skip=skip.get("minio", ()),
+                                        clients=clients, content_addressed=content_addressed)
         result["minio"] = minio_res
         result["ok"] = result["ok"] and bool(minio_res.get("ok", False))
         messages.append(minio_res.get("message", ""))
-        config["minio"] = get_config(files, minio_payload=minio_payload)
+        digests = {d["file"]: d["sha256"] for d in minio_res.get("details", []) if d.get("sha256")}
+        config["minio"] = get_config(files, minio_payload=minio_payload, digests=digests or None)
 
     if not send_m and not save_l:
         result["ok"] = True
@@ -114,7 +369,18 @@ def save_raw_data(files, raw_data_save_options, minio_payload):
     return result, config
 
 
-def get_config(files, minio_payload=None, local_path=None):
+def failed_files(result) -> List[Dict[str, Any]]:
+    """Per-file failures of a save_raw_data result (files that were tried and not saved)."""
+    return [d for sub in (result.get("minio"), result.get("local")) if sub
+            for d in sub.get("details", []) if d.get("ok") is False]
+
+
+def get_config(files, minio_payload=None, local_path=None, digests=None):
+    """Raw-data entry of the run config, one per file (keyed by minio_folder).
+
+    digests maps new_name to the SHA-256 of content-addressed files: their
+    MinIO entry gets "sha256" and the object "key" (content_key) to read.
+    """
     config = {}
     for file in files.values():
         file_config = {
@@ -126,6 +392,10 @@ def get_config(files, minio_payload=None, local_path=None):
         if minio_payload:
             file_config["bucket"] = minio_payload.get("bucket", "")
             file_config["minio_folder"] = file['minio_folder']
+            digest = (digests or {}).get(file['new_name'])
+            if digest:
+                file_config["sha256"] = digest
+                file_config["key"] = content_key(digest)
         
         else:
             file_config["local_path"] = local_path + "/" + file['minio_folder']
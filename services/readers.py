@@ -0,0 +1,152 @@
+"""Reader registry: one reader per (kind, file type), backends imported on first use.
+
+Kinds of readers:
+
+- ``rows``: cell grid of a table (CSV strings, Excel typed cells)
+- ``document``: parsed JSON/YAML document
+- ``sheets``: sheet names of a workbook
+- ``columns``: column names of a binary metrics file (no data read)
+
+Heavy libraries (openpyxl, PyYAML, pyarrow, h5py, pandas) are imported by
+``backend`` the first time a file needing them is read, so formatting a
+folder of CSV/JSON files only loads the standard library readers. A
+missing optional library is reported as ``ValueError("... Run: pip install
+...")``, like the other readers of the app.
+"""
+from __future__ import annotations
+
+import csv
+import importlib
+import importlib.util
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# module -> pip package
+PACKAGES = {
+    "openpyxl": "openpyxl",
+    "yaml": "pyyaml",
+    "pyarrow": "pyarrow",
+    "h5py": "h5py",
+    "numpy": "numpy",
+    "pandas": "pandas",
+}
+
+_modules: Dict[str, Any] = {}
+_lock = threading.Lock()
+# kind -> {file type: (reader, backend module or None)}
+_READERS: Dict[str, Dict[str, Tuple[Callable[..., Any], Optional[str]]]] = {}
+
+
+def backend(module: str):
+    """Import ``module`` on first use (``ValueError`` with a pip hint if it is missing)."""
+    mod = _modules.get(module)
+    if mod is not None:
+        return mod
+    with _lock:
+        if module not in _modules:
+            try:
+                _modules[module] = importlib.import_module(module)
+            except ImportError:
+                package = PACKAGES.get(module, module)
+                raise ValueError(f"{package} is not installed. Run: pip install {package}") from None
+        return _modules[module]
+
+
+def has_backend(module: str) -> bool:
+    """Whether ``module`` can be imported (without importing it)."""
+    return module in _modules or importlib.util.find_spec(module) is not None
+
+
+def file_type(path: Any) -> str:
+    return os.path.splitext(str(path))[1].lower().lstrip(".")
+
+
+def register(kind: str, file_types: Tuple[str, ...], needs: Optional[str] = None):
+    """Decorator adding a reader of ``kind`` for ``file_types`` (``needs``: its backend module)."""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        for t in file_types:
+            _READERS.setdefault(kind, {})[t] = (func, needs)
+        return func
+    return decorator
+
+
+def supported(kind: str) -> Tuple[str, ...]:
+    """File types with a reader of ``kind``."""
+    return tuple(_READERS.get(kind, {}))
+
+
+def reader(kind: str, path: Any, kind_label: Optional[str] = None) -> Callable[..., Any]:
+    """Reader of ``kind`` for the type of ``path``; its backend is imported here."""
+    t = file_type(path)
+    entry = _READERS.get(kind, {}).get(t)
+    if entry is None:
+        raise ValueError(f"Unsupported {kind_label or kind} type: {t}")
+    func, needs = entry
+    if needs is not None:
+        backend(needs)
+    return func
+
+
+# --- rows ---
+@register("rows", ("csv",))
+def _csv_rows(path: str, sheet: Optional[str] = None, sep: str = ",") -> List[list]:
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        return [row for row in csv.reader(f, delimiter=sep)]
+
+
+@register("rows", ("xlsx", "xlsm"), needs="openpyxl")
+def _excel_rows(path: str, sheet: Optional[str] = None, sep: Optional[str] = None) -> List[tuple]:
+    wb = backend("openpyxl").load_workbook(filename=path, read_only=True, data_only=True)
+    try:
+        if sheet and sheet not in wb.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet}' not found in {os.path.basename(path)}")
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        return [tuple(row) for row in ws.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+# --- documents ---
+@register("document", ("json",))
+def _json_document(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@register("document", ("yaml", "yml"), needs="yaml")
+def _yaml_document(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return backend("yaml").safe_load(f)
+
+
+# --- workbook sheets ---
+@register("sheets", ("xlsx", "xlsm"), needs="openpyxl")
+def _excel_sheets(path: str) -> List[str]:
+    wb = backend("openpyxl").load_workbook(filename=path, read_only=True, data_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+# --- binary metrics columns ---
+def _binary_columns(path: str) -> List[str]:
+    from services.metrics_reader import list_columns
+
+    return list_columns(path, file_type(path))
+
+
+register("columns", ("parquet", "pq", "feather", "arrow"), needs="pyarrow")(_binary_columns)
+register("columns", ("npy", "npz"), needs="numpy")(_binary_columns)
+register("columns", ("h5", "hdf5"), needs="h5py")(_binary_columns)
+
+
+def sheet_names(path: Any) -> List[str]:
+    return reader("sheets", path)(str(path))
+
+
+def list_columns(path: Any) -> List[str]:
+    """Column names of a binary metrics file."""
+    return reader("columns", path, "metrics")(str(path))
@@ -0,0 +1,252 @@
+"""Multipart uploads that survive a restart of the app.
+
+A file above the multipart threshold is sent as an S3 multipart upload whose
+upload id and completed parts (number, ETag) are recorded in a small local
+state file (``STATE_PATH``, or ``upload_state`` in the MinIO payload). When
+the same file is sent again to the same object key, the parts already in the
+bucket are listed and only the missing ones are uploaded; a changed source
+file (size or modification time) starts a new upload.
+
+Raw-data object names do not depend on the time of the send (the folder's
+date/time, or a hash of the unchanged source file), so a restarted send
+targets the same key. An upload of the same source path recorded under
+another key of the bucket (a renamed folder, or a file that changed since)
+is superseded and aborted rather than left behind, but only once it is
+stale: not running in this process and without a part recorded for
+``STALE_SECONDS`` (another batch may be sending it right now). Uploads that will not be resumed can be aborted with
+``abort_pending_uploads`` so the bucket does not keep their parts.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+STATE_PATH = Path.home() / ".altarsender_uploads.json"
+# an upload of another process with no part recorded for this long is not running anymore
+STALE_SECONDS = 15 * 60
+
+# serializes read-modify-write of the state file across upload threads
+_lock = threading.Lock()
+# entry ids of the uploads running in this process
+_active = set()
+
+
+def state_path(minio_payload: Dict[str, Any]) -> Path:
+    return Path(minio_payload.get("upload_state") or STATE_PATH)
+
+
+def load_state(path: Path) -> Dict[str, Dict[str, Any]]:
+    """{upload entry id: {bucket, key, upload_id, part_size, source, parts, updated}} ({} if missing or unreadable)."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _write_state(path: Path, data: Dict[str, Any]) -> None:
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _update_state(path: Path, entry_id: str, change: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]):
+    """Replace one entry by ``change(entry)`` (None removes it); state write errors are only reported."""
+    with _lock:
+        data = load_state(path)
+        entry = change(data.get(entry_id))
+        if entry is None:
+            data.pop(entry_id, None)
+        else:
+            data[entry_id] = entry
+        try:
+            _write_state(path, data)
+        except OSError as e:
+            print(f"WARNING cannot write upload state {path}: {e}", file=sys.stderr)
+
+
+def _entry_id(fingerprint: str, bucket: str, key: str) -> str:
+    return f"{fingerprint}|{bucket}|{key}"
+
+
+def _source(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _claim(path: Path, entry_id: str, prefix: str, source: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Mark ``entry_id`` as running here; remove and return the stale uploads it supersedes."""
+    now = time.time()
+    with _lock:
+        _active.add(entry_id)
+        data = load_state(path)
+        superseded = [
+            data.pop(other_id) for other_id, other in list(data.items())
+            if other_id != entry_id and other_id.startswith(prefix) and other_id not in _active
+            and (other.get("source") or {}).get("path") == source["path"]
+            and now - other.get("updated", 0) > STALE_SECONDS
+        ]
+        if superseded:
+            try:
+                _write_state(path, data)
+            except OSError as e:
+                print(f"WARNING cannot write upload state {path}: {e}", file=sys.stderr)
+                return []
+    return superseded
+
+
+def _part_entry(part: Dict[str, Any]) -> Dict[str, Any]:
+    """What complete_multipart_upload needs of a part (number, ETag and checksum if any)."""
+    return {k: v for k, v in part.items() if k in ("PartNumber", "ETag") or k.startswith("Checksum")}
+
+
+def _listed_parts(s3, bucket: str, key: str, upload_id: str) -> Dict[int, Dict[str, Any]]:
+    parts: Dict[int, Dict[str, Any]] = {}
+    for page in s3.get_paginator("list_parts").paginate(Bucket=bucket, Key=key, UploadId=upload_id):
+        for part in page.get("Parts", []):
+            parts[part["PartNumber"]] = part
+    return parts
+
+
+def _is_missing_upload(error: Exception) -> bool:
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("NoSuchUpload", "404")
+
+
+def upload_resumable(s3, fingerprint: str, bucket: str, key: str, source_path: str, part_size: int,
+                     part_concurrency: int, progress: Callable[[int], None],
+                     extra_args: Optional[Dict[str, Any]] = None, path: Path = STATE_PATH) -> int:
+    """Upload ``source_path`` as a multipart upload, resuming a recorded one; return the bytes sent now."""
+    from botocore.exceptions import ClientError  # type: ignore
+    from s3transfer.utils import ReadFileChunk  # type: ignore
+
+    entry_id = _entry_id(fingerprint, bucket, key)
+    source = _source(source_path)
+    size = source["size"]
+    superseded = _claim(path, entry_id, _entry_id(fingerprint, bucket, ""), source)
+    try:
+        for other in superseded:
+            # the same source recorded under an older object name: its parts would never be used
+            try:
+                s3.abort_multipart_upload(Bucket=bucket, Key=other["key"], UploadId=other["upload_id"])
+            except ClientError as e:
+                if not _is_missing_upload(e):
+                    print(f"WARNING cannot abort the superseded upload of {other['key']}: {e}", file=sys.stderr)
+        entry = load_state(path).get(entry_id)
+        done: Dict[int, Dict[str, Any]] = {}
+        if entry is not None and entry.get("source") == source:
+            part_size = int(entry["part_size"])
+            try:
+                listed = _listed_parts(s3, bucket, key, entry["upload_id"])
+            except ClientError as e:
+                if not _is_missing_upload(e):
+                    raise
+                entry = None
+            else:
+                recorded = entry.get("parts", {})
+                for number, part in listed.items():
+                    expected = min(part_size, size - (number - 1) * part_size)
+                    etag = recorded.get(str(number), {}).get("ETag")
+                    if part.get("Size") == expected and etag in (None, part["ETag"]):
+                        done[number] = _part_entry(part)
+        elif entry is not None:
+            # the file changed since: its parts are useless
+            try:
+                s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=entry["upload_id"])
+            except ClientError:
+                pass
+            entry = None
+
+        if entry is None:
+            upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, **(extra_args or {}))["UploadId"]
+            entry = {"bucket": bucket, "key": key, "upload_id": upload_id, "part_size": part_size,
+                     "source": source, "parts": {}, "updated": time.time()}
+            _update_state(path, entry_id, lambda _: entry)
+        upload_id = entry["upload_id"]
+
+        count = max(1, -(-size // part_size))
+        already = sum(min(part_size, size - (n - 1) * part_size) for n in done)
+        if already:
+            progress(already)
+
+        def _record(part: Dict[str, Any]):
+            def change(current):
+                if current is None or current.get("upload_id") != upload_id:
+                    return current
+                current.setdefault("parts", {})[str(part["PartNumber"])] = part
+                current["updated"] = time.time()
+                return current
+            _update_state(path, entry_id, change)
+
+        def _send(number: int) -> Dict[str, Any]:
+            start = (number - 1) * part_size
+            callbacks = [lambda bytes_transferred, **kwargs: progress(bytes_transferred)]
+            with ReadFileChunk.from_filename(source_path, start, part_size, callbacks=callbacks) as body:
+                response = s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+            part = _part_entry({"PartNumber": number, **response})
+            _record(part)
+            return part
+
+        missing = [n for n in range(1, count + 1) if n not in done]
+        if part_concurrency > 1 and len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=min(part_concurrency, len(missing)), thread_name_prefix="minio-part") as pool:
+                sent = list(pool.map(_send, missing))
+        else:
+            sent = [_send(n) for n in missing]
+        parts = sorted([*done.values(), *sent], key=lambda p: p["PartNumber"])
+        s3.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+        _update_state(path, entry_id, lambda _: None)
+        return size - already
+    finally:
+        with _lock:
+            _active.discard(entry_id)
+
+
+def abort_pending_uploads(minio_payload: Dict[str, Any], clients=None) -> Dict[str, Any]:
+    """Abort the recorded, unfinished uploads to the payload's endpoint and bucket and forget them."""
+    from services.minio_conn import MinioClients, client_fingerprint, connection_settings
+
+    path = state_path(minio_payload)
+    fingerprint = client_fingerprint(minio_payload)
+    bucket = connection_settings(minio_payload)[3]
+    prefix = _entry_id(fingerprint, bucket, "")
+    pending = {eid: e for eid, e in load_state(path).items() if eid.startswith(prefix)}
+    if not pending:
+        return {"ok": True, "message": "No unfinished upload recorded", "aborted": 0, "failed": []}
+    if clients is None:
+        with MinioClients() as own_clients:
+            return abort_pending_uploads(minio_payload, own_clients)
+
+    s3 = clients.client(minio_payload)
+    aborted = 0
+    failed: List[Dict[str, str]] = []
+    for eid, entry in pending.items():
+        try:
+            s3.abort_multipart_upload(Bucket=entry["bucket"], Key=entry["key"], UploadId=entry["upload_id"])
+        except Exception as e:
+            if not _is_missing_upload(e):
+                print(f"ERROR aborting upload of {entry['key']}: {e}", file=sys.stderr)
+                failed.append({"key": entry["key"], "error": str(e)})
+                continue
+        _update_state(path, eid, lambda _: None)
+        aborted += 1
+    message = f"Aborted {aborted} unfinished uploads in bucket {bucket}"
+    if failed:
+        message += f", {len(failed)} failed"
+    return {"ok": not failed, "message": message, "aborted": aborted, "failed": failed}
@@ -0,0 +1,231 @@
+"""Dry-run planning for batch sends (no network writes).
+
+The planner runs on the output of the normal formatting stage and reports,
+per folder and in total, what a send would write: metric points, document
+sizes, artifact and raw-data bytes, items over MongoDB limits, and an
+estimated transfer time based on the throughput measured during previous
+sends (stored in ``THROUGHPUT_PATH``, or ``throughput_state`` in the batch
+payload; ``False`` neither records nor uses it).
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.decimation import expected_points
+from services.raw_data_saver import format_size, get_config
+
+THROUGHPUT_PATH = Path.home() / ".altarsender_throughput.json"
+
+BSON_LIMIT = 16 * 1024**2
+ARTIFACT_LIMIT = 25 * 1024**2
+
+
+def _doc_size(doc: Any) -> int:
+    """BSON size of a document, or its JSON size when it cannot be BSON-encoded as is."""
+    try:
+        import bson
+
+        return len(bson.encode(doc if isinstance(doc, dict) else {"v": doc}))
+    except Exception:
+        return len(json.dumps(doc, default=str).encode("utf-8"))
+
+
+def _bson_array_size(n: int, item_size: int) -> int:
+    """Size of a BSON array of n fixed-size items (type byte + index key + value)."""
+    if n <= 0:
+        return 5
+    key_bytes = 0
+    digits, start = 1, 0
+    while start < n:
+        end = min(n, 10**digits)
+        key_bytes += (end - start) * (digits + 1)
+        start, digits = end, digits + 1
+    return 5 + n * (1 + item_size) + key_bytes
+
+
+def _metric_points(mets: Dict[str, Any]) -> Dict[str, int]:
+    if "stream" in (mets or {}):
+        points = mets["stream"].count_points()
+    else:
+        columns = (mets or {}).get("columns", {}) or {}
+        x_axis = (mets or {}).get("x_axis")
+        points = {}
+        for name, series in columns.items():
+            n = len(series)
+            points[name] = min(n, len(x_axis)) if x_axis is not None else n
+    if (mets or {}).get("decimation"):
+        points = {name: expected_points(mets["decimation"], n) for name, n in points.items()}
+    return points
+
+
+def _file_sizes(files: Dict[str, Any]) -> Dict[str, int]:
+    sizes = {}
+    for f in (files or {}).values():
+        src = f.get("source_path") if isinstance(f, dict) else str(f)
+        sizes[src] = os.path.getsize(src) if src and os.path.isfile(src) else 0
+    return sizes
+
+
+def plan_folder(folder: str, prepared: Dict[str, Any], raw_data_save_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe what sending one prepared folder would write."""
+    plan: Dict[str, Any] = {"folder": folder, "experiment": prepared.get("experiment_name"), "over_limits": []}
+    if prepared.get("error") is not None:
+        plan["error"] = str(prepared["error"])
+        return plan
+
+    sweep = prepared.get("sweep")
+    if sweep is not None:
+        # sweep mode: one run per config row, each with the metrics of its key value
+        points = {}
+        for value, mets in (sweep.get("metrics") or {}).items():
+            for name, n in _metric_points(mets).items():
+                points[f"{name} [{value}]"] = n
+    else:
+        points = _metric_points(prepared.get("metrics"))
+    # one metrics document per column: steps (double), values (double), timestamps (datetime)
+    metric_docs = {name: 3 * _bson_array_size(n, 8) + 100 for name, n in points.items()}
+    artifacts = _file_sizes(prepared.get("artifacts"))
+    raw_files = _file_sizes(prepared.get("raw_data"))
+    raw_config = {}
+    if raw_files:
+        if raw_data_save_options.get("send_minio"):
+            raw_config["minio"] = get_config(prepared["raw_data"], minio_payload={"bucket": ""})
+        if raw_data_save_options.get("save_locally"):
+            raw_config["local"] = get_config(prepared["raw_data"], local_path=raw_data_save_options.get("local_path", ""))
+
+    config_docs = [{**prepared.get("config", {}), **row} for row in sweep["rows"]] if sweep is not None \
+        else [dict(prepared.get("config") or {})]
+    for config_doc in config_docs:
+        if raw_config:
+            config_doc["raw_data"] = raw_config
+    config_sizes = [_doc_size(doc) for doc in config_docs]
+    plan.update({
+        "runs": len(config_docs),
+        "metric_points": sum(points.values()),
+        "config_bytes": sum(config_sizes),
+        "results_bytes": _doc_size(prepared.get("results") or {}),
+        "metrics_doc_bytes": sum(metric_docs.values()),
+        "artifact_bytes": sum(artifacts.values()),
+        "raw_data_bytes": sum(raw_files.values()),
+        "raw_data_files": len(raw_files),
+    })
+
+    if max(config_sizes, default=0) > BSON_LIMIT:
+        plan["over_limits"].append(f"config document {format_size(max(config_sizes))} > 16 MB BSON limit")
+    if plan["results_bytes"] > BSON_LIMIT:
+        plan["over_limits"].append(f"results document {format_size(plan['results_bytes'])} > 16 MB BSON limit")
+    for name, size in metric_docs.items():
+        if size > BSON_LIMIT:
+            plan["over_limits"].append(f"metric '{name}' document {format_size(size)} > 16 MB BSON limit")
+    for src, size in artifacts.items():
+        if size > ARTIFACT_LIMIT:
+            plan["over_limits"].append(f"artifact {os.path.basename(src)} {format_size(size)} > 25 MB artifact limit")
+    return plan
+
+
+# --- measured throughput ---
+def throughput_path(batch_payload: Dict[str, Any]) -> Optional[Path]:
+    """File of the measured throughput for this batch, None when it is turned off."""
+    value = batch_payload.get("throughput_state")
+    if value is None or value is True:
+        return THROUGHPUT_PATH
+    return Path(value) if value else None
+
+
+def load_measured_throughput(path: Optional[Path] = None) -> Dict[str, float]:
+    """Bytes/s per raw-data target ("minio", "local") measured by previous sends."""
+    try:
+        data = json.loads(Path(path or THROUGHPUT_PATH).read_text(encoding="utf-8"))
+        return {k: float(v) for k, v in data.items() if float(v) > 0}
+    except Exception:
+        return {}
+
+
+def record_measured_throughput(measured: Dict[str, float], path: Optional[Path] = None) -> None:
+    measured = {k: v for k, v in measured.items() if v > 0}
+    if not measured:
+        return
+    data = load_measured_throughput(path)
+    data.update(measured)
+    try:
+        Path(path or THROUGHPUT_PATH).write_text(json.dumps(data, indent=2), encoding="utf-8")
+    except Exception:
+        pass
+
+
+class ThroughputMeter:
+    """Progress listener measuring bytes/s per raw-data target from raw_file_saved events."""
+
+    def __init__(self):
+        self._bytes: Dict[str, int] = {}
+        self._seconds: Dict[str, float] = {}
+
+    def __call__(self, ev: Dict[str, Any]) -> None:
+        if ev.get("event") != "raw_file_saved" or not ev.get("seconds"):
+            return
+        target = ev.get("target", "")
+        self._bytes[target] = self._bytes.get(target, 0) + int(ev.get("bytes", 0) or 0)
+        self._seconds[target] = self._seconds.get(target, 0.0) + float(ev["seconds"])
+
+    def measured(self) -> Dict[str, float]:
+        return {t: self._bytes[t] / s for t, s in self._seconds.items() if s > 0}
+
+
+def summarize(plans: List[Dict[str, Any]], raw_data_save_options: Dict[str, Any],
+              throughput: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Totals and estimated transfer time for a list of plan_folder results."""
+    keys = ("runs", "metric_points", "config_bytes", "results_bytes", "metrics_doc_bytes",
+            "artifact_bytes", "raw_data_bytes", "raw_data_files")
+    total = {k: sum(p.get(k, 0) for p in plans) for k in keys}
+    total["folders"] = len(plans)
+    total["failed"] = sum(1 for p in plans if p.get("error"))
+    total["over_limits"] = sum(len(p.get("over_limits", [])) for p in plans)
+
+    throughput = throughput if throughput is not None else load_measured_throughput()
+    mongo_bytes = total["config_bytes"] + total["results_bytes"] + total["metrics_doc_bytes"] + total["artifact_bytes"]
+    transfers = [("mongo", mongo_bytes)]
+    if raw_data_save_options.get("send_minio"):
+        transfers.append(("minio", total["raw_data_bytes"]))
+    if raw_data_save_options.get("save_locally"):
+        transfers.append(("local", total["raw_data_bytes"]))
+    estimate = 0.0
+    unmeasured = []
+    for target, size in transfers:
+        # Mongo writes are not timed separately; the MinIO link is the closest measure
+        bps = throughput.get(target) or (throughput.get("minio") if target == "mongo" else None)
+        if not size:
+            continue
+        if bps:
+            estimate += size / bps
+        else:
+            unmeasured.append(target)
+    total["estimated_seconds"] = math.ceil(estimate)
+    total["unmeasured"] = unmeasured
+    return {"total": total, "throughput_bps": throughput}
+
+
+def format_plan_message(summary: Dict[str, Any]) -> str:
+    total = summary["total"]
+    parts = [
+        f"{total['folders']} folders",
+    ]
+    if total["runs"] != total["folders"] - total["failed"]:
+        parts.append(f"{total['runs']} runs")
+    parts += [
+        f"{total['metric_points']:,} metric points",
+        f"{format_size(total['artifact_bytes'])} artifacts",
+        f"{format_size(total['raw_data_bytes'])} raw data in {total['raw_data_files']} files",
+    ]
+    if total["failed"]:
+        parts.append(f"{total['failed']} folders cannot be parsed")
+    if total["over_limits"]:
+        parts.append(f"{total['over_limits']} items over MongoDB limits")
+    estimate = f"estimated transfer {total['estimated_seconds']} s"
+    if total["unmeasured"]:
+        estimate += f" (excluding {', '.join(total['unmeasured'])}: no throughput measured yet)"
+    parts.append(estimate)
+    return "Plan: " + ", ".join(parts)
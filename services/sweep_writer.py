@@ -0,0 +1,236 @@
+"""Sweep mode: one Sacred run per row of a CSV/Excel config.
+
+With ``config["options"]["sweep"]`` each config row becomes its own run
+instead of the whole table being the config of one run. The optional
+``sweep_key`` column links a row to its data in the folder:
+
+- metrics: the rows of the metrics file whose ``sweep_key`` column has the
+  same value (the column is read with the selected metrics)
+- results: the row of a tabular results file (with a header) whose
+  ``sweep_key`` column has the same value; a key/value results file, or
+  one without that column, is shared by every run
+
+Artifacts and raw data belong to the folder: they are stored once and every
+run of the folder references them. The runs are not created through
+``ex.run()``: ``SweepRunWriter`` builds the same documents as Sacred's
+MongoObserver and inserts them (and their metrics) with one bulk write per
+``batch_runs`` rows. Every run carries ``info.altar.sweep`` ({key, value,
+row}) next to the folder identity.
+"""
+from __future__ import annotations
+
+import mimetypes
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.decimation import BlockDecimator
+from services.metrics_writer import metric_documents
+
+DEFAULT_BATCH_RUNS = 500
+
+Series = Tuple[Any, Any]
+
+
+def sweep_options(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """{"key": column or ""} when sweep mode is enabled for this config selector, else None."""
+    options = (config or {}).get("options", {}) or {}
+    if not options.get("sweep"):
+        return None
+    return {"key": str(options.get("sweep_key") or "").strip()}
+
+
+def row_key(value: Any) -> Any:
+    """Comparable key value (3, 3.0 and " 3" link to the same row)."""
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            value = float(value)
+        except ValueError:
+            return value
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def split_metrics(mets: Dict[str, Any], key: str) -> Dict[Any, Dict[str, Any]]:
+    """Split format_metrics output (whose columns include ``key``) into {key value: metrics}."""
+    columns = dict(mets.get("columns", {}) or {})
+    keys = columns.pop(key, None)
+    if keys is None:
+        return {}
+    x_axis = np.asarray(mets["x_axis"]) if "x_axis" in mets else None
+    groups: Dict[Any, List[int]] = {}
+    for i, value in enumerate(keys):
+        groups.setdefault(row_key(value), []).append(i)
+    arrays = {name: np.asarray(values) for name, values in columns.items()}
+    out: Dict[Any, Dict[str, Any]] = {}
+    for value, rows in groups.items():
+        idx = np.asarray(rows)
+        part: Dict[str, Any] = {"columns": {name: arr[idx[idx < len(arr)]] for name, arr in arrays.items()}}
+        if x_axis is not None:
+            part["x_axis"] = x_axis[idx[idx < len(x_axis)]]
+        if mets.get("decimation"):
+            part["decimation"] = mets["decimation"]
+        out[value] = part
+    return out
+
+
+def metric_series(mets: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Series], Optional[Dict[str, Any]]]:
+    """({name: (steps, values)}, decimation info) of one run's metrics."""
+    if not mets or not mets.get("columns"):
+        return {}, None
+    columns, x_axis = mets["columns"], mets.get("x_axis")
+    if not mets.get("decimation"):
+        series = {}
+        for name, values in columns.items():
+            steps = x_axis if x_axis is not None else np.arange(len(values))
+            n = min(len(values), len(steps))
+            series[name] = (steps[:n], values[:n])
+        return series, None
+    decimator = BlockDecimator(mets["decimation"])
+    pieces: Dict[str, List[Series]] = {}
+    for block, steps in decimator.blocks([(columns, x_axis)]):
+        for name, values in block.items():
+            pieces.setdefault(name, []).append((steps, values))
+    series = {name: (np.concatenate([s for s, _ in parts]), np.concatenate([v for _, v in parts]))
+              for name, parts in pieces.items()}
+    return series, decimator.info()
+
+
+class SweepRunWriter:
+    """Create completed Sacred runs in bulk for the rows of one folder.
+
+    ``add`` buffers a run; every ``batch_runs`` runs (and on ``close``) the
+    runs are inserted with one ``insert_many`` and their metrics with another.
+    Run ids follow Sacred's scheme (highest ``_id`` + 1) and are taken again
+    if another sender inserted runs meanwhile.
+    """
+
+    def __init__(self, observers, experiment_name: str, batch_runs: int = DEFAULT_BATCH_RUNS):
+        from sacred import Experiment
+        from sacred.host_info import get_host_info
+
+        self.runs = observers.database["runs"]
+        self.metrics = observers.database["metrics"]
+        self.fs = observers.fs
+        self.batch_runs = max(1, int(batch_runs))
+        observer = observers.observer()
+        ex_info = dict(Experiment(experiment_name, save_git_info=False).get_experiment_info())
+        ex_info["sources"] = observer.save_sources(ex_info)
+        self._template = {
+            "experiment": ex_info,
+            "format": observer.VERSION,
+            "command": "run",
+            "host": dict(get_host_info()),
+            "meta": {"command": "run", "options": {"--capture": "no"}, "named_configs": []},
+            "status": "COMPLETED",
+            "resources": [],
+            "captured_out": "",
+            "result": None,
+        }
+        self._pending: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]] = []
+        self.run_ids: List[Any] = []
+
+    def put_artifact(self, path: str, name: str) -> Dict[str, Any]:
+        """Store one artifact file once; the returned entry goes in every run's ``artifacts``."""
+        content_type = mimetypes.guess_type(path)[0]
+        with open(path, "rb") as f:
+            file_id = self.fs.put(f, filename=f"artifact://{self.runs.name}/sweep/{name}",
+                                  content_type=content_type)
+        return {"name": name, "file_id": file_id}
+
+    def add(self, config: Dict[str, Any], info: Dict[str, Any], artifacts: List[Dict[str, Any]],
+            series: Dict[str, Series]):
+        from bson import ObjectId
+        from sacred.serializer import flatten
+
+        now = datetime.utcnow()
+        metric_docs = []
+        for name, (steps, values) in series.items():
+            docs = metric_documents(None, {name: values}, steps, timestamp=now)
+            for doc in docs:
+                doc["_id"] = ObjectId()
+            metric_docs.extend(docs)
+        info = dict(info)
+        if metric_docs:
+            info["metrics"] = [{"name": d["name"], "id": str(d["_id"])} for d in metric_docs]
+        run = {
+            **self._template,
+            "start_time": now,
+            "stop_time": now,
+            "heartbeat": now,
+            "config": flatten(config),
+            "artifacts": list(artifacts),
+            "info": info,
+        }
+        self._pending.append((run, metric_docs))
+        if len(self._pending) >= self.batch_runs:
+            self.flush()
+
+    def _insert_runs(self, runs: List[Dict[str, Any]]):
+        from pymongo import DESCENDING
+        from pymongo.errors import BulkWriteError
+
+        done = 0
+        while done < len(runs):
+            last = next(iter(self.runs.find({}, {"_id": 1}).sort("_id", DESCENDING).limit(1)), None)
+            next_id = last["_id"] + 1 if last is not None else 1
+            for i, run in enumerate(runs[done:]):
+                run["_id"] = next_id + i
+            try:
+                self.runs.insert_many(runs[done:], ordered=True)
+                done = len(runs)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if not errors or any(err.get("code") != 11000 for err in errors):
+                    raise
+                # another sender took these ids: keep what was inserted, renumber the rest
+                done += e.details.get("nInserted", 0)
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        runs = [run for run, _ in pending]
+        self._insert_runs(runs)
+        metric_docs = []
+        for run, docs in pending:
+            for doc in docs:
+                doc["run_id"] = run["_id"]
+            metric_docs.extend(docs)
+        if metric_docs:
+            self.metrics.insert_many(metric_docs, ordered=False)
+        self.run_ids.extend(run["_id"] for run in runs)
+
+    def close(self) -> List[Any]:
+        self.flush()
+        return self.run_ids
+
+
+def remove_sweep_runs(database, uid: str) -> int:
+    """Delete the sweep runs (and their metrics) of a folder, e.g. before re-sending it."""
+    ids = [r["_id"] for r in database["runs"].find(
+        {"info.altar.uid": uid, "info.altar.sweep": {"$exists": True}}, {"_id": 1})]
+    if ids:
+        database["metrics"].delete_many({"run_id": {"$in": ids}})
+        database["runs"].delete_many({"_id": {"$in": ids}})
+    return len(ids)
+
+
+def artifact_entries(writer: SweepRunWriter, arts: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """Store the folder's artifacts once: (run ``artifacts`` entries, dataFiles mapping)."""
+    entries, data_files = [], {}
+    for a in arts.values():
+        src = a.get('source_path') if isinstance(a, dict) else str(a)
+        name = a.get('new_name') if isinstance(a, dict) else os.path.basename(src)
+        if not src or not os.path.exists(src):
+            continue
+        entries.append(writer.put_artifact(src, name))
+        if isinstance(a, dict):
+            data_files[a.get('minio_folder')] = name
+    return entries, data_files
@@ -0,0 +1,254 @@
+"""Process-wide cache of parsed config/results files.
+
+The UI previews and the send path used to parse the same file several
+times, with different libraries. Here a file is parsed once into a plain
+cell grid (CSV/Excel) or document (JSON/YAML) and kept, keyed by
+(what, path, mtime, size, sheet, sep): editing a file changes its mtime or
+size, so a stale parse is never returned. Entries are evicted least
+recently used first once their estimated size exceeds the byte budget.
+
+``records`` turns a cell grid into the rows a pandas read would give
+(numeric columns inferred per column, the default NA strings and empty cells
+as NaN, duplicate/empty headers renamed), as format_config/format_results
+returned them before. Metrics are not read here: services.metrics_reader
+reads them whatever their size, so their values come from a single parser.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from services import readers
+
+DEFAULT_MAX_BYTES = 256 * 1024**2
+# parsed JSON/YAML takes about this many times the file size in memory
+DOCUMENT_OVERHEAD = 8
+NAN = float("nan")
+
+# pandas' default na_values
+_NA_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+_BOOL_STRINGS = frozenset({"True", "False", "TRUE", "FALSE", "true", "false"})
+_INT = re.compile(r"\s*[+-]?\d+\s*")
+
+
+def _sizeof(value: Any) -> int:
+    """Rough in-memory size of a parsed table or document."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return size + sum(_sizeof(v) for v in value)
+    return size
+
+
+class TableCache:
+    """LRU cache of parsed files, bounded by the estimated size of its entries."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(what: str, path: str, sheet: Optional[str] = None, sep: Optional[str] = None) -> Tuple:
+        st = os.stat(path)
+        return (what, os.path.normcase(os.path.abspath(path)), st.st_mtime_ns, st.st_size, sheet or None, sep)
+
+    def peek(self, key: Tuple) -> Any:
+        """Cached value for ``key``, or None (does not load)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get(self, key: Tuple, load: Callable[[], Any], size: Optional[int] = None) -> Any:
+        """Cached value for ``key``; ``load()`` is called once if it is missing.
+
+        Threads asking for the same missing key wait for the first one's parse.
+        ``size`` is the entry's estimated size when known up front (else measured).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+            try:
+                value = load()
+                self._put(key, value, size)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return value
+
+    def _put(self, key: Tuple, value: Any, size: Optional[int] = None):
+        size = _sizeof(value) if size is None else size
+        with self._lock:
+            self.misses += 1
+            if size > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+CACHE = TableCache()
+
+
+def _normalize_sep(sep: Optional[str]) -> str:
+    return "\t" if sep in ("\\t", "\t") else (sep or ",")
+
+
+def read_rows(path: str, sheet: Optional[str] = None, sep: Optional[str] = ",") -> List[Sequence[Any]]:
+    """Cell grid of a CSV (strings) or Excel (typed cells, None for empty) file.
+
+    The returned list is shared with other callers and must not be modified.
+    """
+    path = str(path)
+    load = readers.reader("rows", path, "table")
+    if readers.file_type(path) in ("xlsx", "xlsm"):
+        return CACHE.get(CACHE.key("rows", path, sheet=sheet), lambda: load(path, sheet=sheet))
+    sep = _normalize_sep(sep)
+    return CACHE.get(CACHE.key("rows", path, sep=sep), lambda: load(path, sep=sep))
+
+
+def _copy_document(value: Any) -> Any:
+    # parsed documents only nest dicts and lists; the scalars in them are immutable
+    if isinstance(value, dict):
+        return {k: _copy_document(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_document(v) for v in value]
+    return value
+
+
+def read_document(path: str) -> Any:
+    """Parsed JSON/YAML document; a private copy the caller may modify."""
+    path = str(path)
+    load = readers.reader("document", path)
+    key = CACHE.key("document", path)
+    # measuring a large document object by object costs more than parsing it
+    return _copy_document(CACHE.get(key, lambda: load(path), size=DOCUMENT_OVERHEAD * key[3]))
+
+
+# --- pandas-compatible values ---
+def _parse_bool(cell: str) -> bool:
+    return cell.strip().lower() == "true"
+
+
+def _is_missing(cell: Any) -> bool:
+    return cell is None or (isinstance(cell, str) and cell in _NA_STRINGS) or (
+        isinstance(cell, float) and cell != cell)
+
+
+def _number(cell: Any) -> Any:
+    """``cell`` as an int or float, or None if it is not numeric."""
+    if isinstance(cell, bool):
+        return None
+    if isinstance(cell, (int, float)):
+        return cell
+    if isinstance(cell, str):
+        if _INT.fullmatch(cell):
+            return int(cell)
+        try:
+            return float(cell)
+        except ValueError:
+            return None
+    return None
+
+
+def _infer(cells: Sequence[Any]) -> List[Any]:
+    """Values of one column, typed the way pandas infers a column.
+
+    Numeric text (CSV, or Excel cells stored as text) is converted when the
+    whole column is numeric; ints become floats when a cell is missing or
+    another one is a float.
+    """
+    present = [c for c in cells if not _is_missing(c)]
+    if not present:
+        return [NAN] * len(cells)
+    numbers = [_number(c) for c in present]
+    if all(n is not None for n in numbers):
+        if len(present) == len(cells) and all(isinstance(n, int) for n in numbers):
+            return numbers
+        it = iter(numbers)
+        return [NAN if _is_missing(c) else float(next(it)) for c in cells]
+    if all(isinstance(c, str) and c.strip() in _BOOL_STRINGS for c in present):
+        return [NAN if _is_missing(c) else _parse_bool(c) for c in cells]
+    return [NAN if _is_missing(c) else c for c in cells]
+
+
+def _header_names(cells: Sequence[Any]) -> List[Any]:
+    """Header row with pandas' renaming of empty ("Unnamed: i") and duplicate ("a.1") names."""
+    names: List[Any] = []
+    seen: Dict[Any, int] = {}
+    for i, c in enumerate(cells):
+        name = f"Unnamed: {i}" if c is None or c == "" else c
+        if name in seen:
+            seen[name] += 1
+            candidate = f"{name}.{seen[name]}"
+            while candidate in seen:
+                seen[name] += 1
+                candidate = f"{name}.{seen[name]}"
+            seen[candidate] = 0
+            name = candidate
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _body(rows: Sequence[Sequence[Any]], header: bool) -> Tuple[List[Any], List[Sequence[Any]]]:
+    # blank CSV lines and trailing empty Excel rows are skipped, as pandas does
+    rows = [r for r in rows if len(r)]
+    while rows and all(c is None for c in rows[-1]):
+        rows.pop()
+    if header:
+        if not rows:
+            return [], []
+        return _header_names(rows[0]), rows[1:]
+    width = max((len(r) for r in rows), default=0)
+    return list(range(width)), rows
+
+
+def records(rows: Sequence[Sequence[Any]], header: bool = True) -> List[Dict[Any, Any]]:
+    """Rows as dicts, like ``pd.read_csv(...).to_dict(orient="records")``."""
+    names, body = _body(rows, header)
+    columns = [_infer([r[i] if i < len(r) else None for r in body]) for i in range(len(names))]
+    return [dict(zip(names, values)) for values in zip(*columns)] if columns else []
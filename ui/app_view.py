@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from services.prefs import Preferences
-from services.experiment_sender import send_experiment
+from services.payload import build_payload, minio_keyring_user
+from services.progress import ProgressTracker
 from pathlib import Path
 from ui.mongo_view import MongoSection
 from ui.minio_view import MinioSection
@@ -80,7 +81,7 @@ class AppView(ctk.CTk):
             password=self.mongo_section.get_password()
         )
         # minio secret via keyring
-        minio_user_key = f"minio:{(data.get('minio_access_key') or 'default')}@{(data.get('minio_endpoint') or 'localhost')}"
+        minio_user_key = minio_keyring_user(data)
         self.prefs.save_password_if_allowed(
             remember=bool(data.get("remember_minio", 0)),
             user=minio_user_key,
@@ -129,77 +130,11 @@ class AppView(ctk.CTk):
         # aggregate data
         data = self.prefs_dict()
         # Build structured payload with selectors grouped under experiment
-        payload = {
-            "mongo": {
-                "use_uri": data.get("use_uri", 0),
-                "uri": data.get("uri", ""),
-                "host": data.get("host", ""),
-                "port": data.get("port", ""),
-                "user": data.get("user", ""),
-                "db": data.get("db", ""),
-                "auth_source": data.get("auth_source", ""),
-                "tls": data.get("tls", 0),
-                "password": self.mongo_section.get_password(),
-            },
-            "minio": {
-                "endpoint": data.get("minio_endpoint", ""),
-                "access_key": data.get("minio_access_key", ""),
-                "tls": data.get("minio_tls", 0),
-                "secret_key": self.minio_section.get_secret(),
-                "bucket": data.get("minio_bucket", ""),
-            },
-            "experiment": {
-                "folder": data.get("experiment_folder", ""),
-                "name": data.get("experiment_name", ""),
-                "folders": data.get("experiment_folders", []),
-                "selectors": {
-                    "config": {
-                        "name": data.get("config_name", ""),
-                        "sheet": data.get("config_sheet", ""),
-                        "use_custom_path": data.get("config_use_custom_path", 0),
-                        "custom_path": data.get("config_custom_path", ""),
-                        "options": {
-                            "flatten": data.get("config_flatten", 0),
-                            "sep": data.get("config_sep", ","),
-                        },
-                        "parse_from_folder": data.get("config_parse_from_folder", 0),
-                        "folder_pattern": data.get("config_folder_pattern", ""),
-                        "parsed_folder_values": data.get("config_parsed_folder_values", {}),
-                    },
-                    "metrics": {
-                        "name": data.get("metrics_name", ""),
-                        "sheet": data.get("metrics_sheet", ""),
-                        "options": {
-                            "header": data.get("metrics_header", 0),
-                            "has_time": data.get("metrics_has_time", 0),
-                            "time_col": data.get("metrics_time_col", ""),
-                            "selected_cols": data.get("metrics_selected_cols", []),
-                            "sep": data.get("metrics_sep", ","),
-                        },
-                    },
-                    "results": {
-                        "name": data.get("results_name", ""),
-                        "sheet": data.get("results_sheet", ""),
-                        "options": {
-                            "sep": data.get("results_sep", ","),
-                        },
-                    },
-                    "raw_data": {
-                        "name": data.get("raw_data_name", ""),
-                        "files": data.get("raw_data_files", []),
-                        "options": {
-                            "send_minio": data.get("raw_data_send_minio", 1),
-                            "save_locally": data.get("raw_data_save_locally", 0),
-                            "local_path": data.get("raw_data_local_path", ""),
-                        },
-                    },
-                    "artifacts": {
-                        "name": data.get("artifacts_name", ""),
-                        "files": data.get("artifacts_files", []),
-                    },
-                },
-            },
-        }
+        payload = build_payload(
+            data,
+            mongo_password=self.mongo_section.get_password(),
+            minio_secret=self.minio_section.get_secret(),
+        )
 
         # produce payload and call service (non-blocking)
         try:
@@ -207,14 +142,43 @@ class AppView(ctk.CTk):
             # disable button to avoid double-clicks
             self.exp_section.send_btn.configure(state="disabled")
 
+            tracker = ProgressTracker()
+            refresh_pending = threading.Event()
+            sending = threading.Event()
+            sending.set()
+
+            def _refresh_progress():
+                refresh_pending.clear()
+                if sending.is_set():
+                    self.exp_section.send_status.configure(text=f"Sending… {tracker.summary()}")
+
+            def _on_progress(event):
+                # called from the sending threads: aggregate, then let Tk redraw at most once per idle cycle
+                tracker.update(event)
+                if not refresh_pending.is_set():
+                    refresh_pending.set()
+                    self.after(100, _refresh_progress)
+
+            def _tick():
+                # keep the ETA / stall indicator moving between events
+                if sending.is_set():
+                    _refresh_progress()
+                    self.after(1000, _tick)
+
+            self.after(1000, _tick)
+
             def _worker():
                 res = None
                 err = None
                 try:
-                    res = send_experiment(payload)
+                    # Sacred (which imports pandas) is only loaded when something is sent
+                    from services.experiment_sender import send_experiment
+
+                    res = send_experiment(payload, on_progress=_on_progress)
                 except Exception as e:
                     err = e
                     log_error(e, "Error in send_experiment")
+                sending.clear()
 
                 def _update_ui():
                     if err is not None:
@@ -1,16 +1,14 @@
 import customtkinter as ctk
 from pathlib import Path
+from services import config_stream, readers
+from services.folder_pattern import compile_pattern, parse_folder_name
+from services.table_cache import read_document, read_rows
 from tkinter import filedialog
-from openpyxl import load_workbook
-import csv
 import json
 import traceback
-try:
-    import yaml
-except ImportError:
-    yaml = None
-# pandas optional: not required for current readers (openpyxl/csv used)
-pd = None
+
+# Downsample menu label -> services.decimation method
+_DECIMATION_METHODS = {"None": "none", "LTTB": "lttb", "Min/max": "minmax", "Every Nth": "every_nth"}
 
 
 def _format_error(e: Exception) -> str:
@@ -38,6 +36,8 @@ class ExperimentSection(ctk.CTkFrame):
             "has_time": False,
             "time_col": "",
             "selected_cols": set(),
+            "decimation": "none",
+            "decimation_points": 5000,
         }
         self._config_settings: dict = {
             "flatten": False,
@@ -45,11 +45,17 @@ class ExperimentSection(ctk.CTkFrame):
             "custom_path": "",
             "parse_from_folder": False,
             "folder_pattern": "",
+            "sweep": False,
+            "sweep_key": "",
+            "include": "",
+            "exclude": "",
         }
         self._raw_data_settings: dict = {
             "send_minio": True,
             "save_locally": False,
             "local_path": "",
+            "local_mode": "copy",
+            "content_addressed": False,
         }
         # CSV separators per selector (persisted)
         self._csv_separators: dict[str, str] = {
@@ -61,6 +67,8 @@ class ExperimentSection(ctk.CTkFrame):
         self._batch_enable = False
         self._batch_selected: set[str] = set()
         self._allowed_tabular_suffixes = (".json", ".csv", ".xlsx", ".xlsm", ".yaml", ".yml")
+        # metrics can also come from columnar / array files (no header or separator settings)
+        self._binary_metrics_suffixes = tuple(f".{t}" for t in readers.supported("columns"))
         self.grid_columnconfigure(0, weight=0)
         self.grid_columnconfigure(1, weight=1)
         self.grid_columnconfigure(2, weight=0)
@@ -247,9 +255,16 @@ class ExperimentSection(ctk.CTkFrame):
             self._render_batch_checkboxes()
             if callable(self.on_change):
                 self.on_change()
-        ctk.CTkCheckBox(self, text="Send multiple experiments", variable=self.batch_enable_var, command=on_batch_toggle).grid(
-            row=batch_row, column=0, columnspan=3, sticky="w", padx=12, pady=(0, 4)
+        batch_row_frame = ctk.CTkFrame(self, fg_color="transparent")
+        batch_row_frame.grid(row=batch_row, column=0, columnspan=3, sticky="w", padx=12, pady=(0, 4))
+        ctk.CTkCheckBox(batch_row_frame, text="Send multiple experiments", variable=self.batch_enable_var, command=on_batch_toggle).pack(side="left")
+        ctk.CTkLabel(batch_row_frame, text="Parallel folders").pack(side="left", padx=(16, 6))
+        self.batch_workers_menu = ctk.CTkOptionMenu(
+            batch_row_frame, values=["1", "2", "4", "8"], width=70, dynamic_resizing=False,
+            command=lambda v: self.on_change() if callable(self.on_change) else None
         )
+        self.batch_workers_menu.set("1")
+        self.batch_workers_menu.pack(side="left")
         self.batch_container = ctk.CTkFrame(self, corner_radius=8)
         self.batch_container.grid(row=batch_row + 1, column=0, columnspan=3, sticky="nsew", padx=6, pady=(0, 6))
         # hide container by default so it doesn't reserve space
@@ -295,12 +310,18 @@ class ExperimentSection(ctk.CTkFrame):
         data["metrics_has_time"] = int(bool(self._metrics_settings.get("has_time", False)))
         data["metrics_time_col"] = self._metrics_settings.get("time_col", "")
         data["metrics_selected_cols"] = sorted(list(self._metrics_settings.get("selected_cols", set())))
+        data["metrics_decimation"] = self._metrics_settings.get("decimation", "none")
+        data["metrics_decimation_points"] = int(self._metrics_settings.get("decimation_points", 5000) or 5000)
         # config settings persistence
         data["config_flatten"] = int(bool(self._config_settings.get("flatten", False)))
         data["config_use_custom_path"] = int(bool(self._config_settings.get("use_custom_path", False)))
         data["config_custom_path"] = self._config_settings.get("custom_path", "")
         data["config_parse_from_folder"] = int(bool(self._config_settings.get("parse_from_folder", False)))
         data["config_folder_pattern"] = self._config_settings.get("folder_pattern", "")
+        data["config_sweep"] = int(bool(self._config_settings.get("sweep", False)))
+        data["config_sweep_key"] = self._config_settings.get("sweep_key", "")
+        data["config_include"] = self._config_settings.get("include", "")
+        data["config_exclude"] = self._config_settings.get("exclude", "")
         # Include parsed folder values if enabled
         if self._config_settings.get("parse_from_folder", False):
             data["config_parsed_folder_values"] = self._parse_folder_name()
@@ -310,6 +331,8 @@ class ExperimentSection(ctk.CTkFrame):
         data["raw_data_send_minio"] = int(bool(self._raw_data_settings.get("send_minio", True)))
         data["raw_data_save_locally"] = int(bool(self._raw_data_settings.get("save_locally", False)))
         data["raw_data_local_path"] = self._raw_data_settings.get("local_path", "")
+        data["raw_data_local_mode"] = self._raw_data_settings.get("local_mode", "copy") or "copy"
+        data["raw_data_content_addressed"] = int(bool(self._raw_data_settings.get("content_addressed", False)))
         # CSV separators
         data["config_sep"] = self._csv_separators.get("config", ",")
         data["metrics_sep"] = self._csv_separators.get("metrics", ",")
@@ -338,6 +361,7 @@ class ExperimentSection(ctk.CTkFrame):
             _log_error(e, "Error computing experiment folders list")
             folders_list = [base_folder] if base_folder else []
         data["experiment_folders"] = folders_list
+        data["batch_workers"] = int(self.batch_workers_menu.get() or 1)
         return data
 
     def set_prefs(self, data: dict):
@@ -375,12 +399,18 @@ class ExperimentSection(ctk.CTkFrame):
         self._metrics_settings["time_col"] = data.get("metrics_time_col", "") or ""
         sel = data.get("metrics_selected_cols", [])
         self._metrics_settings["selected_cols"] = set(sel) if isinstance(sel, list) else set()
+        self._metrics_settings["decimation"] = data.get("metrics_decimation", "none") or "none"
+        self._metrics_settings["decimation_points"] = data.get("metrics_decimation_points", 5000) or 5000
         # restore config settings
         self._config_settings["flatten"] = bool(data.get("config_flatten", 0))
         self._config_settings["use_custom_path"] = bool(data.get("config_use_custom_path", 0))
         self._config_settings["custom_path"] = data.get("config_custom_path", "") or ""
         self._config_settings["parse_from_folder"] = bool(data.get("config_parse_from_folder", 0))
         self._config_settings["folder_pattern"] = data.get("config_folder_pattern", "") or ""
+        self._config_settings["sweep"] = bool(data.get("config_sweep", 0))
+        self._config_settings["sweep_key"] = data.get("config_sweep_key", "") or ""
+        self._config_settings["include"] = data.get("config_include", "") or ""
+        self._config_settings["exclude"] = data.get("config_exclude", "") or ""
         # Update config source radio button and visibility
         self.config_source_var.set("custom" if self._config_settings["use_custom_path"] else "folder")
         self._update_config_selector_visibility()
@@ -391,10 +421,14 @@ class ExperimentSection(ctk.CTkFrame):
         self._raw_data_settings["send_minio"] = bool(data.get("raw_data_send_minio", 1))
         self._raw_data_settings["save_locally"] = bool(data.get("raw_data_save_locally", 0))
         self._raw_data_settings["local_path"] = data.get("raw_data_local_path", "") or ""
+        self._raw_data_settings["local_mode"] = data.get("raw_data_local_mode", "copy") or "copy"
+        self._raw_data_settings["content_addressed"] = bool(data.get("raw_data_content_addressed", 0))
         # restore CSV separators
         self._csv_separators["config"] = data.get("config_sep", ",") or ","
         self._csv_separators["metrics"] = data.get("metrics_sep", ",") or ","
         self._csv_separators["results"] = data.get("results_sep", ",") or ","
+        # restore batch concurrency
+        self.batch_workers_menu.set(str(data.get("batch_workers", 1) or 1))
         # restore experiment name
         # self.exp_name_entry.delete(0, "end")
         # self.exp_name_entry.insert(0, data.get("experiment_name", ""))
@@ -446,9 +480,10 @@ class ExperimentSection(ctk.CTkFrame):
     def _parse_folder_name(self) -> dict:
         """Parse the folder name using the defined pattern and return extracted values.
         
-        Pattern syntax:
+        Pattern syntax (see services.folder_pattern):
         - $variable$ - matches any characters (greedy minimal)
         - $variable%N$ - matches exactly N characters (e.g., $date%8$ matches 8 chars)
+        - $variable:type$ - converts the value (int, float, date, str)
         """
         pattern = self._config_settings.get("folder_pattern", "")
         if not pattern:
@@ -458,38 +493,17 @@ class ExperimentSection(ctk.CTkFrame):
         if not folder_path:
             return {}
         
-        folder_name = Path(folder_path).name
-        
-        # Extract variable definitions from pattern (between $ signs)
-        # Format: $name$ or $name%length$
-        import re
-        var_pattern = r'\$([^$%]+)(?:%(\d+))?\$'
-        variables = re.findall(var_pattern, pattern)
-        
-        if not variables:
-            return {}
-        
-        # Build regex from pattern by replacing $var$ or $var%N$ with named groups
-        regex_pattern = re.escape(pattern)
-        for var_name, length in variables:
-            if length:
-                # Exact length: match exactly N characters
-                escaped_var = re.escape(f"${var_name}%{length}$")
-                regex_pattern = regex_pattern.replace(escaped_var, f"(?P<{var_name}>.{{{length}}})")
-            else:
-                # No length: match any characters (non-greedy)
-                escaped_var = re.escape(f"${var_name}$")
-                regex_pattern = regex_pattern.replace(escaped_var, f"(?P<{var_name}>.+?)")
-        
-        # Try to match
-        try:
-            match = re.match(f"^{regex_pattern}$", folder_name)
-            if match:
-                return match.groupdict()
-        except re.error:
-            pass
-        
-        return {}
+        return parse_folder_name(folder_path, pattern)
+
+    def _batch_pattern_mismatches(self) -> tuple[int, list[str]]:
+        """(number of batch folders, names the folder pattern does not match)."""
+        pattern = compile_pattern(self._config_settings.get("folder_pattern", ""))
+        base_folder = self.folder_entry.get().strip()
+        if pattern is None or not self._batch_enable or not base_folder:
+            return 0, []
+        names = sorted(self._batch_selected)
+        _, unmatched = pattern.match_all(names)
+        return len(names), unmatched
 
     def _open_folder_pattern_dialog(self):
         """Open a dialog to define the folder name pattern."""
@@ -523,11 +537,12 @@ class ExperimentSection(ctk.CTkFrame):
         help_text = (
             "Use variables between $ signs to extract values from folder name:\n\n"
             "  $variable$      → matches any text (flexible length)\n"
-            "  $variable%N$   → matches exactly N characters\n\n"
+            "  $variable%N$   → matches exactly N characters\n"
+            "  $variable:type$ → int, float, date or str\n\n"
             "Examples:\n"
             "  Folder:    MyExp_20260121_v2\n"
-            "  Pattern:   $name$_$date%8$_v$ver$\n"
-            "  Result:     name=MyExp, date=20260121, ver=2"
+            "  Pattern:   $name$_$date%8:date$_v$ver$\n"
+            "  Result:     name=MyExp, date=2026-01-21, ver=2"
         )
         help_label = ctk.CTkLabel(help_frame, text=help_text, font=("Consolas", 11), justify="left")
         help_label.grid(row=1, column=0, sticky="w", padx=10, pady=(0, 8))
@@ -567,7 +582,12 @@ class ExperimentSection(ctk.CTkFrame):
             preview_box.delete("1.0", "end")
             
             if parsed:
-                preview_text = "\n".join(f"{k}: {v}" for k, v in parsed.items())
+                preview_text = "\n".join(f"{k}: {v!r}" for k, v in parsed.items())
+                total, unmatched = self._batch_pattern_mismatches()
+                if total:
+                    preview_text += f"\n\nBatch: {total - len(unmatched)}/{total} folders match"
+                    if unmatched:
+                        preview_text += "\nNo match: " + ", ".join(unmatched[:10]) + (" …" if len(unmatched) > 10 else "")
                 preview_box.insert("1.0", preview_text)
             else:
                 if pattern:
@@ -715,9 +735,7 @@ class ExperimentSection(ctk.CTkFrame):
         # fetch sheet names
         sheets: list[str] = []
         try:
-            wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-            sheets = list(wb.sheetnames)
-            wb.close()
+            sheets = readers.sheet_names(path)
         except Exception as e:
             self.status.configure(text=f"Could not read sheets from {path.name}: {e}")
         if not sheets:
@@ -742,7 +760,10 @@ class ExperimentSection(ctk.CTkFrame):
             if key in restricted and base_folder:
                 try:
                     base = Path(base_folder)
-                    filtered = [n for n in all_items if (base / n).is_file() and (base / n).suffix.lower() in self._allowed_tabular_suffixes]
+                    allowed = self._allowed_tabular_suffixes
+                    if key == "metrics":
+                        allowed = allowed + self._binary_metrics_suffixes
+                    filtered = [n for n in all_items if (base / n).is_file() and (base / n).suffix.lower() in allowed]
                 except Exception as e:
                     _log_error(e, f"Error filtering files for {key}")
                     self.status.configure(text=_format_error(e))
@@ -846,6 +867,48 @@ class ExperimentSection(ctk.CTkFrame):
             flatten_cb = ctk.CTkCheckBox(sec, text="Flatten nested keys", variable=flatten_var, command=on_flatten_toggle)
             flatten_cb.grid(row=current_row, column=0, columnspan=2, sticky="w", padx=8, pady=4)
             current_row += 1
+            # key-path projection: only these fields are read from the file (e.g. optics.laser.power, channels.*.gain)
+            for setting, label, hint in (("include", "Keep keys", "all keys"), ("exclude", "Drop keys", "none")):
+                ctk.CTkLabel(sec, text=label).grid(row=current_row, column=0, sticky="w", padx=8, pady=4)
+                keys_entry = ctk.CTkEntry(sec, placeholder_text=hint)
+                if self._config_settings.get(setting):
+                    keys_entry.insert(0, self._config_settings[setting])
+                def on_keys_change(_event=None, _setting=setting, _entry=keys_entry):
+                    value = _entry.get().strip()
+                    if value == self._config_settings.get(_setting, ""):
+                        return
+                    self._config_settings[_setting] = value
+                    self.render_details_sections()
+                    if callable(self.on_change):
+                        self.on_change()
+                keys_entry.bind("<FocusOut>", on_keys_change)
+                keys_entry.bind("<Return>", on_keys_change)
+                keys_entry.grid(row=current_row, column=1, sticky="ew", padx=(6, 8), pady=4)
+                current_row += 1
+        
+        # Sweep mode for CSV/Excel: one run per config row, linked by a key column
+        if has_valid_file and path.suffix.lower() in (".csv", ".xlsx", ".xlsm"):
+            sweep_var = ctk.BooleanVar(value=bool(self._config_settings.get("sweep", False)))
+            def on_sweep_toggle():
+                self._config_settings["sweep"] = bool(sweep_var.get())
+                self.render_details_sections()
+                if callable(self.on_change):
+                    self.on_change()
+            sweep_cb = ctk.CTkCheckBox(sec, text="One run per row (sweep)", variable=sweep_var, command=on_sweep_toggle)
+            sweep_cb.grid(row=current_row, column=0, columnspan=2, sticky="w", padx=8, pady=4)
+            current_row += 1
+            if self._config_settings.get("sweep", False):
+                key_values = ["(none)"] + self._config_columns(path, sheet)
+                def on_sweep_key(value):
+                    self._config_settings["sweep_key"] = "" if value == "(none)" else value
+                    if callable(self.on_change):
+                        self.on_change()
+                ctk.CTkLabel(sec, text="Key column").grid(row=current_row, column=0, sticky="w", padx=8, pady=4)
+                key_menu = ctk.CTkOptionMenu(sec, values=key_values, dynamic_resizing=False, command=on_sweep_key)
+                current_key = self._config_settings.get("sweep_key", "")
+                key_menu.set(current_key if current_key in key_values else "(none)")
+                key_menu.grid(row=current_row, column=1, sticky="ew", padx=(6, 8), pady=4)
+                current_row += 1
         
         # Show parsed values if pattern is set (parse option is in main UI now)
         if self._config_settings.get("parse_from_folder", False) and self._config_settings.get("folder_pattern", ""):
@@ -966,6 +1029,7 @@ class ExperimentSection(ctk.CTkFrame):
                 send_var = ctk.BooleanVar(value=bool(self._raw_data_settings.get("send_minio", True)))
                 def on_send_toggle():
                     self._raw_data_settings["send_minio"] = bool(send_var.get())
+                    cas_cb.configure(state=("normal" if send_var.get() else "disabled"))
                     if callable(self.on_minio_toggle):
                         self.on_minio_toggle(send_var.get())
                     if callable(self.on_change):
@@ -978,6 +1042,7 @@ class ExperimentSection(ctk.CTkFrame):
                     self._raw_data_settings["save_locally"] = bool(save_var.get())
                     entry.configure(state=("normal" if save_var.get() else "disabled"))
                     btn.configure(state=("normal" if save_var.get() else "disabled"))
+                    mode_menu.configure(state=("normal" if save_var.get() else "disabled"))
                     if callable(self.on_change):
                         self.on_change()
                 save_cb = ctk.CTkCheckBox(sec, text="Save locally", variable=save_var, command=on_save_toggle)
@@ -1001,6 +1066,27 @@ class ExperimentSection(ctk.CTkFrame):
                 btn.grid(row=next_row_local + 2, column=1, sticky="e", padx=(6, 8), pady=(0, 6))
                 entry.configure(state=("normal" if save_var.get() else "disabled"))
                 btn.configure(state=("normal" if save_var.get() else "disabled"))
+                # Local save mode: links/clones when source and target share a filesystem
+                def on_mode_changed(value):
+                    self._raw_data_settings["local_mode"] = value
+                    if callable(self.on_change):
+                        self.on_change()
+                ctk.CTkLabel(sec, text="Local mode").grid(row=next_row_local + 3, column=0, sticky="w", padx=8, pady=4)
+                mode_menu = ctk.CTkOptionMenu(sec, values=["copy", "hardlink", "reflink"], width=140,
+                                              command=on_mode_changed)
+                mode_menu.set(self._raw_data_settings.get("local_mode", "copy") or "copy")
+                mode_menu.grid(row=next_row_local + 3, column=1, sticky="w", padx=(6, 8), pady=4)
+                mode_menu.configure(state=("normal" if save_var.get() else "disabled"))
+                # Content-addressed MinIO objects: identical files are uploaded once
+                cas_var = ctk.BooleanVar(value=bool(self._raw_data_settings.get("content_addressed", False)))
+                def on_cas_toggle():
+                    self._raw_data_settings["content_addressed"] = bool(cas_var.get())
+                    if callable(self.on_change):
+                        self.on_change()
+                cas_cb = ctk.CTkCheckBox(sec, text="Store by content (upload identical files once)",
+                                         variable=cas_var, command=on_cas_toggle)
+                cas_cb.grid(row=next_row_local + 4, column=0, columnspan=2, sticky="w", padx=8, pady=(0, 6))
+                cas_cb.configure(state=("normal" if send_var.get() else "disabled"))
             # metrics DataFrame controls
             if key == "metrics" and path and path.is_file():
                 col_names, data_rows = self._read_tabular(path, sheet)
@@ -1020,8 +1106,9 @@ class ExperimentSection(ctk.CTkFrame):
                     self.render_details_sections()
                     if callable(self.on_change):
                         self.on_change()
-                header_cb = ctk.CTkCheckBox(sec, text="Column header", variable=header_var, command=on_header_toggle)
-                header_cb.grid(row=3, column=0, sticky="w", padx=8, pady=(6, 4))
+                if path.suffix.lower() not in self._binary_metrics_suffixes:
+                    header_cb = ctk.CTkCheckBox(sec, text="Column header", variable=header_var, command=on_header_toggle)
+                    header_cb.grid(row=3, column=0, sticky="w", padx=8, pady=(6, 4))
 
                 # Time column checkbox
                 has_time_var = ctk.BooleanVar(value=bool(self._metrics_settings.get("has_time", False)))
@@ -1052,6 +1139,37 @@ class ExperimentSection(ctk.CTkFrame):
                     time_menu.grid(row=next_row, column=1, sticky="ew", padx=(6, 8), pady=4)
                     next_row += 1
 
+                # Optional downsampling of long series (services.decimation)
+                ctk.CTkLabel(sec, text="Downsample").grid(row=next_row, column=0, sticky="w", padx=8, pady=4)
+                deci_row = ctk.CTkFrame(sec, fg_color="transparent")
+                deci_row.grid(row=next_row, column=1, sticky="ew", padx=(6, 8), pady=4)
+                deci_row.grid_columnconfigure(0, weight=1)
+                deci_points = ctk.CTkEntry(deci_row, width=90, placeholder_text="points")
+                deci_points.insert(0, str(self._metrics_settings.get("decimation_points", 5000)))
+                def on_decimation_change(label):
+                    method = _DECIMATION_METHODS.get(label, "none")
+                    self._metrics_settings["decimation"] = method
+                    deci_points.configure(state=("disabled" if method == "none" else "normal"))
+                    if callable(self.on_change):
+                        self.on_change()
+                def on_points_change(_event=None):
+                    try:
+                        self._metrics_settings["decimation_points"] = max(3, int(deci_points.get()))
+                    except ValueError:
+                        return
+                    if callable(self.on_change):
+                        self.on_change()
+                deci_menu = ctk.CTkOptionMenu(deci_row, values=list(_DECIMATION_METHODS), dynamic_resizing=False,
+                                              command=on_decimation_change)
+                current_method = self._metrics_settings.get("decimation", "none")
+                deci_menu.set(next((k for k, v in _DECIMATION_METHODS.items() if v == current_method), "None"))
+                deci_menu.grid(row=0, column=0, sticky="ew")
+                deci_points.grid(row=0, column=1, sticky="e", padx=(6, 0))
+                deci_points.bind("<FocusOut>", on_points_change)
+                deci_points.bind("<Return>", on_points_change)
+                deci_points.configure(state=("disabled" if current_method == "none" else "normal"))
+                next_row += 1
+
                 # Columns checklist (exclude time column if set)
                 cols_to_list = [c for c in current_cols if c != self._metrics_settings.get("time_col", "")]
                 chk_container = ctk.CTkFrame(sec, corner_radius=8)
@@ -1079,41 +1197,38 @@ class ExperimentSection(ctk.CTkFrame):
             self.on_change()
 
     # --- Metrics helpers ---
+    def _config_columns(self, path: Path, sheet: str) -> list[str]:
+        """Header of a CSV/Excel config (candidate sweep key columns)."""
+        try:
+            table = read_rows(path, sheet=sheet or None, sep=self._csv_separators.get("config", ","))
+        except Exception as e:
+            _log_error(e, "Error reading config header")
+            return []
+        return [str(c) for c in table[0] if c not in (None, "")] if table else []
+
     def _read_tabular(self, path: Path, sheet: str) -> tuple[list[str], list[list[object]]]:
         cols: list[str] = []
         rows: list[list[object]] = []
         try:
-            if path.suffix.lower() in (".xlsx", ".xlsm"):
-                wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-                ws = None
-                if sheet and sheet in wb.sheetnames:
-                    ws = wb[sheet]
-                else:
-                    ws = wb[wb.sheetnames[0]]
-                data_iter = ws.iter_rows(values_only=True)
-                for i, row in enumerate(data_iter):
+            if path.suffix.lower() in (".xlsx", ".xlsm", ".csv"):
+                # shared parse with the send path (services.table_cache)
+                sep = self._csv_separators.get("metrics", ",")
+                table = read_rows(path, sheet=sheet or None, sep=sep)
+                for i, row in enumerate(table):
                     if i == 0 and bool(self._metrics_settings.get("header", True)):
-                        cols = [str(c) if c is not None else f"col{idx}" for idx, c in enumerate(list(row))]
+                        if path.suffix.lower() == ".csv":
+                            cols = [str(c) for c in row]
+                        else:
+                            cols = [str(c) if c is not None else f"col{idx}" for idx, c in enumerate(list(row))]
                     else:
                         rows.append(list(row))
-                wb.close()
                 # if no header, generate from max row length
                 if not cols:
                     max_len = max((len(r) for r in rows), default=0)
                     cols = [str(i) for i in range(max_len)]
-            elif path.suffix.lower() == ".csv":
-                # Use selected separator for metrics preview
-                sep = self._csv_separators.get("metrics", ",")
-                with open(path, newline="", encoding="utf-8") as f:
-                    reader = csv.reader(f, delimiter=("\t" if sep == "\t" else sep))
-                    for i, row in enumerate(reader):
-                        if i == 0 and bool(self._metrics_settings.get("header", True)):
-                            cols = [str(c) for c in row]
-                        else:
-                            rows.append(row)
-                if not cols:
-                    max_len = max((len(r) for r in rows), default=0)
-                    cols = [str(i) for i in range(max_len)]
+            elif path.suffix.lower() in self._binary_metrics_suffixes:
+                # column names only; the data is not read for the picker
+                cols = readers.list_columns(path)
             else:
                 # unsupported -> empty
                 cols, rows = [], []
@@ -1168,46 +1283,47 @@ class ExperimentSection(ctk.CTkFrame):
                 items.append((new_key, v))
         return dict(items)
 
+    def _read_config_document(self, path: Path, projection: dict):
+        """JSON/YAML config as sent: streamed and projected when keys are selected or the file is large."""
+        if config_stream.should_stream(str(path), projection):
+            return config_stream.load(path, include=config_stream.key_paths(projection["include"]),
+                                      exclude=config_stream.key_paths(projection["exclude"]))
+        return read_document(path)
+
     def _read_config_preview(self, path: Path, sheet: str = "", max_lines: int = 12) -> str:
         """Read config file and return a formatted preview string."""
         try:
             suffix = path.suffix.lower()
+            projection = {"include": self._config_settings.get("include", ""),
+                          "exclude": self._config_settings.get("exclude", "")}
             if suffix == ".json":
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                data = self._read_config_document(path, projection)
                 # Apply flatten if enabled
                 if self._config_settings.get("flatten", False):
                     data = self._flatten_dict(data)
                 # Format JSON with indentation
                 preview = json.dumps(data, indent=2, ensure_ascii=False)
             elif suffix in (".yaml", ".yml"):
-                if yaml is None:
+                if not readers.has_backend("yaml"):
                     preview = "(PyYAML not installed - run: pip install pyyaml)"
                 else:
-                    with open(path, "r", encoding="utf-8") as f:
-                        data = yaml.safe_load(f)
+                    data = self._read_config_document(path, projection)
                     # Apply flatten if enabled
                     if self._config_settings.get("flatten", False) and isinstance(data, dict):
                         data = self._flatten_dict(data)
                     # Format as YAML
-                    preview = yaml.dump(data, default_flow_style=False, allow_unicode=True, sort_keys=False)
+                    preview = readers.backend("yaml").dump(data, default_flow_style=False, allow_unicode=True, sort_keys=False)
             elif suffix == ".csv":
                 sep = self._csv_separators.get("config", ",")
-                sep = "\t" if sep in ("\\t", "\t") else sep
                 lines = []
-                with open(path, "r", newline="", encoding="utf-8") as f:
-                    reader = csv.reader(f, delimiter=sep)
-                    for row in reader:
-                        lines.append(" │ ".join(str(c) for c in row))
+                for row in read_rows(path, sep=sep):
+                    lines.append(" │ ".join(str(c) for c in row))
                 preview = "\n".join(lines)
             elif suffix in (".xlsx", ".xlsm"):
-                wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-                ws = wb[sheet] if sheet and sheet in wb.sheetnames else wb[wb.sheetnames[0]]
                 lines = []
-                for row in ws.iter_rows(values_only=True):
+                for row in read_rows(path, sheet=sheet or None):
                     row_str = " │ ".join(str(c) if c is not None else "" for c in row)
                     lines.append(row_str)
-                wb.close()
                 preview = "\n".join(lines)
             else:
                 preview = "(Unsupported format)"